@@ -0,0 +1,157 @@
+"""
+RápidoLingo worker admission control
+Reports this worker's load to the LiveKit dispatcher and turns new jobs away
+when it's too busy, so rooms go to workers with headroom instead of an
+overloaded process degrading every session already on it.
+
+Load is the highest of four ratios, each against the point where the worker
+counts as full:
+- active sessions / AGENT_MAX_SESSIONS
+- event-loop lag / AGENT_MAX_LOOP_LAG_MS
+- host CPU / AGENT_MAX_CPU_PERCENT
+- RSS of the worker and its job processes / AGENT_MAX_RSS_MB
+At AGENT_LOAD_THRESHOLD the dispatcher stops offering jobs. Load updates lag
+a little, so job requests that still arrive are checked again and rejected.
+
+Usage:
+    WorkerOptions(entrypoint_fnc=..., **admission_options())
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+import psutil
+from livekit.agents import JobRequest, Worker
+
+logger = logging.getLogger("rapidolingo")
+
+MAX_SESSIONS = int(os.getenv("AGENT_MAX_SESSIONS", 8))
+MAX_LOOP_LAG = float(os.getenv("AGENT_MAX_LOOP_LAG_MS", 200)) / 1000
+MAX_CPU_PERCENT = float(os.getenv("AGENT_MAX_CPU_PERCENT", 80))
+MAX_RSS_MB = float(os.getenv("AGENT_MAX_RSS_MB", 4096))
+LOAD_THRESHOLD = float(os.getenv("AGENT_LOAD_THRESHOLD", 1.0))
+
+WINDOW = 5  # Samples kept; the framework asks for the load every 0.5s
+RESERVATION_TTL = 10.0  # Seconds an accepted job counts before it shows in active_jobs
+
+
+class LoadMonitor:
+    """Samples the load inputs and decides on job requests. Thread-safe: the
+    framework calls load() from an executor thread and admit() on the loop."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._process = psutil.Process()
+        self._cpu: deque = deque(maxlen=WINDOW)
+        self._lag: deque = deque(maxlen=WINDOW)
+        self._reserved: Dict[str, float] = {}  # Accepted job id -> accepted at
+        self.active_jobs = 0
+        self.rss_mb = 0.0
+        psutil.cpu_percent(interval=None)  # Primes the CPU counter
+
+    def _probe_lag(self, loop) -> float:
+        """How long a callback waits for the worker's event loop to run it"""
+        done = threading.Event()
+        started = time.perf_counter()
+        loop.call_soon_threadsafe(done.set)
+        if not done.wait(MAX_LOOP_LAG * 2):
+            return MAX_LOOP_LAG * 2
+        return time.perf_counter() - started
+
+    def _rss_mb(self) -> float:
+        total = 0
+        try:
+            procs = [self._process] + self._process.children(recursive=True)
+        except psutil.Error:
+            procs = [self._process]
+        for proc in procs:
+            try:
+                total += proc.memory_info().rss
+            except psutil.Error:
+                pass  # Job process exited meanwhile
+        return total / 2**20
+
+    def sample(self, worker: Worker):
+        """Take one sample of every input"""
+        loop = getattr(worker, "_loop", None)  # Not public; lag reads 0 without it
+        lag = self._probe_lag(loop) if loop is not None else 0.0
+        cpu = psutil.cpu_percent(interval=None)
+        rss = self._rss_mb()
+        running = {info.job.id for info in worker.active_jobs}
+        now = time.monotonic()
+        with self._lock:
+            self._lag.append(lag)
+            self._cpu.append(cpu)
+            self.rss_mb = rss
+            self.active_jobs = len(running)
+            for job_id, accepted_at in list(self._reserved.items()):
+                if job_id in running or now - accepted_at > RESERVATION_TTL:
+                    del self._reserved[job_id]
+
+    def ratios(self) -> Dict[str, float]:
+        """Each input as a fraction of its limit (1.0 = full)"""
+        with self._lock:
+            sessions = self.active_jobs + len(self._reserved)
+            lag = max(self._lag, default=0.0)  # Spikes matter, so the worst recent sample
+            cpu = sum(self._cpu) / len(self._cpu) if self._cpu else 0.0
+            rss = self.rss_mb
+        return {
+            "sessions": sessions / MAX_SESSIONS,
+            "loop_lag": lag / MAX_LOOP_LAG,
+            "cpu": cpu / MAX_CPU_PERCENT,
+            "rss": rss / MAX_RSS_MB,
+        }
+
+    def load(self, worker: Worker) -> float:
+        self.sample(worker)
+        return min(1.0, max(self.ratios().values()))
+
+    def refusal(self) -> Optional[str]:
+        """Why the next job can't be taken, or None"""
+        ratios = self.ratios()
+        ratios["sessions"] += 1 / MAX_SESSIONS  # Counting the job being offered
+        over = [f"{name}={ratio:.2f}" for name, ratio in ratios.items() if ratio > LOAD_THRESHOLD]
+        return ", ".join(over) or None
+
+    def reserve(self, job_id: str):
+        with self._lock:
+            self._reserved[job_id] = time.monotonic()
+
+
+_monitor: Optional[LoadMonitor] = None
+_monitor_lock = threading.Lock()
+
+
+def get_monitor() -> LoadMonitor:
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None:
+            _monitor = LoadMonitor()
+        return _monitor
+
+
+def load_fnc(worker: Worker) -> float:
+    """Load reported to the dispatcher, 0..1"""
+    return get_monitor().load(worker)
+
+
+async def request_fnc(req: JobRequest):
+    """Accept the job unless it would push the worker over a limit"""
+    monitor = get_monitor()
+    reason = monitor.refusal()
+    if reason:
+        logger.warning(f"[!] Rejecting job {req.id} for room {req.room.name}: {reason}")
+        await req.reject()
+        return
+    monitor.reserve(req.id)
+    await req.accept()
+
+
+def admission_options() -> dict:
+    """WorkerOptions fields for load reporting and admission (module-level
+    functions, since WorkerOptions must stay picklable)"""
+    return {"load_fnc": load_fnc, "request_fnc": request_fnc, "load_threshold": LOAD_THRESHOLD}
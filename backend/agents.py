@@ -4,10 +4,18 @@ RápidoLingo Multi-Agent System
 """
 
 import os
-import json
-from pathlib import Path
-from livekit.agents import Agent, function_tool
-from livekit.plugins import openai, silero, cartesia
+import re
+from typing import List, Optional, Tuple
+from livekit.agents import ChatContext, ChatMessage, function_tool
+from content_index import Snippet, format_snippets
+from content_library import get_library
+from handoffs import handoff
+from history import CompactingAgent
+from progress import current_learner
+from prompts import embed, get_prompts
+from providers import get_pool, get_vad
+from review import pull_review
+from tts_cache import say_cached
 
 # Import configuration first
 try:
@@ -16,19 +24,12 @@ except ImportError:
     # Fallback if config.py not found
     pass
 
-# Load Spanish content once
-CONTEXT_DIR = Path("../context")
-
-def load_context():
-    """Load all Spanish learning content"""
-    all_content = ""
-    for json_file in CONTEXT_DIR.glob("*.json"):
-        with open(json_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-            all_content += f"\n=== {json_file.stem} ===\n{content}\n"
-    return all_content
-
-SPANISH_CONTENT = load_context()
+# Spanish content from the compiled store, which the API keeps up to date with
+# context/ and job processes reopen at job start (see content_library.py).
+# Agents pull only the snippets relevant to their scenario and to each turn
+# from CONTENT.index.
+CONTENT = get_library()
+get_prompts().watch(CONTENT)  # Content-based prompts follow reloads
 
 # Base configuration - get from environment (set by config.py)
 CEREBRAS_API_KEY = os.getenv("CEREBRAS_API_KEY")
@@ -42,24 +43,71 @@ if not CARTESIA_API_KEY:
 
 os.environ["OPENAI_API_KEY"] = CEREBRAS_API_KEY  # For LiveKit OpenAI plugin
 
+#===============================================================================
+# RETRIEVAL BASE - Per-turn lesson content lookup
+#===============================================================================
+
+# Beginner phrase categories that belong to one scenario (spanish_scenarios title)
+SCENARIO_CATEGORIES = {
+    "restaurant": "Ordering at a Restaurant",
+    "food": "Ordering at a Restaurant",
+    "directions": "Asking for Directions",
+    "shopping": "Shopping at a Store",
+}
+_CATEGORY_RE = re.compile(r"\bcategory: (\w+)")
+
+class RetrievalAgent(CompactingAgent):
+    """
+    Base agent that adds the lesson snippets most relevant to each user turn
+    (history is kept within a token budget, see history.py)
+    """
+    # Scenario keywords that bias every lookup towards this agent's topic
+    retrieval_query = ""
+    retrieval_k = 4
+    # Context sources this agent draws on (None: all of them)
+    retrieval_sources: Optional[Tuple[str, ...]] = None
+    # Title of the spanish_scenarios dialogue this agent plays, if any
+    scenario = ""
+
+    @classmethod
+    def owns(cls, snippet: Snippet) -> bool:
+        """False for another scenario's dialogue, or a phrase filed under another scenario's category"""
+        if snippet.kind == "scenarios":
+            return snippet.title == cls.scenario
+        category = _CATEGORY_RE.search(snippet.text)
+        owner = SCENARIO_CATEGORIES.get(category.group(1)) if category else None
+        return owner is None or owner == cls.scenario
+
+    @classmethod
+    def retrieve(cls, query: str, k: int) -> List[Snippet]:
+        """Top-k snippets for a query, from this agent's own sources and scenario"""
+        return CONTENT.index.search(query, k=k, sources=cls.retrieval_sources, where=cls.owns)
+
+    async def on_user_turn_completed(self, turn_ctx: ChatContext, new_message: ChatMessage):
+        await super().on_user_turn_completed(turn_ctx, new_message)
+        query = f"{self.retrieval_query} {new_message.text_content or ''}"
+        snippets = self.retrieve(query, self.retrieval_k)
+        if snippets:
+            turn_ctx.add_message(
+                role="assistant",
+                content=f"Lesson content relevant to the student's last message:\n{format_snippets(snippets)}",
+            )
+
 #===============================================================================
 # TEACHER AGENT - Main Coordinator
 #===============================================================================
 
-class TeacherAgent(Agent):
+class TeacherAgent(RetrievalAgent):
     """
     Main Spanish teacher - coordinates learning and transfers to specialists
     """
-    def __init__(self):
-        llm = openai.LLM.with_cerebras(
-            model="llama-3.3-70b",
-            base_url="https://api.cerebras.ai/v1"
-        )
-        stt = cartesia.STT()
-        tts = cartesia.TTS(voice="79a125e8-cd45-4c13-8a67-188112f4dd22")  # Default female voice
-        vad = silero.VAD.load()
+    retrieval_query = "greetings introductions basic phrases common oral exam questions"
+    retrieval_sources = ("spanish_beginner", "spanish_exam_prep")
+    voice = "79a125e8-cd45-4c13-8a67-188112f4dd22"  # Default female voice
 
-        instructions = f"""
+    @classmethod
+    def build_instructions(cls) -> str:
+        return f"""
         You are Profesora López, a friendly and encouraging Spanish teacher.
         Speak naturally and clearly. All responses will be spoken aloud.
         
@@ -70,8 +118,8 @@ class TeacherAgent(Agent):
         - Transfer to specialized agents for scenarios
         - Give encouragement and learning tips
         
-        You have access to this Spanish learning content:
-        {SPANISH_CONTENT}
+        Core Spanish learning content (more is added to each turn as needed):
+        {embed(format_snippets(cls.retrieve(cls.retrieval_query, 8)))}
         
         CRITICAL RULES:
         - Speak in English when explaining concepts
@@ -81,13 +129,23 @@ class TeacherAgent(Agent):
         - Keep responses conversational and natural (no bullets or lists)
         """
 
+    def __init__(self):
+        pool = get_pool()  # Shared keep-alive clients (see providers.ProviderPool)
+        llm = pool.llm("llama-3.3-70b")
+        stt = pool.cartesia_stt()
+        tts = pool.cartesia_tts(self.voice)
+        vad = get_vad()  # Shared per-process model (see providers.prewarm)
+
         super().__init__(
-            instructions=instructions,
+            instructions=get_prompts().text(type(self)),  # Rendered once per process (see prompts.py)
             stt=stt, llm=llm, tts=tts, vad=vad
         )
 
     async def on_enter(self):
         print("Current Agent: 📚 Teacher Agent (Profesora López) 📚")
+        user_id = current_learner()
+        if user_id:  # Due review items go into the context before the greeting (see review.py)
+            await pull_review(self, user_id)
         self.session.generate_reply(
             user_input="Greet the student warmly in English. Introduce yourself as Profesora López. Ask what they'd like to practice today."
         )
@@ -95,72 +153,64 @@ class TeacherAgent(Agent):
     @function_tool
     async def transfer_to_restaurant(self):
         """Transfer to restaurant agent for dining scenario practice"""
-        await self.session.generate_reply(
+        return await handoff(RestaurantAgent, self.session.generate_reply(
             user_input="Tell the student you're transferring them to the restaurant scenario. Wish them luck!"
-        )
-        return RestaurantAgent()
+        ))
 
     @function_tool
     async def transfer_to_airport(self):
         """Transfer to airport agent for travel scenario practice"""
-        await self.session.generate_reply(
+        return await handoff(AirportAgent, self.session.generate_reply(
             user_input="Tell student you're transferring them to the airport scenario."
-        )
-        return AirportAgent()
+        ))
 
     @function_tool
     async def transfer_to_hotel(self):
         """Transfer to hotel agent for accommodation scenario practice"""
-        await self.session.generate_reply(
+        return await handoff(HotelAgent, self.session.generate_reply(
             user_input="Tell student you're transferring them to the hotel scenario."
-        )
-        return HotelAgent()
+        ))
 
     @function_tool
     async def transfer_to_directions(self):
         """Transfer to directions agent for navigation practice"""
-        await self.session.generate_reply(
+        return await handoff(DirectionsAgent, self.session.generate_reply(
             user_input="Tell student you're transferring them to directions practice."
-        )
-        return DirectionsAgent()
+        ))
 
     @function_tool
     async def transfer_to_social(self):
         """Transfer to social agent for casual conversation practice"""
-        await self.session.generate_reply(
+        return await handoff(SocialAgent, self.session.generate_reply(
             user_input="Tell student you're transferring them to social conversation practice."
-        )
-        return SocialAgent()
+        ))
 
 #===============================================================================
 # RESTAURANT AGENT - Waiter/Server
 #===============================================================================
 
-class RestaurantAgent(Agent):
+class RestaurantAgent(RetrievalAgent):
     """
     Restaurant waiter - practices ordering food, asking for menu items
     """
-    def __init__(self):
-        llm = openai.LLM.with_cerebras(
-            model="llama-3.3-70b",
-            base_url="https://api.cerebras.ai/v1"
+    retrieval_query = "restaurant waiter menu order food table check mesa cuenta"
+    retrieval_sources = ("spanish_scenarios", "spanish_beginner")
+    scenario = "Ordering at a Restaurant"
+    voice = "a0e99841-438c-4a64-b679-ae501e7d6091"  # Different voice for variety
+    greeting = "¡Buenas tardes! Bienvenido a nuestro restaurante. ¿Mesa para cuántas personas?"
+    farewell = "¡Muy bien! Has practicado muy bien. Regresando a la profesora López."
+
+    @classmethod
+    def build_instructions(cls) -> str:
+        # Restaurant scenarios, fetched by item ID from the compiled store
+        store = CONTENT.store
+        restaurant_content = "\n".join(
+            store.get(f"item:{snippet.id}").decode("utf-8")
+            for snippet in store.snippets("spanish_scenarios")
+            if snippet.kind == "scenarios" and snippet.title == cls.scenario
         )
-        stt = cartesia.STT()
-        tts = cartesia.TTS(voice="a0e99841-438c-4a64-b679-ae501e7d6091")  # Different voice for variety
-        vad = silero.VAD.load()
-
-        # Load restaurant scenario content
-        restaurant_content = ""
-        try:
-            with open(CONTEXT_DIR / "spanish_scenarios.json", 'r', encoding='utf-8') as f:
-                scenarios = json.load(f)
-                for scenario in scenarios.get("scenarios", []):
-                    if "restaurant" in scenario.get("title", "").lower():
-                        restaurant_content += json.dumps(scenario, indent=2)
-        except:
-            pass
-
-        instructions = f"""
+
+        return f"""
         You are María, a friendly Spanish restaurant server.
         Conduct the entire conversation IN SPANISH only.
         
@@ -175,7 +225,7 @@ class RestaurantAgent(Agent):
         - Bring the check when asked
         
         Restaurant context and phrases:
-        {restaurant_content}
+        {embed(restaurant_content)}
         
         IMPORTANT:
         - Speak ONLY in Spanish
@@ -186,37 +236,43 @@ class RestaurantAgent(Agent):
         - No English unless student explicitly asks for translation
         """
 
+    def __init__(self):
+        pool = get_pool()
+        llm = pool.llm("llama-3.3-70b")
+        stt = pool.cartesia_stt()
+        tts = pool.cartesia_tts(self.voice)
+        vad = get_vad()
+
         super().__init__(
-            instructions=instructions,
+            instructions=get_prompts().text(type(self)),
             stt=stt, llm=llm, tts=tts, vad=vad
         )
 
     async def on_enter(self):
         print("Current Agent: 🍽️ Restaurant Agent (María) 🍽️")
-        await self.session.say("¡Buenas tardes! Bienvenido a nuestro restaurante. ¿Mesa para cuántas personas?")
+        await say_cached(self, self.greeting, self.voice)
 
     @function_tool
     async def return_to_teacher(self):
         """Return to main teacher agent"""
-        await self.session.say("¡Muy bien! Has practicado muy bien. Regresando a la profesora López.")
-        return TeacherAgent()
+        return await handoff(TeacherAgent, say_cached(self, self.farewell, self.voice))
 
 #===============================================================================
 # AIRPORT AGENT - Airline Staff
 #===============================================================================
 
-class AirportAgent(Agent):
+class AirportAgent(RetrievalAgent):
     """Airport check-in agent - practices travel scenarios"""
-    def __init__(self):
-        llm = openai.LLM.with_cerebras(
-            model="llama-3.3-70b",
-            base_url="https://api.cerebras.ai/v1"
-        )
-        stt = cartesia.STT()
-        tts = cartesia.TTS(voice="248be419-c632-4f23-adf1-5324ed7dbf1d")  # Professional voice
-        vad = silero.VAD.load()
-
-        instructions = f"""
+    retrieval_query = "airport passport luggage suitcase boarding gate flight pasaporte equipaje maleta"
+    retrieval_sources = ("spanish_scenarios", "spanish_beginner")
+    scenario = "At the Airport"
+    voice = "248be419-c632-4f23-adf1-5324ed7dbf1d"  # Professional voice
+    greeting = "Buenos días. Su pasaporte, por favor."
+    farewell = "¡Buen viaje! Regresando a la profesora."
+
+    @classmethod
+    def build_instructions(cls) -> str:
+        return f"""
         You are Carlos, a professional airport check-in agent.
         Conduct conversation IN SPANISH only.
         
@@ -228,7 +284,8 @@ class AirportAgent(Agent):
         - Issue boarding passes
         - Give gate information
         
-        Use Spanish content: {SPANISH_CONTENT[:2000]}
+        Use Spanish content:
+        {embed(format_snippets(cls.retrieve(cls.retrieval_query, 3)))}
         
         IMPORTANT:
         - Speak ONLY in Spanish
@@ -237,37 +294,43 @@ class AirportAgent(Agent):
         - Speak clearly for language learners
         """
 
+    def __init__(self):
+        pool = get_pool()
+        llm = pool.llm("llama-3.3-70b")
+        stt = pool.cartesia_stt()
+        tts = pool.cartesia_tts(self.voice)
+        vad = get_vad()
+
         super().__init__(
-            instructions=instructions,
+            instructions=get_prompts().text(type(self)),
             stt=stt, llm=llm, tts=tts, vad=vad
         )
 
     async def on_enter(self):
         print("Current Agent: ✈️ Airport Agent (Carlos) ✈️")
-        await self.session.say("Buenos días. Su pasaporte, por favor.")
+        await say_cached(self, self.greeting, self.voice)
 
     @function_tool
     async def return_to_teacher(self):
         """Return to main teacher"""
-        await self.session.say("¡Buen viaje! Regresando a la profesora.")
-        return TeacherAgent()
+        return await handoff(TeacherAgent, say_cached(self, self.farewell, self.voice))
 
 #===============================================================================
 # HOTEL AGENT - Receptionist
 #===============================================================================
 
-class HotelAgent(Agent):
+class HotelAgent(RetrievalAgent):
     """Hotel receptionist - practices accommodation scenarios"""
-    def __init__(self):
-        llm = openai.LLM.with_cerebras(
-            model="llama-3.3-70b",
-            base_url="https://api.cerebras.ai/v1"
-        )
-        stt = cartesia.STT()
-        tts = cartesia.TTS(voice="156fb8d2-335b-4950-9cb3-a2d33befec77")  # Friendly female voice
-        vad = silero.VAD.load()
-
-        instructions = f"""
+    retrieval_query = "hotel reservation room key breakfast reserva habitación"
+    retrieval_sources = ("spanish_scenarios", "spanish_beginner")
+    scenario = "Checking into a Hotel"
+    voice = "156fb8d2-335b-4950-9cb3-a2d33befec77"  # Friendly female voice
+    greeting = "¡Bienvenido! ¿Tiene una reserva?"
+    farewell = "¡Que disfrute su estancia! Regresando a la profesora."
+
+    @classmethod
+    def build_instructions(cls) -> str:
+        return f"""
         You are Sofia, a helpful hotel receptionist.
         Conduct conversation IN SPANISH only.
         
@@ -287,37 +350,43 @@ class HotelAgent(Agent):
         - Speak clearly
         """
 
+    def __init__(self):
+        pool = get_pool()
+        llm = pool.llm("llama-3.3-70b")
+        stt = pool.cartesia_stt()
+        tts = pool.cartesia_tts(self.voice)
+        vad = get_vad()
+
         super().__init__(
-            instructions=instructions,
+            instructions=get_prompts().text(type(self)),
             stt=stt, llm=llm, tts=tts, vad=vad
         )
 
     async def on_enter(self):
         print("Current Agent: 🏨 Hotel Agent (Sofia) 🏨")
-        await self.session.say("¡Bienvenido! ¿Tiene una reserva?")
+        await say_cached(self, self.greeting, self.voice)
 
     @function_tool
     async def return_to_teacher(self):
         """Return to teacher"""
-        await self.session.say("¡Que disfrute su estancia! Regresando a la profesora.")
-        return TeacherAgent()
+        return await handoff(TeacherAgent, say_cached(self, self.farewell, self.voice))
 
 #===============================================================================
 # DIRECTIONS AGENT - Helpful Local
 #===============================================================================
 
-class DirectionsAgent(Agent):
+class DirectionsAgent(RetrievalAgent):
     """Local helper - practices asking for and giving directions"""
-    def __init__(self):
-        llm = openai.LLM.with_cerebras(
-            model="llama-3.3-70b",
-            base_url="https://api.cerebras.ai/v1"
-        )
-        stt = cartesia.STT()
-        tts = cartesia.TTS(voice="87748186-23bb-4158-a1eb-332911b0b708")  # Casual male voice
-        vad = silero.VAD.load()
-
-        instructions = f"""
+    retrieval_query = "asking directions street left right straight derecha izquierda recto"
+    retrieval_sources = ("spanish_scenarios", "spanish_beginner")
+    scenario = "Asking for Directions"
+    voice = "87748186-23bb-4158-a1eb-332911b0b708"  # Casual male voice
+    greeting = "Hola! Claro, te puedo ayudar. ¿Qué estás buscando?"
+    farewell = "¡Buen viaje! Regresando a la profesora."
+
+    @classmethod
+    def build_instructions(cls) -> str:
+        return f"""
         You are Miguel, a friendly local person helping tourists.
         Conduct conversation IN SPANISH only.
         
@@ -336,37 +405,42 @@ class DirectionsAgent(Agent):
         - Use directional vocabulary: derecha, izquierda, recto
         """
 
+    def __init__(self):
+        pool = get_pool()
+        llm = pool.llm("llama-3.3-70b")
+        stt = pool.cartesia_stt()
+        tts = pool.cartesia_tts(self.voice)
+        vad = get_vad()
+
         super().__init__(
-            instructions=instructions,
+            instructions=get_prompts().text(type(self)),
             stt=stt, llm=llm, tts=tts, vad=vad
         )
 
     async def on_enter(self):
         print("Current Agent: 🗺️ Directions Agent (Miguel) 🗺️")
-        await self.session.say("Hola! Claro, te puedo ayudar. ¿Qué estás buscando?")
+        await say_cached(self, self.greeting, self.voice)
 
     @function_tool
     async def return_to_teacher(self):
         """Return to teacher"""
-        await self.session.say("¡Buen viaje! Regresando a la profesora.")
-        return TeacherAgent()
+        return await handoff(TeacherAgent, say_cached(self, self.farewell, self.voice))
 
 #===============================================================================
 # SOCIAL AGENT - Conversation Partner
 #===============================================================================
 
-class SocialAgent(Agent):
+class SocialAgent(RetrievalAgent):
     """Casual friend - practices social conversations"""
-    def __init__(self):
-        llm = openai.LLM.with_cerebras(
-            model="llama-3.3-70b",
-            base_url="https://api.cerebras.ai/v1"
-        )
-        stt = cartesia.STT()
-        tts = cartesia.TTS(voice="2ee87190-8f84-4925-97da-e52547f9462c")  # Friendly voice
-        vad = silero.VAD.load()
-
-        instructions = f"""
+    retrieval_query = "meeting someone new small talk hobbies weather plans friends party"
+    retrieval_sources = ("spanish_social", "spanish_beginner")
+    voice = "2ee87190-8f84-4925-97da-e52547f9462c"  # Friendly voice
+    greeting = "¡Hola! ¿Qué tal? Me llamo Ana. ¿Cómo te llamas?"
+    farewell = "¡Fue un placer conocerte! Regresando a la profesora."
+
+    @classmethod
+    def build_instructions(cls) -> str:
+        return f"""
         You are Ana, a friendly Spanish speaker looking to make friends.
         Conduct conversation IN SPANISH only.
         
@@ -379,7 +453,8 @@ class SocialAgent(Agent):
         - Be friendly and conversational
         - Make plans to meet up
         
-        Social content: {SPANISH_CONTENT[:2000]}
+        Social content:
+        {embed(format_snippets(cls.retrieve(cls.retrieval_query, 3)))}
         
         IMPORTANT:
         - Speak ONLY in Spanish
@@ -389,18 +464,29 @@ class SocialAgent(Agent):
         - Keep conversation flowing naturally
         """
 
+    def __init__(self):
+        pool = get_pool()
+        llm = pool.llm("llama-3.3-70b")
+        stt = pool.cartesia_stt()
+        tts = pool.cartesia_tts(self.voice)
+        vad = get_vad()
+
         super().__init__(
-            instructions=instructions,
+            instructions=get_prompts().text(type(self)),
             stt=stt, llm=llm, tts=tts, vad=vad
         )
 
     async def on_enter(self):
         print("Current Agent: 👥 Social Agent (Ana) 👥")
-        await self.session.say("¡Hola! ¿Qué tal? Me llamo Ana. ¿Cómo te llamas?")
+        await say_cached(self, self.greeting, self.voice)
 
     @function_tool
     async def return_to_teacher(self):
         """Return to teacher"""
-        await self.session.say("¡Fue un placer conocerte! Regresando a la profesora.")
-        return TeacherAgent()
+        return await handoff(TeacherAgent, say_cached(self, self.farewell, self.voice))
+
 
+def fixed_utterances():
+    """(voice, text) for every constant line an agent speaks - see tts_cache.py"""
+    specialists = [RestaurantAgent, AirportAgent, HotelAgent, DirectionsAgent, SocialAgent]
+    return [(cls.voice, text) for cls in specialists for text in (cls.greeting, cls.farewell)]
@@ -0,0 +1,231 @@
+"""
+RápidoLingo agent pipeline benchmark
+Runs the working_agent.py agent classes against local stub providers (see
+stub_providers.py) - no network, no credentials - and reports how much time
+our code and the agent framework add on top of the simulated provider latency:
+
+- agent_init:        building an agent (prompt construction, provider lookups)
+- session_start:     AgentSession.start() returning
+- first_audio_live:  start() to first opening audio, opening generated live
+- first_audio_pooled: start() to first opening audio, opening from the pool
+- turn:              user input to first reply audio
+- handoff:           update_agent() to the new agent's first audio
+
+"floor" is the stub provider latency a stage can't go below; "overhead" is
+what's left. Compare the JSON output across commits to catch regressions.
+
+Usage:
+    python bench_pipeline.py [-n 10] [--llm-ttft-ms 150] [--llm-tps 400]
+                             [--tts-ttfb-ms 80] [--json results.json]
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+from dataclasses import asdict
+from typing import Dict, List
+
+# Everything stays local: dummy credentials, scratch caches
+_scratch = tempfile.mkdtemp(prefix="rapidolingo-bench-")
+for _name, _value in {
+    "CEREBRAS_API_KEY": "bench",
+    "CARTESIA_API_KEY": "bench",
+    "DEEPGRAM_API_KEY": "bench",
+    "LIVEKIT_API_KEY": "bench",
+    "LIVEKIT_API_SECRET": "bench",
+}.items():
+    os.environ.setdefault(_name, _value)
+os.environ["OPENINGS_DIR"] = os.path.join(_scratch, "openings")
+os.environ["TTS_CACHE_DIR"] = os.path.join(_scratch, "tts_cache")
+os.environ["METRICS_DIR"] = os.path.join(_scratch, "metrics")
+
+from livekit.agents import AgentSession  # noqa: E402
+
+import working_agent  # noqa: E402
+from opening_pool import get_opening_pool  # noqa: E402
+from providers import get_vad  # noqa: E402
+from stub_providers import (  # noqa: E402
+    STUB_TRANSCRIPT, NullAudioOutput, StubLatency, StubLLMServer, install_stub_pool,
+)
+
+FIRST_AUDIO_TIMEOUT = 30.0
+
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def summarize(samples: List[float], floor: float = 0.0) -> Dict[str, float]:
+    """Percentiles in ms; overhead is the time above the provider floor"""
+    ms = [s * 1000 for s in samples]
+    return {
+        "n": len(ms),
+        "p50": round(percentile(ms, 50), 2),
+        "p95": round(percentile(ms, 95), 2),
+        "max": round(max(ms, default=0.0), 2),
+        "floor": round(floor * 1000, 2),
+        "overhead_p50": round(percentile(ms, 50) - floor * 1000, 2),
+    }
+
+
+async def _first_audio(sink: NullAudioOutput, started: float) -> float:
+    await asyncio.wait_for(sink.first_frame.wait(), FIRST_AUDIO_TIMEOUT)
+    return sink.first_frame_at - started
+
+
+async def _settle(session: AgentSession):
+    """Wait until the agent has nothing left to say (interrupting a speech that's
+    done but not yet retired by the scheduler never resolves)"""
+    await asyncio.sleep(0)
+    while (speech := session.current_speech) is not None:
+        await speech.wait_for_playout()
+        await asyncio.sleep(0.01)
+
+
+async def _start_session(agent_class, sink: NullAudioOutput):
+    session = AgentSession()
+    session.output.audio = sink
+    agent = agent_class()
+    started = time.perf_counter()
+    await session.start(agent)
+    return session, started, time.perf_counter() - started
+
+
+async def run(args) -> Dict:
+    latency = StubLatency(
+        llm_ttft=args.llm_ttft_ms / 1000,
+        llm_tokens_per_second=args.llm_tps,
+        tts_ttfb=args.tts_ttfb_ms / 1000,
+    )
+    server = StubLLMServer(latency)
+    await server.start()
+    pool = install_stub_pool(latency, server.base_url)
+    openings = get_opening_pool()
+    live_floor = latency.llm_first_sentence() + latency.tts_ttfb
+    n = args.iterations
+    results: Dict[str, Dict] = {}
+
+    try:
+        started = time.perf_counter()
+        get_vad()
+        results["vad_load"] = summarize([time.perf_counter() - started])
+
+        for lesson_id, agent_class in working_agent.AGENT_CLASSES.items():
+            agent_class()  # First build creates the pooled clients
+            samples = []
+            for _ in range(n):
+                started = time.perf_counter()
+                agent_class()
+                samples.append(time.perf_counter() - started)
+            results[f"agent_init[{lesson_id}]"] = summarize(samples)
+
+        lesson_id = args.lesson
+        agent_class = working_agent.AGENT_CLASSES[lesson_id]
+        config = working_agent.AGENT_CONFIGS[lesson_id]
+
+        # Openings generated live: pool disabled. The first session pays
+        # one-time framework setup, so it isn't counted
+        openings.size = 0
+        start_samples, audio_samples = [], []
+        for i in range(n + 1):
+            sink = NullAudioOutput()
+            session, started, start_time = await _start_session(agent_class, sink)
+            first_audio = await _first_audio(sink, started)
+            if i:
+                audio_samples.append(first_audio)
+                start_samples.append(start_time)
+            await _settle(session)
+            await session.aclose()
+        results["session_start"] = summarize(start_samples)
+        results["first_audio_live"] = summarize(audio_samples, live_floor)
+
+        # Openings from a filled pool
+        openings.size, openings.max_uses = 1, n + 1
+        openings.refill(lesson_id, agent_class(), config["initial_prompt"], config["voice"])
+        await openings._refills[lesson_id]
+        audio_samples = []
+        for _ in range(n):
+            sink = NullAudioOutput()
+            session, started, _ = await _start_session(agent_class, sink)
+            audio_samples.append(await _first_audio(sink, started))
+            await _settle(session)
+            await session.aclose()
+        results["first_audio_pooled"] = summarize(audio_samples)
+        openings.size = 0
+
+        # Turns and handoffs within one session
+        sink = NullAudioOutput()
+        session, _, _ = await _start_session(agent_class, sink)
+        await _first_audio(sink, 0.0)
+        await _settle(session)
+        turn_samples = []
+        for _ in range(n):
+            sink.reset()
+            started = time.perf_counter()
+            result = session.run(user_input=STUB_TRANSCRIPT)
+            turn_samples.append(await _first_audio(sink, started))
+            await result
+        results["turn"] = summarize(turn_samples, live_floor)
+
+        handoff_samples = []
+        targets = [c for l, c in working_agent.AGENT_CLASSES.items() if l != lesson_id]
+        for i in range(n):
+            target = targets[i % len(targets)]()
+            sink.reset()
+            started = time.perf_counter()
+            session.update_agent(target)
+            handoff_samples.append(await _first_audio(sink, started))
+            await _settle(session)
+        results["handoff"] = summarize(handoff_samples, live_floor)
+        await session.aclose()
+    finally:
+        await pool.aclose()
+        await server.aclose()
+
+    return {
+        "lesson": args.lesson,
+        "iterations": n,
+        "latency": asdict(latency),
+        "llm_requests": server.requests,
+        "stages": results,
+    }
+
+
+def print_report(report: Dict):
+    print("=" * 78)
+    print(f"Pipeline benchmark - lesson={report['lesson']} n={report['iterations']} stubs={report['latency']}")
+    print("=" * 78)
+    print(f"{'stage':<28}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}{'floor':>9}{'overhead':>10}")
+    for stage, s in report["stages"].items():
+        print(f"{stage:<28}{s['p50']:>9.1f}{s['p95']:>9.1f}{s['max']:>9.1f}{s['floor']:>9.1f}{s['overhead_p50']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline agent pipeline benchmark")
+    parser.add_argument("-n", "--iterations", type=int, default=10)
+    parser.add_argument("--lesson", default="restaurant", choices=sorted(working_agent.AGENT_CLASSES))
+    parser.add_argument("--llm-ttft-ms", type=float, default=150.0)
+    parser.add_argument("--llm-tps", type=float, default=400.0, help="stub LLM tokens per second")
+    parser.add_argument("--tts-ttfb-ms", type=float, default=80.0)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[✓] Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""
+RápidoLingo content retrieval index
+Splits the context JSON into small snippets (phrases, dialogues, vocabulary,
+exam questions) and serves the top-k for a query from an in-process inverted
+index with accent folding, so prompts only carry what the turn needs.
+"""
+
+import math
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Words too common to say anything about relevance (English + Spanish)
+STOPWORDS = frozenset("""
+a al an and are as at be but by de del do el en es for from how i in is it la las
+lo los me mi my no of on or para por que se si su the to tu un una uno unos unas
+what y yo you your
+""".split())
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Title words count this many times towards term frequency
+TITLE_WEIGHT = 3
+
+_TOKEN_RE = re.compile(r"[a-z0-9ñ]+")
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip accents, keeping ñ (cómo -> como, ¿Qué? -> ¿que?)"""
+    text = text.lower().replace("ñ", "\0")
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return stripped.replace("\0", "ñ")
+
+
+def tokenize(text: str) -> List[str]:
+    """Accent-folded index terms for a piece of text"""
+    return [t for t in _TOKEN_RE.findall(fold(text)) if len(t) > 1 and t not in STOPWORDS]
+
+
+@dataclass(frozen=True)
+class Snippet:
+    """One retrievable piece of lesson content"""
+    id: str
+    source: str
+    kind: str
+    title: str
+    text: str
+
+
+def _render(value) -> str:
+    """Compact, prompt-friendly text for a JSON value (no braces or quotes)"""
+    if isinstance(value, dict):
+        if "speaker" in value and "spanish" in value:
+            english = f" ({value['english']})" if value.get("english") else ""
+            return f"{value['speaker']}: {value['spanish']}{english}"
+        return "; ".join(f"{k}: {_render(v)}" for k, v in value.items() if k != "title")
+    if isinstance(value, list):
+        if all(isinstance(v, dict) for v in value):
+            return " | ".join(_render(v) for v in value)
+        return ", ".join(_render(v) for v in value)
+    return str(value)
+
+
+def iter_items(source: str, document) -> Iterator[Tuple[Snippet, object]]:
+    """
+    Walk a context document and cut it into snippets, yielding each with the
+    JSON value it was rendered from.
+    Every dict inside a list (a phrase, a dialogue, an exam question) becomes one
+    snippet; flat dicts and lists of strings are kept whole.
+    """
+    def item(path: Tuple, kind: str, value):
+        title = value.get("title", "") if isinstance(value, dict) else ""
+        snippet_id = "/".join([source, *map(str, path)])
+        return Snippet(snippet_id, source, kind, title, _render(value)), value
+
+    def walk(node, path: Tuple, kind: str):
+        if isinstance(node, list):
+            if node and all(isinstance(entry, dict) for entry in node):
+                for i, entry in enumerate(node):
+                    yield item(path + (i,), kind, entry)
+            elif node:
+                yield item(path, kind, node)
+        elif isinstance(node, dict):
+            if all(not isinstance(v, (dict, list)) for v in node.values()):
+                yield item(path, kind, node)
+                return
+            for key, value in node.items():
+                yield from walk(value, path + (key,), key)
+        elif node not in (None, ""):
+            yield item(path, kind, node)
+
+    yield from walk(document, (), source)
+
+
+def extract_snippets(source: str, document) -> List[Snippet]:
+    """All snippets of one context document"""
+    return [snippet for snippet, _ in iter_items(source, document)]
+
+
+@dataclass
+class Segment:
+    """Index over the snippets of one context file"""
+    source: str
+    snippets: List[Snippet]
+    postings: Dict[str, List[Tuple[int, int]]] = field(default_factory=dict)
+    lengths: List[int] = field(default_factory=list)
+
+    @classmethod
+    def build(cls, source: str, document) -> "Segment":
+        return cls.from_snippets(source, extract_snippets(source, document))
+
+    @classmethod
+    def from_snippets(cls, source: str, snippets: List[Snippet]) -> "Segment":
+        segment = cls(source, snippets)
+        for i, snippet in enumerate(segment.snippets):
+            terms = tokenize(snippet.text) + tokenize(snippet.title) * TITLE_WEIGHT
+            counts: Dict[str, int] = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, tf in counts.items():
+                segment.postings.setdefault(term, []).append((i, tf))
+            segment.lengths.append(len(terms))
+        return segment
+
+
+class ContentIndex:
+    """
+    BM25 inverted index over all context snippets, one segment per source file.
+    Instances are never mutated after construction - with_source/without_source
+    return a new index that shares every untouched segment.
+    """
+
+    def __init__(self, segments: Optional[Dict[str, Segment]] = None):
+        self._segments: Dict[str, Segment] = dict(segments or {})
+        self._by_id = {s.id: s for seg in self._segments.values() for s in seg.snippets}
+        self._total = sum(len(seg.snippets) for seg in self._segments.values())
+        total_length = sum(sum(seg.lengths) for seg in self._segments.values())
+        self._avg_length = total_length / self._total if self._total else 0.0
+
+    @classmethod
+    def from_documents(cls, documents: Dict[str, object]) -> "ContentIndex":
+        return cls({name: Segment.build(name, doc) for name, doc in documents.items()})
+
+    @classmethod
+    def from_snippets(cls, snippets: Dict[str, List[Snippet]]) -> "ContentIndex":
+        """Index pre-extracted snippets, e.g. straight from the compiled store"""
+        return cls({name: Segment.from_snippets(name, items) for name, items in snippets.items()})
+
+    def with_source(self, source: str, document) -> "ContentIndex":
+        """New index with one source (re)indexed"""
+        segments = dict(self._segments)
+        segments[source] = Segment.build(source, document)
+        return ContentIndex(segments)
+
+    def without_source(self, source: str) -> "ContentIndex":
+        """New index with one source dropped"""
+        segments = {name: seg for name, seg in self._segments.items() if name != source}
+        return ContentIndex(segments)
+
+    @property
+    def sources(self) -> List[str]:
+        return list(self._segments)
+
+    def __len__(self) -> int:
+        return self._total
+
+    def get(self, snippet_id: str) -> Optional[Snippet]:
+        return self._by_id.get(snippet_id)
+
+    def search(
+        self,
+        query: str,
+        k: int = 5,
+        sources: Optional[Iterable[str]] = None,
+        kinds: Optional[Iterable[str]] = None,
+        where: Optional[Callable[[Snippet], bool]] = None,
+    ) -> List[Snippet]:
+        """Top-k snippets for a query, optionally limited to some sources or kinds, or by a predicate"""
+        terms = set(tokenize(query))
+        if not terms or not self._total:
+            return []
+        sources = set(sources) if sources is not None else None
+        segments = [
+            seg for name, seg in self._segments.items()
+            if sources is None or name in sources
+        ]
+        kinds = set(kinds) if kinds is not None else None
+
+        scores: Dict[Tuple[int, int], float] = {}
+        for term in terms:
+            # Document frequency is global so scores compare across segments
+            df = sum(len(seg.postings.get(term, ())) for seg in self._segments.values())
+            if not df:
+                continue
+            idf = math.log(1 + (self._total - df + 0.5) / (df + 0.5))
+            for seg_no, seg in enumerate(segments):
+                for i, tf in seg.postings.get(term, ()):
+                    norm = K1 * (1 - B + B * seg.lengths[i] / self._avg_length)
+                    key = (seg_no, i)
+                    scores[key] = scores.get(key, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        results = []
+        for (seg_no, i), _ in ranked:
+            snippet = segments[seg_no].snippets[i]
+            if (kinds is None or snippet.kind in kinds) and (where is None or where(snippet)):
+                results.append(snippet)
+                if len(results) == k:
+                    break
+        return results
+
+
+def format_snippets(snippets: Iterable[Snippet]) -> str:
+    """Render snippets as prompt lines"""
+    lines = []
+    for snippet in snippets:
+        label = f"{snippet.kind}: {snippet.title}" if snippet.title else snippet.kind
+        lines.append(f"- [{label}] {snippet.text}")
+    return "\n".join(lines)
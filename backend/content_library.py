@@ -0,0 +1,148 @@
+"""
+RápidoLingo hot-reloadable content library
+Holds the compiled content store and retrieval index behind one reference that
+is swapped atomically when files under context/ change. Only changed files are
+re-parsed and re-indexed; live sessions keep running on the old snapshot until
+their next lookup.
+
+One process builds: the API calls get_library(watch=True), which watches
+context/ and compiles the store when it changes. Agent job processes call
+get_library() and only reopen the pack CURRENT names (refresh() at job start);
+they compile only if nothing has been compiled yet.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from content_index import ContentIndex
+from content_store import (
+    CONTEXT_DIR, STORE_DIR, ContentStore, current_pack, open_current, open_store, scan_sources, update_store,
+)
+
+logger = logging.getLogger("rapidolingo")
+
+# Seconds between checks of the context directory
+WATCH_INTERVAL = 2.0
+
+
+@dataclass(frozen=True)
+class ContentSnapshot:
+    """One consistent version of the content - never mutated after creation"""
+    version: int
+    store: ContentStore
+    index: ContentIndex
+
+
+class ContentLibrary:
+    """
+    Current content snapshot plus the machinery to reload it.
+    Readers grab `library.store` / `library.index` (or `snapshot()` when they
+    need both from the same version); reloads never block them.
+    """
+
+    def __init__(self, context_dir: Path = CONTEXT_DIR, store_dir: Path = STORE_DIR, build: bool = True):
+        self.context_dir = context_dir
+        self.store_dir = store_dir
+        self.build = build  # Compile changed context files, or just follow CURRENT
+        store = (open_current(store_dir) if not build else None) or open_store(context_dir, store_dir)
+        self._snapshot = ContentSnapshot(1, store, store.build_index())
+        self._listeners: List[Callable[[ContentSnapshot, List[str]], None]] = []
+        self._reload_lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def snapshot(self) -> ContentSnapshot:
+        return self._snapshot
+
+    @property
+    def store(self) -> ContentStore:
+        return self._snapshot.store
+
+    @property
+    def index(self) -> ContentIndex:
+        return self._snapshot.index
+
+    def on_reload(self, callback: Callable[[ContentSnapshot, List[str]], None]):
+        """Call `callback(snapshot, changed_sources)` after every successful reload"""
+        self._listeners.append(callback)
+
+    def refresh(self) -> List[str]:
+        """Pick up changed content; returns the sources that changed or were removed"""
+        with self._reload_lock:
+            current = self._snapshot
+            if self.build:
+                store, changed, removed = update_store(current.store, self.context_dir, self.store_dir)
+                if store is current.store:
+                    return []
+                # Re-index only what changed; untouched segments are shared
+                index = current.index
+                for source in removed:
+                    index = index.without_source(source)
+                for source, document in changed.items():
+                    index = index.with_source(source, document)
+                sources = sorted([*changed, *removed])
+            else:
+                if current_pack(self.store_dir) in (None, current.store.path):
+                    return []
+                store = open_current(self.store_dir)
+                if store is None:
+                    return []
+                index = store.build_index()
+                old, new = current.store.sources, store.sources
+                sources = sorted({*old, *new} - {s for s in old if old[s] == new.get(s)})
+
+            snapshot = ContentSnapshot(current.version + 1, store, index)
+            self._snapshot = snapshot  # Atomic swap - readers see old or new, never half
+
+        logger.info(f"Content reloaded (v{snapshot.version}): {', '.join(sources)}")
+        for callback in self._listeners:
+            try:
+                callback(snapshot, sources)
+            except Exception:
+                logger.exception("Content reload listener failed")
+        return sources
+
+    def watch(self, interval: float = WATCH_INTERVAL):
+        """Start a background thread that recompiles and reloads whenever context files change"""
+        if self._watcher is not None:
+            return
+        self.build = True
+        self._watcher = threading.Thread(
+            target=self._watch_loop, args=(interval,), name="content-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch_loop(self, interval: float):
+        seen: Dict[str, Dict[str, int]] = self.store.sources
+        while not self._stop.wait(interval):
+            try:
+                signatures = scan_sources(self.context_dir)
+                if signatures == seen:
+                    continue
+                self.refresh()
+                seen = signatures
+            except Exception as e:
+                # Usually a file caught mid-save; the next tick retries it
+                logger.warning(f"Content reload failed, keeping v{self._snapshot.version}: {e}")
+
+
+_library: Optional[ContentLibrary] = None
+_library_lock = threading.Lock()
+
+
+def get_library(watch: bool = False) -> ContentLibrary:
+    """Process-wide content library; watch=True makes this process the one that watches context/ and compiles"""
+    global _library
+    if _library is None:
+        with _library_lock:
+            if _library is None:
+                _library = ContentLibrary(build=watch)
+    if watch:
+        _library.watch()
+    return _library
@@ -0,0 +1,309 @@
+"""
+RápidoLingo compiled content store
+Compiles context/*.json into one packed, memory-mapped file so API processes and
+agent workers start without parsing JSON, share pages through the OS cache, and
+fetch single documents or items by ID.
+
+Build step:
+    python content_store.py            # compile ../context into ../build/content
+    python content_store.py --check    # exit 1 if the compiled store is stale
+
+Pack layout (little endian):
+    header   magic "RLPK", version u32, entry count u32, key blob size u32
+    table    count x (key offset u32, key length u16, pad u16, value offset u64, value length u32),
+             sorted by key so lookups are a binary search over the mapped file
+    keys     concatenated UTF-8 keys
+    values   concatenated UTF-8 JSON values
+
+Keys:
+    meta:sources        {file stem: {mtime_ns, size}} for staleness checks
+    doc:<stem>          a whole context document, compact JSON
+    item:<snippet id>   the raw JSON of one phrase/dialogue/question
+    snip:<snippet id>   [kind, title, text] of the matching retrieval snippet
+"""
+
+import os
+import sys
+import json
+import mmap
+import time
+import uuid
+import fcntl
+import struct
+import hashlib
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from content_index import ContentIndex, Snippet, iter_items
+
+CONTEXT_DIR = Path("../context")
+STORE_DIR = Path("../build/content")
+
+MAGIC = b"RLPK"
+VERSION = 1
+_HEADER = struct.Struct("<4sIII")
+_ENTRY = struct.Struct("<IHHQI")
+
+# Pack files are named by content hash; CURRENT names the live one. Readers
+# keep their old mapping until they reopen, and nothing mapped is overwritten.
+# Writers (the API, or any process that finds the store stale) take LOCK_FILE,
+# and a replaced pack stays on disk for PACK_GRACE seconds so processes that
+# just read CURRENT can still open it.
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = ".lock"
+PACK_GRACE = float(os.getenv("CONTENT_PACK_GRACE", 600))
+
+# Attempts at opening the pack CURRENT names before recompiling
+OPEN_ATTEMPTS = 3
+
+
+def _dumps(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def source_signature(json_file: Path) -> Dict[str, int]:
+    """Cheap change marker for one context file"""
+    stat = json_file.stat()
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def scan_sources(context_dir: Path = CONTEXT_DIR) -> Dict[str, Dict[str, int]]:
+    """Signatures of every context file currently on disk"""
+    return {f.stem: source_signature(f) for f in sorted(context_dir.glob("*.json"))}
+
+
+def document_entries(stem: str, document) -> List[Tuple[str, bytes]]:
+    """All pack entries contributed by one context document"""
+    entries = [(f"doc:{stem}", _dumps(document))]
+    for snippet, value in iter_items(stem, document):
+        entries.append((f"item:{snippet.id}", _dumps(value)))
+        entries.append((f"snip:{snippet.id}", _dumps([snippet.kind, snippet.title, snippet.text])))
+    return entries
+
+
+def write_pack(entries: Dict[str, bytes], store_dir: Path = STORE_DIR) -> Path:
+    """Write entries to a new pack file and point CURRENT at it"""
+    keys = sorted(entries)
+    encoded = [k.encode("utf-8") for k in keys]
+    key_blob = b"".join(encoded)
+    values_start = _HEADER.size + _ENTRY.size * len(keys) + len(key_blob)
+
+    table = bytearray()
+    key_offset = 0
+    value_offset = values_start
+    for key, raw_key in zip(keys, encoded):
+        value = entries[key]
+        table += _ENTRY.pack(key_offset, len(raw_key), 0, value_offset, len(value))
+        key_offset += len(raw_key)
+        value_offset += len(value)
+
+    body = _HEADER.pack(MAGIC, VERSION, len(keys), len(key_blob)) + bytes(table) + key_blob
+    digest = hashlib.sha256(body)
+    for key in keys:
+        digest.update(entries[key])
+    store_dir.mkdir(parents=True, exist_ok=True)
+    pack_path = store_dir / f"content-{digest.hexdigest()[:16]}.pack"
+    # Names no other writer can be using at the same time
+    tmp_suffix = f".{os.getpid()}-{uuid.uuid4().hex[:8]}.tmp"
+
+    with open(store_dir / LOCK_FILE, "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if pack_path.exists():
+            os.utime(pack_path)  # Live again - restart its grace period
+        else:
+            tmp_path = pack_path.with_suffix(tmp_suffix)
+            with open(tmp_path, "wb") as f:
+                f.write(body)
+                for key in keys:
+                    f.write(entries[key])
+            os.replace(tmp_path, pack_path)
+
+        current_tmp = store_dir / f"{CURRENT_FILE}{tmp_suffix}"
+        current_tmp.write_text(pack_path.name, encoding="utf-8")
+        os.replace(current_tmp, store_dir / CURRENT_FILE)
+        _remove_stale_packs(store_dir, keep=pack_path.name)
+    return pack_path
+
+
+def _remove_stale_packs(store_dir: Path, keep: str):
+    """Packs (and leftover temp files) not live for PACK_GRACE seconds - call with the lock held"""
+    cutoff = time.time() - PACK_GRACE
+    for old in [*store_dir.glob("content-*.pack"), *store_dir.glob("*.tmp")]:
+        try:
+            if old.name != keep and old.stat().st_mtime < cutoff:
+                old.unlink()
+        except OSError:
+            pass  # Gone already, or still mapped by another process (Windows) - next build retries
+
+
+def update_store(
+    store: Optional["ContentStore"],
+    context_dir: Path = CONTEXT_DIR,
+    store_dir: Path = STORE_DIR,
+) -> Tuple["ContentStore", Dict[str, object], List[str]]:
+    """
+    Bring a compiled store up to date with the context directory.
+    Only files whose signature changed are re-parsed; every other source's
+    entries are copied over byte for byte. Returns the (possibly unchanged)
+    store, the re-parsed documents by stem and the stems that were removed.
+    """
+    signatures = scan_sources(context_dir)
+    previous = store.sources if store is not None else {}
+    changed = {}
+    for stem, signature in signatures.items():
+        if previous.get(stem) != signature:
+            with open(context_dir / f"{stem}.json", 'r', encoding='utf-8') as f:
+                changed[stem] = json.load(f)
+    removed = [stem for stem in previous if stem not in signatures]
+    if store is not None and not changed and not removed:
+        return store, {}, []
+
+    entries: Dict[str, bytes] = {}
+    for stem in signatures:
+        if stem in changed:
+            entries.update(document_entries(stem, changed[stem]))
+        else:
+            entries.update(store.source_entries(stem))
+    entries["meta:sources"] = _dumps(signatures)
+    return ContentStore(write_pack(entries, store_dir)), changed, removed
+
+
+def compile_store(context_dir: Path = CONTEXT_DIR, store_dir: Path = STORE_DIR) -> Path:
+    """Parse every context file and write a fresh pack"""
+    store, _, _ = update_store(None, context_dir, store_dir)
+    return store.path
+
+
+class ContentStore:
+    """Read-only, memory-mapped view of a compiled pack"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self._count, _ = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path} is not a v{VERSION} content pack")
+        self._keys_start = _HEADER.size + _ENTRY.size * self._count
+        self.sources: Dict[str, Dict[str, int]] = json.loads(self.get("meta:sources") or b"{}")
+
+    def close(self):
+        self._mmap.close()
+
+    def _entry(self, i: int) -> Tuple[bytes, int, int]:
+        key_offset, key_len, _, value_offset, value_len = _ENTRY.unpack_from(
+            self._mmap, _HEADER.size + _ENTRY.size * i
+        )
+        start = self._keys_start + key_offset
+        return self._mmap[start:start + key_len], value_offset, value_len
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Raw value bytes for a key, or None"""
+        target = key.encode("utf-8")
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            mid_key, value_offset, value_len = self._entry(mid)
+            if mid_key < target:
+                lo = mid + 1
+            elif mid_key > target:
+                hi = mid
+            else:
+                return self._mmap[value_offset:value_offset + value_len]
+        return None
+
+    def keys(self, prefix: str = "") -> Iterator[str]:
+        """Keys starting with a prefix, in sorted order"""
+        target = prefix.encode("utf-8")
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(mid)[0] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        for i in range(lo, self._count):
+            key = self._entry(i)[0]
+            if not key.startswith(target):
+                break
+            yield key.decode("utf-8")
+
+    def document_bytes(self, stem: str) -> Optional[bytes]:
+        """A whole document as compact JSON bytes, ready to send"""
+        return self.get(f"doc:{stem}")
+
+    def document(self, stem: str):
+        raw = self.document_bytes(stem)
+        return json.loads(raw) if raw is not None else None
+
+    def item(self, snippet_id: str):
+        """The raw JSON of one phrase, dialogue or question"""
+        raw = self.get(f"item:{snippet_id}")
+        return json.loads(raw) if raw is not None else None
+
+    def snippets(self, source: str) -> List[Snippet]:
+        """Retrieval snippets of one source, in key order"""
+        snippets = []
+        for key in self.keys(f"snip:{source}/"):
+            snippet_id = key[len("snip:"):]
+            kind, title, text = json.loads(self.get(key))
+            snippets.append(Snippet(snippet_id, source, kind, title, text))
+        return snippets
+
+    def source_entries(self, source: str) -> Iterator[Tuple[str, bytes]]:
+        """Every entry one source contributed, as raw bytes"""
+        for key in (f"doc:{source}", f"item:{source}", f"snip:{source}"):
+            value = self.get(key)
+            if value is not None:
+                yield key, value
+        for prefix in (f"item:{source}/", f"snip:{source}/"):
+            for key in self.keys(prefix):
+                yield key, self.get(key)
+
+    def build_index(self) -> ContentIndex:
+        """Retrieval index over every snippet, without parsing any document"""
+        return ContentIndex.from_snippets({s: self.snippets(s) for s in self.sources})
+
+
+def current_pack(store_dir: Path = STORE_DIR) -> Optional[Path]:
+    """Path of the live pack, if one has been compiled"""
+    try:
+        name = (store_dir / CURRENT_FILE).read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+    path = store_dir / name
+    return path if path.exists() else None
+
+
+def is_stale(store: ContentStore, context_dir: Path = CONTEXT_DIR) -> bool:
+    return store.sources != scan_sources(context_dir)
+
+
+def open_current(store_dir: Path = STORE_DIR) -> Optional[ContentStore]:
+    """The live pack, or None if there is none - re-reads CURRENT if a writer swaps it meanwhile"""
+    for _ in range(OPEN_ATTEMPTS):
+        path = current_pack(store_dir)
+        if path is None:
+            return None
+        try:
+            return ContentStore(path)
+        except FileNotFoundError:  # Removed between reading CURRENT and opening it
+            continue
+    return None
+
+
+def open_store(context_dir: Path = CONTEXT_DIR, store_dir: Path = STORE_DIR) -> ContentStore:
+    """Open the compiled store, recompiling whatever is missing or out of date"""
+    return update_store(open_current(store_dir), context_dir, store_dir)[0]
+
+
+if __name__ == "__main__":
+    if "--check" in sys.argv:
+        store = open_current()
+        stale = store is None or is_stale(store)
+        print("[!] Content store is stale" if stale else "[✓] Content store is up to date")
+        sys.exit(1 if stale else 0)
+
+    pack = compile_store()
+    store = ContentStore(pack)
+    print(f"[✓] Compiled {len(store.sources)} files into {pack} ({pack.stat().st_size} bytes)")
@@ -0,0 +1,347 @@
+"""
+RápidoLingo grammar pre-check
+Rule-based checks on a student's Spanish transcript, run locally before the
+LLM replies. Whatever it finds goes into the turn as a short note, so the LLM
+only has to phrase the feedback instead of hunting for the mistakes:
+
+- article/noun agreement: "el mesa" -> "la mesa", "la maletas" -> "las maletas"
+- missing article after wanting/ordering verbs: "me gustaría café" -> "un café"
+- subject/verb agreement for common verbs: "yo tiene" -> "yo tengo"
+- tú/usted consistency within a reply and with the student's earlier replies
+
+The noun lexicon is a small built-in core plus every "article noun" pair in
+the content; the conjugation tables are generated for regular verbs, listed
+for common irregular ones and extended from the content's verb table.
+Words are compared accent-folded, since STT accents aren't the student's -
+except tú verb forms as register evidence: folded, "estás" is "estas" (these).
+
+Try it:
+    python grammar_check.py "yo tiene una reserva" "me gustaría café"
+"""
+
+import re
+import sys
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from content_index import fold
+
+PERSONS = ("yo", "tú", "él", "nosotros", "ellos")
+
+PRONOUNS = {
+    "yo": "yo", "tu": "tú",
+    "el": "él", "ella": "él", "usted": "él",
+    "nosotros": "nosotros", "nosotras": "nosotros",
+    "ellos": "ellos", "ellas": "ellos", "ustedes": "ellos",
+}
+
+ENDINGS = {
+    "ar": ("o", "as", "a", "amos", "an"),
+    "er": ("o", "es", "e", "emos", "en"),
+    "ir": ("o", "es", "e", "imos", "en"),
+}
+
+REGULAR_VERBS = """
+hablar necesitar buscar llegar tomar viajar trabajar estudiar desear llevar pagar
+reservar cenar bailar escuchar mirar comprar caminar cocinar cantar practicar
+comer beber leer aprender vender correr vivir escribir abrir subir recibir
+""".split()
+
+IRREGULAR_VERBS = {
+    "ser": ("soy", "eres", "es", "somos", "son"),
+    "estar": ("estoy", "estás", "está", "estamos", "están"),
+    "tener": ("tengo", "tienes", "tiene", "tenemos", "tienen"),
+    "ir": ("voy", "vas", "va", "vamos", "van"),
+    "hacer": ("hago", "haces", "hace", "hacemos", "hacen"),
+    "querer": ("quiero", "quieres", "quiere", "queremos", "quieren"),
+    "poder": ("puedo", "puedes", "puede", "podemos", "pueden"),
+    "preferir": ("prefiero", "prefieres", "prefiere", "preferimos", "prefieren"),
+    "venir": ("vengo", "vienes", "viene", "venimos", "vienen"),
+    "decir": ("digo", "dices", "dice", "decimos", "dicen"),
+    "pedir": ("pido", "pides", "pide", "pedimos", "piden"),
+    "dormir": ("duermo", "duermes", "duerme", "dormimos", "duermen"),
+    "salir": ("salgo", "sales", "sale", "salimos", "salen"),
+    "conocer": ("conozco", "conoces", "conoce", "conocemos", "conocen"),
+    "jugar": ("juego", "juegas", "juega", "jugamos", "juegan"),
+    "dar": ("doy", "das", "da", "damos", "dan"),
+}
+
+# Words that may sit between a subject pronoun and its verb
+CLITICS = frozenset("no me te lo la le nos se los las les".split())
+
+# Core scenario nouns: folded noun (fold keeps ñ) -> (gender, countable)
+CORE_NOUNS = {
+    **{n: ("m", True) for n in """
+        cafe te pasaporte equipaje vuelo boleto billete asiento hotel cuarto baño desayuno
+        almuerzo menu plato postre vaso restaurante camarero mesero taxi tren autobus
+        aeropuerto museo parque banco mapa dia problema numero precio libro amigo hermano
+        trabajo año ascensor piso centro hospital supermercado telefono nombre pollo pescado
+        jugo refresco sandwich helado
+    """.split()},
+    **{n: ("f", True) for n in """
+        mesa cuenta carta reserva habitacion llave maleta tarjeta puerta salida llegada
+        calle esquina estacion parada playa ciudad plaza iglesia farmacia tienda camiseta
+        sopa ensalada paella pizza bebida pelicula hermana amiga familia semana noche mano
+        foto fiesta clase hora tarde cama ducha toalla
+    """.split()},
+    **{n: ("m", False) for n in "vino pan dinero tiempo hielo azucar arroz".split()},
+    **{n: ("f", False) for n in "agua leche cerveza comida musica informacion ayuda".split()},
+}
+
+# Feminine nouns starting with a stressed a take el/un in the singular
+FEMININE_EL = frozenset("agua aula alma hambre area".split())
+
+# Articles seen in content before these aren't noun evidence
+NOT_NOUNS = frozenset("""
+llevo tuyo tuya mio mia suyo suya diez once doce una dos tres poco poca mas mejor
+primera primero otra otro misma mismo mayor ella ello bahn
+""".split())
+
+ARTICLES = {
+    "el": ("def", "m", "s"), "la": ("def", "f", "s"), "los": ("def", "m", "p"), "las": ("def", "f", "p"),
+    "un": ("ind", "m", "s"), "una": ("ind", "f", "s"), "unos": ("ind", "m", "p"), "unas": ("ind", "f", "p"),
+}
+ARTICLE_FOR = {value: key for key, value in ARTICLES.items()}
+
+# "me gustaría café" - these want an article before a countable singular noun
+WANTING = frozenset("quiero quisiera gustaria necesito busco deseo pido tengo tienes tiene".split())
+DETERMINERS = frozenset("mi tu su este esta ese esa otro otra mucho mucha poco poca algun alguna cada".split())
+
+# tú-register markers (verb forms are added from the tables); "usted" is explicit
+TU_WORDS = frozenset("tu ti contigo".split())
+
+# tú verb forms that are also other words ("estas maletas", "las reservas") - not register evidence
+NOT_TU_MARKERS = frozenset("estas esta sales compras cenas pagas tomas miras cantas llevas".split())
+
+_WORD_RE = re.compile(r"[^\W\d_]+")
+
+
+@dataclass(frozen=True)
+class GrammarIssue:
+    kind: str  # "gender", "number", "article", "conjugation" or "formality"
+    found: str
+    suggestion: str = ""
+
+    def describe(self) -> str:
+        if self.kind == "formality":
+            return self.found
+        if self.kind == "article":
+            return f"missing article '{self.found}' -> '{self.suggestion}'"
+        return f"'{self.found}' -> '{self.suggestion}' ({self.kind})"
+
+
+@dataclass(frozen=True)
+class GrammarReport:
+    issues: Tuple[GrammarIssue, ...]
+    register: Optional[str]  # "tú", "usted" or None if the reply doesn't show it
+
+    def hint(self) -> str:
+        """Compact note for the LLM's context"""
+        return "Grammar check: " + "; ".join(issue.describe() for issue in self.issues) + "."
+
+
+def _conjugations(content_tables: Dict[str, Tuple[str, ...]]) -> Dict[str, Tuple[str, ...]]:
+    tables = {verb: tuple(stem_forms) for verb, stem_forms in IRREGULAR_VERBS.items()}
+    for verb in REGULAR_VERBS:
+        stem, ending = verb[:-2], verb[-2:]
+        tables[verb] = tuple(stem + e for e in ENDINGS[ending])
+    for verb, forms in content_tables.items():
+        if verb in tables:  # Content only covers yo/tú/él - keep the rest
+            tables[verb] = forms + tables[verb][len(forms):]
+        elif len(forms) == len(PERSONS):
+            tables[verb] = forms
+    return tables
+
+
+def content_conjugations(store) -> Dict[str, Tuple[str, ...]]:
+    """{infinitive: forms} from the content's verb tables ({"verb": "hablar (to speak)", "yo": ...})"""
+    tables = {}
+    for source in store.sources:
+        stack = [store.document(source)]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, dict):
+                if isinstance(node.get("verb"), str) and "yo" in node:
+                    forms = [node.get("yo"), node.get("tú"), node.get("él/ella")]
+                    if all(isinstance(f, str) for f in forms):
+                        tables[node["verb"].split()[0].lower()] = tuple(forms)
+                stack.extend(node.values())
+            elif isinstance(node, list):
+                stack.extend(node)
+    return tables
+
+
+def content_nouns(store) -> Dict[str, str]:
+    """{folded noun: gender} from every "article noun" pair in the content"""
+    nouns: Dict[str, str] = {}
+    conflicts: Set[str] = set()
+    for source in store.sources:
+        raw = store.document_bytes(source).decode("utf-8")
+        words = [fold(w) for w in _WORD_RE.findall(raw)]
+        for article, noun in zip(words, words[1:]):
+            if article not in ARTICLES or noun in NOT_NOUNS or len(noun) < 3:
+                continue
+            _, gender, number = ARTICLES[article]
+            if number == "p":
+                noun = noun[:-2] if noun.endswith("es") and not noun.endswith("ses") else noun[:-1]
+            if nouns.setdefault(noun, gender) != gender:
+                conflicts.add(noun)
+    return {noun: gender for noun, gender in nouns.items() if noun not in conflicts}
+
+
+class GrammarChecker:
+    """Noun lexicon and conjugation index; check() is pure and thread-safe"""
+
+    def __init__(self, nouns: Dict[str, str] = None, conjugations: Dict[str, Tuple[str, ...]] = None):
+        # Core entries win over anything learned from content
+        self.nouns: Dict[str, Tuple[str, bool]] = {
+            noun: (gender, True) for noun, gender in (nouns or {}).items()
+        }
+        self.nouns.update(CORE_NOUNS)
+        self.tables = _conjugations(conjugations or {})
+        # folded form -> {(infinitive, person)}
+        self.forms: Dict[str, Set[Tuple[str, str]]] = {}
+        for verb, forms in self.tables.items():
+            for person, form in zip(PERSONS, forms):
+                self.forms.setdefault(fold(form), set()).add((verb, person))
+        # tú forms as written, accents included: folded, "estás" would be "estas" (these)
+        self.tu_forms = frozenset(
+            form
+            for forms in self.tables.values()
+            for form in forms[PERSONS.index("tú"):PERSONS.index("tú") + 1]
+            if form not in NOT_TU_MARKERS and self.noun(fold(form)) is None
+        )
+
+    @classmethod
+    def from_store(cls, store) -> "GrammarChecker":
+        nouns = {n: g for n, g in content_nouns(store).items() if n not in cls._verbish()}
+        return cls(nouns, content_conjugations(store))
+
+    @staticmethod
+    def _verbish() -> Set[str]:
+        return {fold(f) for forms in IRREGULAR_VERBS.values() for f in forms}
+
+    def noun(self, word: str) -> Optional[Tuple[str, str, bool]]:
+        """(gender, number, countable) of a folded noun, singular or plural"""
+        entry = self.nouns.get(word)
+        if entry is not None:
+            return entry[0], "s", entry[1]
+        for singular in (word[:-2], word[:-1]) if word.endswith("es") else (word[:-1],) if word.endswith("s") else ():
+            entry = self.nouns.get(singular)
+            if entry is not None:
+                return entry[0], "p", entry[1]
+        return None
+
+    def _agreement(self, raw: List[str], words: List[str]) -> List[GrammarIssue]:
+        issues = []
+        for i in range(len(words) - 1):
+            article = ARTICLES.get(words[i])
+            noun = self.noun(words[i + 1])
+            if article is None or noun is None:
+                continue
+            definite, gender, number = article
+            noun_gender, noun_number, _ = noun
+            if noun_gender == "f" and noun_number == "s" and words[i + 1] in FEMININE_EL:
+                noun_gender = "m"  # el agua, un agua
+            if (gender, number) == (noun_gender, noun_number):
+                continue
+            kind = "gender" if gender != noun_gender else "number"
+            correct = ARTICLE_FOR[(definite, noun_gender, noun_number)]
+            issues.append(GrammarIssue(kind, f"{raw[i]} {raw[i + 1]}", f"{correct} {raw[i + 1]}"))
+        return issues
+
+    def _missing_articles(self, raw: List[str], words: List[str]) -> List[GrammarIssue]:
+        issues = []
+        for i in range(len(words) - 1):
+            if words[i] not in WANTING:
+                continue
+            nxt = words[i + 1]
+            noun = self.noun(nxt)
+            if noun is None or nxt in ARTICLES or nxt in DETERMINERS:
+                continue
+            gender, number, countable = noun
+            if number != "s" or not countable:
+                continue
+            article = "un" if gender == "m" or nxt in FEMININE_EL else "una"
+            issues.append(GrammarIssue("article", raw[i + 1], f"{article} {raw[i + 1]}"))
+        return issues
+
+    def _conjugation(self, raw: List[str], words: List[str]) -> List[GrammarIssue]:
+        issues = []
+        for i, word in enumerate(words):
+            # "el" without the accent is the article, not "él"
+            if word not in PRONOUNS or (word == "el" and raw[i] != "él") or (word == "tu" and raw[i] == "tu"):
+                continue
+            person = PRONOUNS[word]
+            j = i + 1
+            while j < len(words) and j - i <= 3 and words[j] in CLITICS:
+                j += 1
+            if j >= len(words) or words[j] not in self.forms:
+                continue
+            uses = self.forms[words[j]]
+            if any(p == person for _, p in uses):
+                continue
+            verb = sorted(uses)[0][0]
+            correct = self.tables[verb][PERSONS.index(person)]
+            between = " ".join(raw[i + 1:j])
+            found = " ".join(filter(None, [raw[i], between, raw[j]]))
+            issues.append(GrammarIssue("conjugation", found, " ".join(filter(None, [raw[i], between, correct]))))
+        return issues
+
+    def register(self, raw: List[str]) -> Tuple[bool, bool]:
+        """(uses tú, uses usted) in a reply's lowercased, unfolded words"""
+        tu = any(fold(w) in TU_WORDS or w in self.tu_forms for w in raw)
+        return tu, "usted" in raw
+
+    def check(self, text: str, register: Optional[str] = None) -> GrammarReport:
+        """
+        Issues in a transcript. `register` is the tú/usted form the student has
+        used so far; the report's register is the one this reply shows.
+        """
+        raw = _WORD_RE.findall(text.lower())
+        words = [fold(w) for w in raw]
+        issues = self._agreement(raw, words) + self._missing_articles(raw, words) + self._conjugation(raw, words)
+
+        tu, usted = self.register(raw)
+        current = "tú" if tu and not usted else "usted" if usted and not tu else None
+        if tu and usted:
+            issues.append(GrammarIssue("formality", "mixes tú and usted in one reply"))
+        elif current and register and current != register:
+            issues.append(GrammarIssue("formality", f"switched from {register} to {current}"))
+        return GrammarReport(tuple(issues), current or register)
+
+
+_checker: Optional[GrammarChecker] = None
+_checker_lock = threading.Lock()
+
+
+def get_checker() -> GrammarChecker:
+    """Process-wide checker with the content library's nouns, rebuilt when content reloads"""
+    global _checker
+    if _checker is None:
+        with _checker_lock:
+            if _checker is None:
+                from content_library import get_library
+                library = get_library()
+                _checker = GrammarChecker.from_store(library.store)
+                library.on_reload(_rebuild)
+    return _checker
+
+
+def _rebuild(snapshot, _sources):
+    global _checker
+    _checker = GrammarChecker.from_store(snapshot.store)
+
+
+if __name__ == "__main__":
+    import time
+    from content_library import get_library
+
+    checker = GrammarChecker.from_store(get_library(watch=False).store)
+    print(f"[✓] {len(checker.nouns)} nouns, {len(checker.tables)} verbs")
+    for attempt in sys.argv[1:]:
+        started = time.perf_counter()
+        report = checker.check(attempt)
+        elapsed = (time.perf_counter() - started) * 1e6
+        print(f"{attempt!r} ({elapsed:.0f}µs): {report.hint() if report.issues else 'no issues'}")
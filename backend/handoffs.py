@@ -0,0 +1,55 @@
+"""
+RápidoLingo agent handoffs
+Gets the next agent ready while the current one is still speaking its
+announcement or farewell: the agent is built (pooled clients, prompt from the
+registry), its TTS/STT/LLM connections are prewarmed and its greeting audio
+is loaded into the TTS cache's memory. When the speech ends the session
+switches over, and the new persona's greeting plays straight from memory.
+
+Usage, in a function tool:
+    return await handoff(RestaurantAgent, self.session.generate_reply(user_input=...))
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Type
+
+from livekit.agents import Agent
+from tts_cache import get_audio_cache
+
+logger = logging.getLogger("rapidolingo")
+
+
+async def prepare(agent_class: Type[Agent]) -> Agent:
+    """Build an agent and warm everything its first words need"""
+    agent = agent_class()
+    for component in (agent.tts, agent.stt, agent.llm):
+        if component is not None and hasattr(component, "prewarm"):
+            component.prewarm()  # Opens the provider connection ahead of use
+    greeting = getattr(agent, "greeting", None)
+    if greeting and agent.tts is not None:
+        try:
+            await get_audio_cache().prerender(agent.tts, agent.voice, greeting)
+        except Exception as e:  # The greeting falls back to live TTS
+            logger.warning(f"[!] Could not prepare greeting for {agent_class.__name__}: {e}")
+    return agent
+
+
+async def handoff(agent_class: Type[Agent], speech: Awaitable) -> Agent:
+    """Prepare agent_class while `speech` plays; returns the agent to hand off to"""
+    started = time.perf_counter()
+    prepared = asyncio.create_task(prepare(agent_class))
+    try:
+        await speech
+    except BaseException:
+        prepared.cancel()
+        raise
+    spoken = time.perf_counter()
+    agent = await prepared
+    waited = time.perf_counter() - spoken
+    logger.info(
+        f"Handoff to {agent_class.__name__}: prepared during {spoken - started:.2f}s of speech"
+        + (f", then waited {waited * 1000:.0f}ms" if waited > 0.001 else "")
+    )
+    return agent
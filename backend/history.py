@@ -0,0 +1,183 @@
+"""
+RápidoLingo conversation history compaction
+Keeps each agent's chat history inside a token budget so prompts, and with
+them turn latency and cost, stay flat however long a practice session runs.
+
+System instructions and the last few student turns stay verbatim. Once the
+rest of the conversation goes over budget, the older turns are rolled into a
+short running summary (mistakes made, vocabulary covered) by the agent's own
+LLM in a background task. The reply being generated isn't held up; the
+compacted history is in place for the following turns.
+
+Agents opt in by subclassing CompactingAgent.
+"""
+
+import os
+import math
+import asyncio
+import logging
+from typing import List, Optional
+
+from livekit.agents import Agent, ChatContext, ChatMessage, llm
+
+logger = logging.getLogger("rapidolingo")
+
+# Tokens of conversation (instructions not counted) an agent keeps before compacting
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", 2000))
+
+# Most recent student turns (and everything after them) never summarized
+KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", 4))
+
+SUMMARY_ID = "rapidolingo_history_summary"
+SUMMARY_MAX_WORDS = 120
+
+CHARS_PER_TOKEN = 4  # Close enough for English and Spanish with Llama tokenizers
+MESSAGE_OVERHEAD = 4  # Role and separators per message
+
+SUMMARY_PROMPT = f"""You keep the notes for a Spanish tutoring session.
+Update the notes with the conversation excerpt below. Keep them under {SUMMARY_MAX_WORDS} words, as short lines:
+- Topics and scenario steps already covered
+- Vocabulary and phrases practiced
+- The student's mistakes, each with its correction
+- Anything the student said about themselves or asked to focus on
+Write only the updated notes."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count - cheap enough to run every turn"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _item_text(item: llm.ChatItem) -> str:
+    if item.type == "message":
+        return item.text_content or ""
+    if item.type == "function_call":
+        return f"{item.name}({item.arguments})"
+    if item.type == "function_call_output":
+        return item.output
+    return ""
+
+
+def item_tokens(item: llm.ChatItem) -> int:
+    return estimate_tokens(_item_text(item)) + MESSAGE_OVERHEAD
+
+
+def _is_pinned(item: llm.ChatItem) -> bool:
+    """Instructions and the summary itself are never compacted"""
+    return item.type == "message" and item.role in ("system", "developer")
+
+
+def conversation_tokens(chat_ctx: ChatContext) -> int:
+    return sum(item_tokens(item) for item in chat_ctx.items if not _is_pinned(item))
+
+
+def _transcript(items: List[llm.ChatItem]) -> str:
+    speakers = {"user": "Student", "assistant": "Tutor"}
+    lines = []
+    for item in items:
+        if item.type == "message" and item.role in speakers and item.text_content:
+            lines.append(f"{speakers[item.role]}: {item.text_content}")
+        elif item.type == "function_call":
+            lines.append(f"(Tutor used {item.name})")
+    return "\n".join(lines)
+
+
+async def summarize(model: llm.LLM, previous: str, items: List[llm.ChatItem]) -> str:
+    """The running summary extended with older conversation items"""
+    chat_ctx = ChatContext.empty()
+    chat_ctx.add_message(role="system", content=SUMMARY_PROMPT)
+    chat_ctx.add_message(
+        role="user",
+        content=f"Current notes:\n{previous or '(none yet)'}\n\nConversation excerpt:\n{_transcript(items)}",
+    )
+    parts = []
+    async with model.chat(chat_ctx=chat_ctx, extra_kwargs={"temperature": 0.2}) as stream:
+        async for chunk in stream:
+            if chunk.delta and chunk.delta.content:
+                parts.append(chunk.delta.content)
+    return "".join(parts).strip()
+
+
+class HistoryManager:
+    """Compacts one agent's chat context when its conversation exceeds the budget"""
+
+    def __init__(self, agent: Agent, budget: int = HISTORY_TOKEN_BUDGET, keep_turns: int = KEEP_TURNS):
+        self._agent = agent
+        self.budget = budget
+        self.keep_turns = keep_turns
+        self.summary = ""
+        self.compactions = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def older_items(self, chat_ctx: ChatContext) -> List[llm.ChatItem]:
+        """Conversation items before the last keep_turns student turns"""
+        user_turns = [i for i, item in enumerate(chat_ctx.items) if item.type == "message" and item.role == "user"]
+        if len(user_turns) <= self.keep_turns:
+            return []
+        cutoff = user_turns[-self.keep_turns] if self.keep_turns else len(chat_ctx.items)
+        return [item for item in chat_ctx.items[:cutoff] if not _is_pinned(item)]
+
+    def maybe_compact(self):
+        """Start a background compaction if the history is over budget - never blocks"""
+        if self._task is not None and not self._task.done():
+            return
+        chat_ctx = self._agent.chat_ctx
+        if conversation_tokens(chat_ctx) <= self.budget:
+            return
+        older = self.older_items(chat_ctx)
+        if older:
+            self._task = asyncio.create_task(self._compact(older))
+
+    async def _compact(self, older: List[llm.ChatItem]):
+        try:
+            summary = await summarize(self._agent.llm, self.summary, older)
+        except Exception as e:
+            logger.warning(f"[!] History summary failed, keeping full history: {e}")
+            return
+        if not summary:
+            return
+        self.summary = summary
+
+        # Turns added while summarizing are kept; only the summarized items go
+        chat_ctx = self._agent.chat_ctx.copy()
+        before = conversation_tokens(chat_ctx)
+        dropped = {item.id for item in older}
+        items = [item for item in chat_ctx.items if item.id not in dropped and item.id != SUMMARY_ID]
+        position = 0
+        while position < len(items) and _is_pinned(items[position]):
+            position += 1
+        items.insert(position, ChatMessage(
+            id=SUMMARY_ID,
+            role="system",
+            content=[f"Notes on the conversation so far (earlier turns are summarized here):\n{summary}"],
+        ))
+        chat_ctx.items = items
+        await self._agent.update_chat_ctx(chat_ctx)
+        self.compactions += 1
+        logger.info(
+            f"History compacted for {type(self._agent).__name__}: {len(dropped)} items summarized, "
+            f"~{before} -> ~{conversation_tokens(chat_ctx)} tokens"
+        )
+
+    def cancel(self):
+        if self._task is not None:
+            self._task.cancel()
+
+
+class CompactingAgent(Agent):
+    """Agent whose history is kept within history_budget tokens (see HistoryManager)"""
+
+    history_budget = HISTORY_TOKEN_BUDGET
+    _history: Optional[HistoryManager] = None
+
+    @property
+    def history(self) -> HistoryManager:
+        if self._history is None:
+            self._history = HistoryManager(self, budget=self.history_budget)
+        return self._history
+
+    async def on_user_turn_completed(self, turn_ctx: ChatContext, new_message: ChatMessage):
+        self.history.maybe_compact()
+
+    async def on_exit(self):
+        self.history.cancel()
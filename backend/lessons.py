@@ -0,0 +1,148 @@
+"""
+RápidoLingo lesson registry
+Lesson scenarios indexed once by id, category and difficulty, with the catalog
+(and each filtered view) pre-serialized for /api/lessons
+"""
+
+import json
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from precompressed import PrecompressedBody
+
+LESSONS = [
+    {
+        "id": "restaurant",
+        "title": "Restaurant Conversation",
+        "description": "Order food, ask for recommendations, request the check",
+        "difficulty": "beginner",
+        "agent_type": "restaurant",
+        "category": "travel"
+    },
+    {
+        "id": "airport",
+        "title": "Airport Check-in",
+        "description": "Check luggage, get boarding pass, find your gate",
+        "difficulty": "beginner",
+        "agent_type": "airport",
+        "category": "travel"
+    },
+    {
+        "id": "hotel",
+        "title": "Hotel Booking",
+        "description": "Check in, ask about amenities, request services",
+        "difficulty": "beginner",
+        "agent_type": "hotel",
+        "category": "travel"
+    },
+    {
+        "id": "directions",
+        "title": "Asking for Directions",
+        "description": "Find places, understand directions, navigate the city",
+        "difficulty": "beginner",
+        "agent_type": "directions",
+        "category": "travel"
+    },
+    {
+        "id": "shopping",
+        "title": "Shopping",
+        "description": "Ask for sizes, colors, prices, and make purchases",
+        "difficulty": "intermediate",
+        "agent_type": "social",
+        "category": "daily_life"
+    },
+    {
+        "id": "social_meetup",
+        "title": "Meeting New People",
+        "description": "Introductions, small talk, making plans",
+        "difficulty": "beginner",
+        "agent_type": "social",
+        "category": "social"
+    },
+    {
+        "id": "social_party",
+        "title": "At a Party",
+        "description": "Casual conversations, mingling, expressing opinions",
+        "difficulty": "intermediate",
+        "agent_type": "social",
+        "category": "social"
+    },
+    {
+        "id": "exam_prep",
+        "title": "Oral Exam Practice",
+        "description": "Common exam questions, strategies, pronunciation tips",
+        "difficulty": "intermediate",
+        "agent_type": "teacher",
+        "category": "academic"
+    }
+]
+
+# Display name of the voice agent behind each agent_type
+AGENT_NAMES = {
+    "restaurant": "Restaurant Agent (María)",
+    "airport": "Airport Agent (Carlos)",
+    "hotel": "Hotel Agent (Sofia)",
+    "directions": "Directions Agent (Miguel)",
+    "social": "Social Agent (Ana)",
+    "teacher": "Teacher Agent (Profesora López)"
+}
+
+DEFAULT_AGENT_NAME = "Teacher Agent"
+
+
+def _serialize(lessons: List[Mapping]) -> PrecompressedBody:
+    return PrecompressedBody(
+        json.dumps([dict(l) for l in lessons], ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    )
+
+
+class LessonRegistry:
+    """Read-only lesson lookups - built once, O(1) by id"""
+
+    def __init__(self, lessons: List[Dict]):
+        self._lessons: Tuple[Mapping, ...] = tuple(MappingProxyType(dict(l)) for l in lessons)
+        self._by_id = {l["id"]: l for l in self._lessons}
+        self._by_category: Dict[str, List[Mapping]] = {}
+        self._by_difficulty: Dict[str, List[Mapping]] = {}
+        for lesson in self._lessons:
+            self._by_category.setdefault(lesson["category"], []).append(lesson)
+            self._by_difficulty.setdefault(lesson["difficulty"], []).append(lesson)
+
+        # One serialized view per known (category, difficulty) filter
+        self._empty = _serialize([])
+        self._views: Dict[Tuple[Optional[str], Optional[str]], PrecompressedBody] = {
+            (None, None): _serialize(list(self._lessons))
+        }
+        for category in self._by_category:
+            self._views[(category, None)] = _serialize(self.filter(category=category))
+            for difficulty in self._by_difficulty:
+                self._views[(category, difficulty)] = _serialize(self.filter(category, difficulty))
+        for difficulty in self._by_difficulty:
+            self._views[(None, difficulty)] = _serialize(self.filter(difficulty=difficulty))
+
+    def __len__(self) -> int:
+        return len(self._lessons)
+
+    def get(self, lesson_id: str) -> Optional[Mapping]:
+        return self._by_id.get(lesson_id)
+
+    def filter(self, category: Optional[str] = None, difficulty: Optional[str] = None) -> List[Mapping]:
+        """Lessons matching every given filter, in catalog order"""
+        if category is None and difficulty is None:
+            return list(self._lessons)
+        if category is None:
+            return list(self._by_difficulty.get(difficulty, []))
+        lessons = self._by_category.get(category, [])
+        if difficulty is not None:
+            lessons = [l for l in lessons if l["difficulty"] == difficulty]
+        return list(lessons)
+
+    def catalog(self, category: Optional[str] = None, difficulty: Optional[str] = None) -> PrecompressedBody:
+        """Pre-serialized catalog response for a filter (unknown filters are empty)"""
+        return self._views.get((category, difficulty), self._empty)
+
+    def agent_name(self, lesson: Mapping) -> str:
+        return AGENT_NAMES.get(lesson["agent_type"], DEFAULT_AGENT_NAME)
+
+
+lesson_registry = LessonRegistry(LESSONS)
@@ -0,0 +1,116 @@
+"""
+RápidoLingo job lifecycle
+Ends an agent job from room and session events instead of polling: when the
+last participant leaves, the room disconnects, the session closes, the student
+goes idle too long, or the session hits its maximum duration.
+"""
+
+import os
+import asyncio
+import logging
+from typing import Optional
+from livekit import rtc
+from livekit.agents import AgentSession, JobContext
+
+logger = logging.getLogger("rapidolingo")
+
+# No speech from the student for this long ends the session
+IDLE_TIMEOUT = float(os.getenv("AGENT_IDLE_TIMEOUT", 5 * 60))
+
+# Hard cap on one session, whatever happens in the room
+MAX_DURATION = float(os.getenv("AGENT_MAX_SESSION_SECONDS", 60 * 60))
+
+
+class JobLifecycle:
+    """
+    Waits for the first reason to end a job, with no wakeups in between.
+    Usage:
+        lifecycle = JobLifecycle(ctx, session)
+        reason = await lifecycle.wait()
+        await lifecycle.shutdown(reason)
+    """
+
+    def __init__(
+        self,
+        ctx: JobContext,
+        session: AgentSession,
+        idle_timeout: float = IDLE_TIMEOUT,
+        max_duration: float = MAX_DURATION,
+    ):
+        self._ctx = ctx
+        self._session = session
+        self._idle_timeout = idle_timeout
+        self._loop = asyncio.get_running_loop()
+        self._done = asyncio.Event()
+        self._reason = ""
+        self._idle_timer: Optional[asyncio.TimerHandle] = None
+        self._max_timer = self._loop.call_later(max_duration, self._finish, "max_duration")
+
+        room = ctx.room
+        room.on("participant_connected", self._on_participant_connected)
+        room.on("participant_disconnected", self._on_participant_disconnected)
+        room.on("disconnected", self._on_room_disconnected)
+        session.on("user_state_changed", self._on_activity)
+        session.on("user_input_transcribed", self._on_activity)
+        session.on("close", self._on_session_close)
+
+        self._reset_idle()
+        # The student may have left while the session was starting
+        if not room.remote_participants:
+            self._finish("participants_left")
+
+    @property
+    def reason(self) -> str:
+        return self._reason
+
+    async def wait(self) -> str:
+        """Block until the job should end; returns why"""
+        await self._done.wait()
+        return self._reason
+
+    async def shutdown(self, reason: str = ""):
+        """Release the pipeline right away and end the job"""
+        self._finish(reason or "shutdown")
+        try:
+            await self._session.aclose()
+        finally:
+            self._ctx.shutdown(reason=self._reason)
+
+    def _finish(self, reason: str):
+        if self._done.is_set():
+            return
+        self._reason = reason
+        self._done.set()
+        self._max_timer.cancel()
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+
+        room = self._ctx.room
+        room.off("participant_connected", self._on_participant_connected)
+        room.off("participant_disconnected", self._on_participant_disconnected)
+        room.off("disconnected", self._on_room_disconnected)
+        self._session.off("user_state_changed", self._on_activity)
+        self._session.off("user_input_transcribed", self._on_activity)
+        self._session.off("close", self._on_session_close)
+
+    def _reset_idle(self):
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+        self._idle_timer = self._loop.call_later(self._idle_timeout, self._finish, "idle")
+
+    def _on_activity(self, _event):
+        self._reset_idle()
+
+    def _on_participant_connected(self, _participant: rtc.RemoteParticipant):
+        self._reset_idle()
+
+    def _on_participant_disconnected(self, _participant: rtc.RemoteParticipant):
+        if not self._ctx.room.remote_participants:
+            logger.info("All participants left, ending session")
+            self._finish("participants_left")
+
+    def _on_room_disconnected(self, *_args):
+        self._finish("room_disconnected")
+
+    def _on_session_close(self, _event):
+        self._finish("session_closed")
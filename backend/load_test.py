@@ -0,0 +1,243 @@
+"""
+RápidoLingo API load generator
+Drives the same endpoints as test_api.py concurrently over asyncio and reports
+throughput and p50/p95/p99 latency per route. Results can be written as JSON
+to compare across commits.
+
+Scenarios:
+    journey   - GET /, lessons, content, then session start -> status -> end (default)
+    browse    - GET /, lessons and content only
+    sessions  - session start -> status -> end only
+
+Arrivals are closed-loop (--concurrency users back to back) unless --rate is
+set, in which case users arrive as a Poisson process at that many per second,
+capped at --concurrency in flight.
+
+Usage:
+    python load_test.py --duration 30 --concurrency 50
+    python load_test.py --scenario sessions --rate 200 --json results.json
+"""
+
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import subprocess
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import aiohttp
+
+BASE_URL = "http://localhost:8000"
+CONTENT_TYPES = ["spanish_beginner"]
+LESSON_IDS = ["restaurant", "airport", "hotel", "directions", "shopping", "social_meetup", "social_party", "exam_prep"]
+
+
+def percentile(ordered: List[float], p: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+class RouteStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Dict[str, int] = defaultdict(int)
+        self.errors = 0
+
+    def record(self, seconds: float, status: str, ok: bool):
+        self.latencies.append(seconds * 1000)
+        self.statuses[status] += 1
+        if not ok:
+            self.errors += 1
+
+    def summary(self, elapsed: float) -> Dict:
+        ordered = sorted(self.latencies)
+        return {
+            "requests": len(ordered),
+            "errors": self.errors,
+            "rps": round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": round(percentile(ordered, 50), 2),
+            "p95_ms": round(percentile(ordered, 95), 2),
+            "p99_ms": round(percentile(ordered, 99), 2),
+            "max_ms": round(ordered[-1], 2) if ordered else 0.0,
+            "statuses": dict(sorted(self.statuses.items())),
+        }
+
+
+class LoadTest:
+    def __init__(self, base_url: str, content_types: List[str]):
+        self.base_url = base_url.rstrip("/")
+        self.content_types = content_types
+        self.routes: Dict[str, RouteStats] = defaultdict(RouteStats)
+        self.journeys = 0
+        self.failed_journeys = 0
+        self.start_lag: List[float] = []
+        self._http: Optional[aiohttp.ClientSession] = None
+
+    async def request(self, method: str, route: str, path: str, **kwargs) -> Optional[Dict]:
+        """One timed request, recorded under its route template; returns the JSON body on success"""
+        started = time.perf_counter()
+        try:
+            async with self._http.request(method, self.base_url + path, **kwargs) as response:
+                body = await response.read()
+                elapsed = time.perf_counter() - started
+                ok = response.status < 400
+                self.routes[route].record(elapsed, str(response.status), ok)
+                if ok and body and response.content_type == "application/json":
+                    return json.loads(body)
+                return {} if ok else None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.routes[route].record(time.perf_counter() - started, type(e).__name__, False)
+            return None
+
+    async def browse(self) -> bool:
+        results = [
+            await self.request("GET", "/", "/"),
+            await self.request("GET", "/api/lessons", "/api/lessons"),
+            await self.request("GET", "/api/content/{type}", f"/api/content/{random.choice(self.content_types)}"),
+        ]
+        return all(r is not None for r in results)
+
+    async def session(self) -> bool:
+        payload = {"lesson_id": random.choice(LESSON_IDS), "user_level": "beginner"}
+        started = await self.request("POST", "/api/session/start", "/api/session/start", json=payload)
+        if not started or "session_id" not in started:
+            return False
+        session_id = started["session_id"]
+        status = await self.request("GET", "/api/session/{id}/status", f"/api/session/{session_id}/status")
+        ended = await self.request("POST", "/api/session/{id}/end", f"/api/session/{session_id}/end")
+        return status is not None and ended is not None
+
+    async def journey(self) -> bool:
+        return await self.browse() and await self.session()
+
+    async def _user(self, scenario):
+        ok = await scenario()
+        self.journeys += 1
+        if not ok:
+            self.failed_journeys += 1
+
+    async def run(self, scenario_name: str, duration: float, concurrency: int, rate: float) -> float:
+        scenario = getattr(self, scenario_name)
+        connector = aiohttp.TCPConnector(limit=concurrency, keepalive_timeout=30)
+        timeout = aiohttp.ClientTimeout(total=30)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as self._http:
+            started = time.perf_counter()
+            deadline = started + duration
+            if rate > 0:
+                await self._open_loop(scenario, deadline, concurrency, rate)
+            else:
+                await asyncio.gather(*(self._closed_loop(scenario, deadline) for _ in range(concurrency)))
+            return time.perf_counter() - started
+
+    async def _closed_loop(self, scenario, deadline: float):
+        while time.perf_counter() < deadline:
+            await self._user(scenario)
+
+    async def _open_loop(self, scenario, deadline: float, concurrency: int, rate: float):
+        slots = asyncio.Semaphore(concurrency)
+        tasks = set()
+        next_arrival = time.perf_counter()
+
+        async def user(arrival: float):
+            try:
+                self.start_lag.append((time.perf_counter() - arrival) * 1000)
+                await self._user(scenario)
+            finally:
+                slots.release()
+
+        while next_arrival < deadline:
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await slots.acquire()  # At the cap, arrivals queue up - visible as start lag
+            task = asyncio.create_task(user(next_arrival))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            next_arrival += random.expovariate(rate)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    def report(self, elapsed: float) -> Dict:
+        total = sum(len(s.latencies) for s in self.routes.values())
+        lag = sorted(self.start_lag)
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "journeys": self.journeys,
+            "failed_journeys": self.failed_journeys,
+            "requests": total,
+            "rps": round(total / elapsed, 1) if elapsed else 0.0,
+            "errors": sum(s.errors for s in self.routes.values()),
+            "start_lag_p95_ms": round(percentile(lag, 95), 2),
+            "routes": {route: stats.summary(elapsed) for route, stats in sorted(self.routes.items())},
+        }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def print_report(result: Dict):
+    totals = result["totals"]
+    print("=" * 92)
+    print(f"Load test - {result['config']['scenario']} for {totals['elapsed_s']}s, "
+          f"concurrency={result['config']['concurrency']} rate={result['config']['rate'] or 'closed-loop'}")
+    print("=" * 92)
+    print(f"{'route':<32}{'reqs':>8}{'err':>6}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>10}")
+    for route, s in totals["routes"].items():
+        print(f"{route:<32}{s['requests']:>8}{s['errors']:>6}{s['rps']:>9.1f}"
+              f"{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}{s['max_ms']:>10.1f}")
+    print(f"\nTotal: {totals['requests']} requests, {totals['rps']} req/s, {totals['errors']} errors, "
+          f"{totals['journeys']} journeys ({totals['failed_journeys']} failed)")
+    if result["config"]["rate"]:
+        print(f"Arrival start lag p95: {totals['start_lag_p95_ms']} ms")
+    session_starts = totals["routes"].get("/api/session/start")
+    if session_starts:
+        print(f"Session starts: {session_starts['rps']}/s (p99 {session_starts['p99_ms']} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RápidoLingo API load generator")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--scenario", choices=["journey", "browse", "sessions"], default="journey")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--concurrency", type=int, default=20, help="users in flight")
+    parser.add_argument("--rate", type=float, default=0.0, help="user arrivals per second (0 = closed loop)")
+    parser.add_argument("--content-type", action="append", dest="content_types",
+                        help=f"content to fetch (default: {', '.join(CONTENT_TYPES)})")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    scenario = "session" if args.scenario == "sessions" else args.scenario
+    test = LoadTest(args.base_url, args.content_types or CONTENT_TYPES)
+    elapsed = asyncio.run(test.run(scenario, args.duration, args.concurrency, args.rate))
+    result = {
+        "commit": git_commit(),
+        "timestamp": time.time(),
+        "config": {
+            "base_url": args.base_url,
+            "scenario": args.scenario,
+            "duration": args.duration,
+            "concurrency": args.concurrency,
+            "rate": args.rate,
+        },
+        "totals": test.report(elapsed),
+    }
+    print_report(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"[✓] Results written to {args.json}")
+    return 1 if result["totals"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,14 +5,21 @@ Spanish learning at human speed with multi-agent voice tutoring
 
 import os
 import json
+import time
 import uuid
-from pathlib import Path
 from typing import List, Optional
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 from livekit import api
+from content_library import get_library
+from lessons import lesson_registry
+from precompressed import PrecompressedBody
+from progress import get_progress
+from review import SESSION_ITEMS, get_scheduler
+from sessions import SessionRecord, create_session_store
+from turn_metrics import load_registry
 
 # Load environment variables
 load_dotenv()
@@ -59,6 +66,14 @@ class Lesson(BaseModel):
 class SessionRequest(BaseModel):
     lesson_id: str
     user_level: str = "beginner"
+    user_id: Optional[str] = None  # Learner to track progress for
+
+class ReviewGrade(BaseModel):
+    item_id: str
+    quality: int = Field(ge=0, le=5)  # SM-2 recall grade
+
+class MessageEvent(BaseModel):
+    count: int = 1
 
 class SessionResponse(BaseModel):
     session_id: str
@@ -66,22 +81,38 @@ class SessionResponse(BaseModel):
     livekit_url: str
     agent_name: str
 
-# Load Spanish content
-def load_spanish_content():
-    """Load all Spanish learning content from JSON files"""
-    context_dir = Path("../context")
-    content = {}
-    
-    for json_file in context_dir.glob("*.json"):
-        with open(json_file, 'r', encoding='utf-8') as f:
-            content[json_file.stem] = json.load(f)
-    
-    return content
+# Compiled Spanish content, hot-reloaded when files under context/ change
+spanish_content = get_library(watch=True)
+
+# Every content document serialized and compressed once, refreshed on reload
+def build_content_responses(snapshot):
+    """Precompressed response bodies for every document in a content snapshot"""
+    return {
+        stem: PrecompressedBody(snapshot.store.document_bytes(stem))
+        for stem in snapshot.store.sources
+    }
+
+content_responses = build_content_responses(spanish_content.snapshot())
 
-spanish_content = load_spanish_content()
+def refresh_content_responses(snapshot, changed_sources):
+    """Re-encode only the documents that changed, then swap the whole map"""
+    global content_responses
+    responses = dict(content_responses)
+    for stem in changed_sources:
+        raw = snapshot.store.document_bytes(stem)
+        if raw is None:
+            responses.pop(stem, None)
+        else:
+            responses[stem] = PrecompressedBody(raw)
+    content_responses = responses
+
+spanish_content.on_reload(refresh_content_responses)
+
+# Live sessions - in-memory, or Redis when SESSION_STORE_URL is set
+session_store = create_session_store()
 
 # Helper Functions
-def generate_livekit_token(room_name: str, participant_identity: str) -> Optional[str]:
+def generate_livekit_token(room_name: str, participant_identity: str, user_id: Optional[str] = None) -> Optional[str]:
     """Generate LiveKit access token for a participant"""
     api_key = os.getenv("LIVEKIT_API_KEY")
     api_secret = os.getenv("LIVEKIT_API_SECRET")
@@ -98,6 +129,7 @@ def generate_livekit_token(room_name: str, participant_identity: str) -> Optiona
         token = api.AccessToken(api_key, api_secret) \
             .with_identity(participant_identity) \
             .with_name(f"Student {participant_identity[:8]}") \
+            .with_metadata(json.dumps({"user_id": user_id} if user_id else {})) \
             .with_grants(api.VideoGrants(
                 room_join=True,
                 room=room_name,
@@ -125,83 +157,27 @@ async def root():
     }
 
 @app.get("/api/lessons", response_model=List[Lesson])
-async def get_lessons():
-    """Get all available lesson scenarios"""
-    lessons = [
-        {
-            "id": "restaurant",
-            "title": "Restaurant Conversation",
-            "description": "Order food, ask for recommendations, request the check",
-            "difficulty": "beginner",
-            "agent_type": "restaurant",
-            "category": "travel"
-        },
-        {
-            "id": "airport",
-            "title": "Airport Check-in",
-            "description": "Check luggage, get boarding pass, find your gate",
-            "difficulty": "beginner",
-            "agent_type": "airport",
-            "category": "travel"
-        },
-        {
-            "id": "hotel",
-            "title": "Hotel Booking",
-            "description": "Check in, ask about amenities, request services",
-            "difficulty": "beginner",
-            "agent_type": "hotel",
-            "category": "travel"
-        },
-        {
-            "id": "directions",
-            "title": "Asking for Directions",
-            "description": "Find places, understand directions, navigate the city",
-            "difficulty": "beginner",
-            "agent_type": "directions",
-            "category": "travel"
-        },
-        {
-            "id": "shopping",
-            "title": "Shopping",
-            "description": "Ask for sizes, colors, prices, and make purchases",
-            "difficulty": "intermediate",
-            "agent_type": "social",
-            "category": "daily_life"
-        },
-        {
-            "id": "social_meetup",
-            "title": "Meeting New People",
-            "description": "Introductions, small talk, making plans",
-            "difficulty": "beginner",
-            "agent_type": "social",
-            "category": "social"
-        },
-        {
-            "id": "social_party",
-            "title": "At a Party",
-            "description": "Casual conversations, mingling, expressing opinions",
-            "difficulty": "intermediate",
-            "agent_type": "social",
-            "category": "social"
-        },
-        {
-            "id": "exam_prep",
-            "title": "Oral Exam Practice",
-            "description": "Common exam questions, strategies, pronunciation tips",
-            "difficulty": "intermediate",
-            "agent_type": "teacher",
-            "category": "academic"
-        }
-    ]
-    return lessons
+async def get_lessons(request: Request, category: Optional[str] = None, difficulty: Optional[str] = None):
+    """Get all available lesson scenarios, optionally filtered by category and difficulty"""
+    return lesson_registry.catalog(category, difficulty).respond(request)
 
 @app.get("/api/content/{content_type}")
-async def get_content(content_type: str):
-    """Get specific Spanish content by type"""
-    if content_type not in spanish_content:
+async def get_content(content_type: str, request: Request):
+    """Get specific Spanish content by type (gzip/brotli, 304 on matching If-None-Match)"""
+    body = content_responses.get(content_type)
+    if body is None:
         raise HTTPException(status_code=404, detail=f"Content type '{content_type}' not found")
     
-    return spanish_content[content_type]
+    return body.respond(request)
+
+@app.get("/api/content/{content_type}/{item_path:path}")
+async def get_content_item(content_type: str, item_path: str):
+    """Get a single phrase, dialogue or question, e.g. /api/content/spanish_scenarios/scenarios/0"""
+    raw = spanish_content.store.get(f"item:{content_type}/{item_path}")
+    if raw is None:
+        raise HTTPException(status_code=404, detail=f"Content item '{content_type}/{item_path}' not found")
+    
+    return Response(content=raw, media_type="application/json")
 
 @app.post("/api/session/start", response_model=SessionResponse)
 async def start_session(request: SessionRequest):
@@ -214,32 +190,31 @@ async def start_session(request: SessionRequest):
     room_name = f"rapidolingo_{request.lesson_id}_{session_id}"
     participant_id = f"student_{uuid.uuid4().hex[:8]}"
     
-    # Agent mapping
-    agent_names = {
-        "restaurant": "Restaurant Agent (María)",
-        "airport": "Airport Agent (Carlos)",
-        "hotel": "Hotel Agent (Sofia)",
-        "directions": "Directions Agent (Miguel)",
-        "social": "Social Agent (Ana)",
-        "teacher": "Teacher Agent (Profesora López)"
-    }
-    
     # Get lesson details
-    lessons_response = await get_lessons()
-    lesson = next((l for l in lessons_response if l["id"] == request.lesson_id), None)
+    lesson = lesson_registry.get(request.lesson_id)
     
     if not lesson:
         raise HTTPException(status_code=404, detail="Lesson not found")
     
-    agent_name = agent_names.get(lesson["agent_type"], "Teacher Agent")
+    agent_name = lesson_registry.agent_name(lesson)
     
     # Generate LiveKit access token
-    token = generate_livekit_token(room_name, participant_id)
+    token = generate_livekit_token(room_name, participant_id, request.user_id)
     if not token:
         raise HTTPException(status_code=500, detail="Failed to generate session token")
     
     livekit_url = os.getenv("LIVEKIT_URL", "ws://localhost:7880")
     
+    await session_store.create(SessionRecord(
+        session_id=session_id,
+        room_name=room_name,
+        lesson_id=lesson["id"],
+        agent_type=lesson["agent_type"],
+        participant_id=participant_id,
+        started_at=time.time(),
+        user_id=request.user_id or "",
+    ))
+    
     print(f"[✓] Session created:")
     print(f"    - Session ID: {session_id}")
     print(f"    - Room: {room_name}")
@@ -256,23 +231,65 @@ async def start_session(request: SessionRequest):
 @app.get("/api/session/{session_id}/status")
 async def get_session_status(session_id: str):
     """Get status of an active session"""
-    # For MVP, return mock status
-    return {
-        "session_id": session_id,
-        "status": "active",
-        "duration_seconds": 0,
-        "messages_exchanged": 0
-    }
+    record = await session_store.get(session_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    return record.to_status()
+
+@app.post("/api/session/{session_id}/messages")
+async def record_session_messages(session_id: str, event: MessageEvent):
+    """Count messages exchanged in a session (reported by the agent worker)"""
+    record = await session_store.add_messages(session_id, event.count)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    return record.to_status()
 
 @app.post("/api/session/{session_id}/end")
 async def end_session(session_id: str):
     """End a tutoring session"""
+    record = await session_store.end(session_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
     return {
-        "session_id": session_id,
-        "status": "ended",
+        **record.to_status(),
         "message": "Session ended successfully"
     }
 
+@app.get("/api/progress/{user_id}")
+def get_learner_progress(user_id: str):
+    """Minutes practiced, accuracy per lesson, weak vocabulary and streak - rolled up as sessions end"""
+    return get_progress().get(user_id)
+
+@app.get("/api/review/{user_id}")
+def get_review_items(user_id: str, limit: int = SESSION_ITEMS):
+    """
+    Phrases, vocabulary and verbs due for spaced-repetition review, then new ones.
+    Grades made by the agents (other processes) can take up to REVIEW_CACHE_TTL
+    (30s by default) to show up here; grades POSTed to this API show at once.
+    """
+    return {"user_id": user_id, "items": get_scheduler().due(user_id, max(1, min(limit, 50)))}
+
+@app.post("/api/review/{user_id}")
+def grade_review_item(user_id: str, grade: ReviewGrade):
+    """Record how well the learner recalled an item and reschedule it"""
+    result = get_scheduler().grade(user_id, grade.item_id, grade.quality)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Review item '{grade.item_id}' not found")
+    
+    return result
+
+@app.get("/api/metrics/latency")
+def get_latency_metrics():
+    """Voice pipeline latency percentiles (ms) per lesson and agent, merged from every agent process"""
+    return load_registry().report()
+
+@app.on_event("shutdown")
+async def close_session_store():
+    await session_store.close()
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
@@ -0,0 +1,269 @@
+"""
+RápidoLingo opening turns
+A warm pool of pre-generated first turns per lesson - text and synthesized audio
+ready before the student joins, so on_enter plays the opening immediately
+instead of waiting on an LLM round trip and TTS.
+
+Job processes load the pools at prewarm and pick a random opening per
+session. Use counts are shared through the pool files (text and uses on disk
+under ../build/openings, audio in the TTS cache, updated under a file lock),
+and an opening played MAX_USES times is retired for every process. Job
+processes exit when their session ends, so they never refill: the CLI below
+tops the pools up, and supervisor.py runs it every OPENINGS_REFILL_INTERVAL.
+
+Fill every lesson's pool ahead of time:
+    python opening_pool.py
+"""
+
+import os
+import json
+import fcntl
+import random
+import asyncio
+import hashlib
+import logging
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Deque, Dict, Optional
+
+from livekit.agents import Agent, ChatContext
+from tts_cache import AudioCache, CachedAudio, cache_key, get_audio_cache, normalize_text, tts_params
+
+logger = logging.getLogger("rapidolingo")
+
+OPENINGS_DIR = Path(os.getenv("OPENINGS_DIR", "../build/openings"))
+
+# Openings kept ready per lesson, and how often each is played before it's replaced
+POOL_SIZE = int(os.getenv("OPENINGS_PER_LESSON", 4))
+MAX_USES = int(os.getenv("OPENING_MAX_USES", 3))
+
+# Higher than the conversation default so the pool doesn't fill with near-duplicates
+TEMPERATURE = 0.9
+
+
+@dataclass
+class Opening:
+    text: str
+    audio_key: str
+    audio: CachedAudio
+    uses: int = 0
+
+
+def fingerprint(agent: Agent, prompt: str, voice: str) -> str:
+    """Identifies everything an opening was generated from - a change invalidates the pool"""
+    material = "\x1f".join([
+        agent.instructions,
+        prompt,
+        voice,
+        getattr(agent.llm, "model", ""),
+        *(f"{k}={v}" for k, v in sorted(tts_params(agent.tts).items())),
+    ])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:16]
+
+
+async def generate_opening(agent: Agent, prompt: str) -> str:
+    """One opening turn from the agent's own LLM and instructions"""
+    chat_ctx = ChatContext.empty()
+    chat_ctx.add_message(role="system", content=agent.instructions)
+    chat_ctx.add_message(role="user", content=prompt)
+    parts = []
+    async with agent.llm.chat(chat_ctx=chat_ctx, extra_kwargs={"temperature": TEMPERATURE}) as stream:
+        async for chunk in stream:
+            if chunk.delta and chunk.delta.content:
+                parts.append(chunk.delta.content)
+    return normalize_text("".join(parts))
+
+
+async def _play(audio: CachedAudio):
+    for frame in audio.frames():
+        yield frame
+
+
+class OpeningPool:
+    """Per-lesson openings ready to play, with use counts shared across processes"""
+
+    def __init__(
+        self,
+        store_dir: Path = OPENINGS_DIR,
+        size: int = POOL_SIZE,
+        max_uses: int = MAX_USES,
+        cache: Optional[AudioCache] = None,
+    ):
+        self.store_dir = store_dir
+        self.size = size
+        self.max_uses = max_uses
+        self.cache = cache or get_audio_cache()
+        self._openings: Dict[str, Deque[Opening]] = {}
+        self._fingerprints: Dict[str, str] = {}
+        self._refills: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def ready(self, lesson_id: str) -> int:
+        return len(self._openings.get(lesson_id, ()))
+
+    def load(self):
+        """Read persisted pools from disk - blocking, meant for process prewarm"""
+        for path in self.store_dir.glob("*.json"):
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            openings = deque()
+            for entry in data.get("openings", []):
+                if entry.get("uses", 0) >= self.max_uses:
+                    continue
+                audio = self.cache.read(entry["audio_key"])
+                if audio is not None:  # The TTS cache may have trimmed it
+                    openings.append(Opening(entry["text"], entry["audio_key"], audio, entry.get("uses", 0)))
+            self._openings[path.stem] = openings
+            self._fingerprints[path.stem] = data.get("fingerprint", "")
+        if self._openings:
+            logger.info(f"Opening pool loaded: { {k: len(v) for k, v in self._openings.items()} }")
+
+    def _update(self, lesson_id: str, change: Callable[[Dict], None]):
+        """Read-modify-write a lesson's pool file under the pool lock (blocking)"""
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        path = self.store_dir / f"{lesson_id}.json"
+        with open(self.store_dir / ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                data = {}
+            change(data)
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+            os.replace(tmp_path, path)
+
+    def _add(self, lesson_id: str, current: str, opening: Opening):
+        """Persist a new opening; openings generated from other settings are dropped"""
+        def change(data: Dict):
+            if data.get("fingerprint") != current:
+                data["fingerprint"], data["openings"] = current, []
+            data["openings"].append({"text": opening.text, "audio_key": opening.audio_key, "uses": 0})
+        self._update(lesson_id, change)
+
+    def record_use(self, lesson_id: str, audio_key: str):
+        """Count a play of an opening for every process, retiring it at max_uses (blocking)"""
+        def change(data: Dict):
+            openings = []
+            for entry in data.get("openings", []):
+                if entry["audio_key"] == audio_key:
+                    entry["uses"] = entry.get("uses", 0) + 1
+                if entry.get("uses", 0) < self.max_uses:
+                    openings.append(entry)
+            data["openings"] = openings
+        self._update(lesson_id, change)
+
+    def _check(self, lesson_id: str, current: str) -> Deque[Opening]:
+        """The lesson's openings, dropped if they were generated from other settings"""
+        if self._fingerprints.get(lesson_id) != current:
+            self._fingerprints[lesson_id] = current
+            self._openings[lesson_id] = deque()
+        return self._openings.setdefault(lesson_id, deque())
+
+    def take(self, lesson_id: str, current: str) -> Optional[Opening]:
+        """
+        A random ready opening, or None if the pool is empty. Random, not in
+        turn - every job process starts from the same pool file - and the play
+        is counted in the shared file by record_use().
+        """
+        openings = self._check(lesson_id, current)
+        if not openings:
+            self.misses += 1
+            return None
+        self.hits += 1
+        opening = random.choice(openings)
+        opening.uses += 1
+        if opening.uses >= self.max_uses:
+            openings.remove(opening)
+        return opening
+
+    def refill(self, lesson_id: str, agent: Agent, prompt: str, voice: str):
+        """Top up a lesson's pool in a background task; no-op if full or already refilling"""
+        task = self._refills.get(lesson_id)
+        if task is not None and not task.done():
+            return
+        current = fingerprint(agent, prompt, voice)
+        if len(self._check(lesson_id, current)) >= self.size:
+            return
+        task = asyncio.create_task(self._refill(lesson_id, current, agent, prompt, voice))
+        task.add_done_callback(self._refill_done)
+        self._refills[lesson_id] = task
+
+    async def _refill(self, lesson_id: str, current: str, agent: Agent, prompt: str, voice: str):
+        openings = self._openings[lesson_id]
+        attempts = 0
+        while len(openings) < self.size and attempts < self.size * 2:
+            attempts += 1
+            text = await generate_opening(agent, prompt)
+            if not text or any(o.text == text for o in openings):
+                continue
+            await self.cache.prerender(agent.tts, voice, text)
+            key = cache_key(voice, text, tts_params(agent.tts))
+            audio = await self.cache.get(key)
+            if audio is None or self._fingerprints.get(lesson_id) != current:
+                return
+            opening = Opening(text, key, audio)
+            openings.append(opening)
+            await asyncio.to_thread(self._add, lesson_id, current, opening)
+        logger.info(f"Opening pool for {lesson_id}: {len(openings)} ready")
+
+    @staticmethod
+    def _refill_done(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Opening pool refill failed: {task.exception()!r}")
+
+    @staticmethod
+    def _use_done(future: asyncio.Future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning(f"[!] Could not record opening use: {future.exception()!r}")
+
+
+_pool: Optional[OpeningPool] = None
+
+
+def get_opening_pool() -> OpeningPool:
+    """Process-wide opening pool"""
+    global _pool
+    if _pool is None:
+        _pool = OpeningPool()
+    return _pool
+
+
+def start_lesson(agent: Agent, lesson_id: str, prompt: str, voice: str):
+    """
+    Open a lesson: play a pre-generated opening if one is ready, otherwise
+    generate it live. Refilling is left to `python opening_pool.py`.
+    """
+    pool = get_opening_pool()
+    opening = pool.take(lesson_id, fingerprint(agent, prompt, voice))
+    if opening is None:
+        return agent.session.generate_reply(user_input=prompt)
+    future = asyncio.get_running_loop().run_in_executor(None, pool.record_use, lesson_id, opening.audio_key)
+    future.add_done_callback(pool._use_done)
+    return agent.session.say(opening.text, audio=_play(opening.audio))
+
+
+async def _fill_all():
+    from working_agent import AGENT_CONFIGS, AGENT_CLASSES
+    from providers import get_pool
+
+    pool = get_opening_pool()
+    pool.load()
+    try:
+        for lesson_id, agent_class in AGENT_CLASSES.items():
+            config = AGENT_CONFIGS[lesson_id]
+            pool.refill(lesson_id, agent_class(), config["initial_prompt"], config["voice"])
+            task = pool._refills.get(lesson_id)
+            if task is not None:
+                await task
+            print(f"[✓] {lesson_id}: {pool.ready(lesson_id)} openings ready")
+    finally:
+        await get_pool().aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(_fill_all())
@@ -0,0 +1,371 @@
+"""
+RápidoLingo phrase matcher
+Scores a student's attempt at a known phrase locally, so the LLM doesn't have
+to grade replies that are just the expected answer.
+
+Every Spanish line in the content (beginner phrases, scenario and social
+dialogues, social expressions) goes into a character-trigram index. A
+transcript is matched to the phrase it most likely attempts, then aligned
+word by word against it. Word costs come from a numpy edit distance over
+accent-folded letters, so STT accent marks never count as mistakes. The
+result is a Verdict with an accuracy score and per-word errors, in well
+under a millisecond.
+
+Not every reply is an attempt at a phrase. A reply shorter than MIN_WORDS
+("no", "sí", "gracias") is only graded against a phrase the agent just asked
+for; longer replies must be about as long as the phrase they're graded
+against. A "..." in a phrase ("Me llamo...") is an open slot the student
+fills with their own words.
+
+Try it:
+    python phrase_matcher.py "una meza para dos por favor"
+    PROMPT="Now say gracias" python phrase_matcher.py "gracias"
+"""
+
+import re
+import sys
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from content_index import fold
+
+# Trigram similarity (Dice) a phrase needs to be considered at all
+MIN_SIMILARITY = 0.35
+
+# Accuracy below which the attempt isn't treated as that phrase
+MIN_ACCURACY = 0.7
+
+# Replies shorter than this are only graded against phrases the agent asked for
+MIN_WORDS = 3
+
+# Heard/expected word counts must be within this ratio of each other (either way)
+MIN_LENGTH_RATIO = 0.6
+
+# Most words a student may put into a "..." slot
+MAX_SLOT_WORDS = 4
+
+# Phrases aligned in full per attempt
+CANDIDATES = 5
+
+# A word this close (edit distance / length) counts as mispronounced, not wrong
+CLOSE_RATIO = 0.34
+
+# Cost of a word the student added (fillers like "eh" are common)
+EXTRA_WORD_COST = 0.5
+
+_WORD_RE = re.compile(r"[^\W_]+")
+_SLOT_RE = re.compile(r"\.\.\.|…")
+
+
+@dataclass(frozen=True)
+class Phrase:
+    id: str
+    spanish: str
+    english: str
+
+
+@dataclass(frozen=True)
+class WordError:
+    kind: str  # "missing", "extra", "close" or "wrong"
+    expected: str = ""
+    heard: str = ""
+
+    def describe(self) -> str:
+        if self.kind == "missing":
+            return f'missing "{self.expected}"'
+        if self.kind == "extra":
+            return f'extra "{self.heard}"'
+        return f'"{self.heard}" should be "{self.expected}"'
+
+
+@dataclass(frozen=True)
+class Verdict:
+    phrase: Phrase
+    accuracy: float  # 0..1, word-level
+    similarity: float  # Trigram match against the phrase
+    errors: Tuple[WordError, ...]
+
+    @property
+    def perfect(self) -> bool:
+        return not self.errors
+
+    def hint(self) -> str:
+        """Compact note for the LLM's context"""
+        said = f'"{self.phrase.spanish}" ({self.phrase.english})'
+        if self.perfect:
+            return f"Phrase check: the student said {said} perfectly."
+        errors = "; ".join(error.describe() for error in self.errors)
+        return f"Phrase check: the student attempted {said}, {self.accuracy:.0%} accurate. Errors: {errors}."
+
+
+def words(text: str) -> List[str]:
+    """Lowercased words with their accents"""
+    return _WORD_RE.findall(text.lower())
+
+
+def slot_position(spanish: str) -> int:
+    """Number of words before a phrase's "..." slot, or -1 without one"""
+    parts = _SLOT_RE.split(spanish, maxsplit=1)
+    return len(words(parts[0])) if len(parts) > 1 else -1
+
+
+def trigrams(folded_words: List[str]) -> set:
+    padded = f"  {' '.join(folded_words)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def iter_phrases(source: str, document) -> Iterator[Phrase]:
+    """Every dict with a Spanish line, wherever it sits in a context document"""
+    def walk(node, path):
+        if isinstance(node, dict):
+            if isinstance(node.get("spanish"), str):
+                yield Phrase("/".join([source, *path]), node["spanish"], node.get("english", ""))
+            for key, value in node.items():
+                yield from walk(value, path + [key])
+        elif isinstance(node, list):
+            for i, value in enumerate(node):
+                yield from walk(value, path + [str(i)])
+    yield from walk(document, [])
+
+
+def _codes(items: List[str], pad: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Words as a padded matrix of code points, plus their lengths"""
+    lengths = np.array([len(w) for w in items], dtype=np.int32)
+    codes = np.full((len(items), max(lengths.max(initial=0), 1)), pad, dtype=np.int32)
+    for i, w in enumerate(items):
+        codes[i, :len(w)] = [ord(c) for c in w]
+    return codes, lengths
+
+
+def _distances(a: np.ndarray, la: np.ndarray, b: np.ndarray, lb: np.ndarray) -> np.ndarray:
+    """
+    Levenshtein distance between every word of `a` and every word of `b`
+    (code point matrices from _codes). One numpy pass per character of the
+    longest `a` word: a DP row is the min of deletion/substitution, then a
+    running minimum resolves insertions along the row.
+    """
+    m, n = len(la), len(lb)
+    a, la = np.repeat(a, n, axis=0), np.repeat(la, n)
+    b, lb = np.tile(b, (m, 1)), np.tile(lb, m)
+    cols = np.arange(b.shape[1] + 1, dtype=np.int32)
+    row = np.tile(cols, (m * n, 1))
+    pairs = np.arange(m * n)
+    result = np.zeros(m * n, dtype=np.int32)
+    for i in range(1, a.shape[1] + 1):
+        step = np.empty_like(row)
+        step[:, 0] = i
+        step[:, 1:] = np.minimum(row[:, 1:] + 1, row[:, :-1] + (a[:, i - 1:i] != b))
+        row = cols + np.minimum.accumulate(step - cols, axis=1)
+        done = la == i
+        result[done] = row[pairs[done], lb[done]]
+    return result.reshape(m, n)
+
+
+def char_distances(heard: List[str], expected: List[str]) -> np.ndarray:
+    """Levenshtein distance between every heard and expected word (len(heard) x len(expected))"""
+    return _distances(*_codes(heard, -1), *_codes(expected, -2))
+
+
+def _backtrace(table: np.ndarray, ratio: np.ndarray, sub: np.ndarray, slot: int = -1) -> List[Tuple[int, int, str]]:
+    """(heard position, expected position, kind) of every error, 1-based, in order; slot words aren't errors"""
+    table, ratio, sub = table.tolist(), ratio.tolist(), sub.tolist()
+    errors = []
+    i, j = len(table) - 1, len(table[0]) - 1
+    while i or j:
+        if i and j and abs(table[i][j] - table[i - 1][j - 1] - sub[i - 1][j - 1]) < 1e-9:
+            if sub[i - 1][j - 1] > 0:
+                errors.append((i, j, "close" if ratio[i - 1][j - 1] <= CLOSE_RATIO else "wrong"))
+            i, j = i - 1, j - 1
+        elif j and abs(table[i][j] - table[i][j - 1] - 1) < 1e-9:
+            errors.append((i, j, "missing"))
+            j -= 1
+        else:
+            if j != slot:
+                errors.append((i, j, "extra"))
+            i -= 1
+    return errors[::-1]
+
+
+class PhraseMatcher:
+    """Trigram index over the content's Spanish phrases"""
+
+    def __init__(self, phrases: List[Phrase]):
+        unique: Dict[str, Phrase] = {}
+        for phrase in phrases:
+            unique.setdefault(" ".join(fold(w) for w in words(phrase.spanish)), phrase)
+        self.phrases = list(unique.values())
+        self._words = [words(p.spanish) for p in self.phrases]
+        self._slots = np.array([slot_position(p.spanish) for p in self.phrases], dtype=np.int64)
+        # Each phrase's words up to its slot, folded and space-delimited for substring search
+        self._fixed = [
+            f" {' '.join(fold(w) for w in (ws[:slot] if slot >= 0 else ws))} "
+            for ws, slot in zip(self._words, self._slots.tolist())
+        ]
+
+        # Every distinct folded word once, as code points; phrases point into it
+        vocabulary: Dict[str, int] = {}
+        self._columns = []
+        for ws in self._words:
+            folded = [fold(w) for w in ws]
+            self._columns.append(np.array([vocabulary.setdefault(w, len(vocabulary)) for w in folded]))
+        self._vocab_codes, self._vocab_lengths = _codes(list(vocabulary), -2)
+
+        postings: Dict[str, List[int]] = {}
+        sizes = []
+        for i, ws in enumerate(self._words):
+            grams = trigrams([fold(w) for w in ws])
+            sizes.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(i)
+        self._postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self._sizes = np.array(sizes, dtype=np.float64)
+
+    @classmethod
+    def from_store(cls, store) -> "PhraseMatcher":
+        phrases = []
+        for source in sorted(store.sources):
+            phrases.extend(iter_phrases(source, store.document(source)))
+        return cls(phrases)
+
+    def candidates(self, folded: List[str], k: int = CANDIDATES) -> List[Tuple[int, float]]:
+        """(phrase index, Dice similarity) of the closest phrases by trigrams"""
+        grams = trigrams(folded)
+        hits = [self._postings[g] for g in grams if g in self._postings]
+        if not hits:
+            return []
+        shared = np.bincount(np.concatenate(hits), minlength=len(self.phrases))
+        dice = 2 * shared / (self._sizes + len(grams))
+        # A slot phrase only needs its fixed words covered - the slot's words are the student's own
+        similarity = np.where(self._slots >= 0, np.minimum(1.0, shared / self._sizes), dice)
+        top = np.argsort(-similarity)[:k]
+        return [(int(i), float(similarity[i])) for i in top if similarity[i] >= MIN_SIMILARITY]
+
+    def comparable(self, heard: int, index: int) -> bool:
+        """Whether a reply of `heard` words is about the length of phrase `index`"""
+        expected = len(self._words[index])
+        if self._slots[index] >= 0:
+            return expected <= heard <= expected + MAX_SLOT_WORDS
+        return min(heard, expected) >= MIN_LENGTH_RATIO * max(heard, expected)
+
+    def prompted(self, prompt: str) -> List[int]:
+        """Phrases the agent's message contains word for word - what it asked the student to say"""
+        said = f" {' '.join(fold(w) for w in words(prompt))} "
+        return [index for index, fixed in enumerate(self._fixed) if fixed.strip() and fixed in said]
+
+    def _best(self, heard: List[str], candidates: List[Tuple[int, float]]) -> Verdict:
+        """Align the attempt against every candidate in one batch; the best one, scored"""
+        a, la = _codes([fold(w) for w in heard], -1)
+        m, c = len(heard), len(candidates)
+        columns = [self._columns[index] for index, _ in candidates]
+        n = np.array([len(cols) for cols in columns])
+        width = n.max()
+
+        # Char distances over the candidates' distinct words only
+        used, positions = np.unique(np.concatenate(columns), return_inverse=True)
+        distances = _distances(a, la, self._vocab_codes[used], self._vocab_lengths[used])
+        position = np.zeros((c, width), dtype=np.intp)
+        for k, (start, size) in enumerate(zip(np.cumsum(n) - n, n)):
+            position[k, :size] = positions[start:start + size]
+
+        # (candidate, heard word, expected word) edit ratio and substitution cost;
+        # padding columns beyond a candidate's length are never read back
+        lengths = np.maximum(la[None, :, None], self._vocab_lengths[used][position][:, None, :])
+        ratio = distances[:, position].transpose(1, 0, 2) / lengths
+        sub = np.where(ratio <= CLOSE_RATIO, ratio, 1.0)
+
+        # Extra words are free in a candidate's "..." slot column
+        slots = self._slots[[index for index, _ in candidates]]
+        extra = np.full((c, width + 1), EXTRA_WORD_COST)
+        has_slot = slots >= 0
+        extra[has_slot, slots[has_slot]] = 0.0
+
+        # Word-level DP for all candidates at once, one vectorized row per heard word
+        cols = np.arange(width + 1, dtype=float)
+        table = np.empty((c, m + 1, width + 1))
+        table[:, 0] = cols
+        for i in range(1, m + 1):
+            step = np.empty((c, width + 1))
+            step[:, 0] = table[:, i - 1, 0] + extra[:, 0]
+            step[:, 1:] = np.minimum(table[:, i - 1, 1:] + extra[:, 1:], table[:, i - 1, :-1] + sub[:, i - 1])
+            table[:, i] = cols + np.minimum.accumulate(step - cols, axis=1)
+
+        costs = table[np.arange(c), m, n]
+        best = int(np.argmin(costs / n))
+        index, similarity = candidates[best]
+        size = n[best]
+        aligned = _backtrace(table[best, :, :size + 1], ratio[best, :, :size], sub[best, :, :size], int(slots[best]))
+        expected = self._words[index]
+        errors = tuple(
+            WordError(
+                kind,
+                expected=expected[j - 1] if kind != "extra" else "",
+                heard=heard[i - 1] if kind != "missing" else "",
+            )
+            for i, j, kind in aligned
+        )
+        accuracy = max(0.0, 1 - float(costs[best]) / size)
+        return Verdict(self.phrases[index], round(accuracy, 3), round(similarity, 3), errors)
+
+    def score(self, transcript: str, index: int) -> Optional[Verdict]:
+        """Score an attempt against one given phrase"""
+        heard = words(transcript)
+        return self._best(heard, [(index, 1.0)]) if heard else None
+
+    def match(self, transcript: str, prompt: str = "") -> Optional[Verdict]:
+        """
+        The phrase the student most likely attempted, scored - or None for free
+        speech. `prompt` is the agent's last message: short replies are only
+        graded against the phrases it asked for.
+        """
+        heard = words(transcript)
+        if not heard:
+            return None
+        if len(heard) < MIN_WORDS:
+            asked = set(self.prompted(prompt)) if prompt else set()
+            candidates = [(i, sim) for i, sim in self.candidates([fold(w) for w in heard]) if i in asked]
+        else:
+            candidates = self.candidates([fold(w) for w in heard])
+        candidates = [(i, sim) for i, sim in candidates if self.comparable(len(heard), i)]
+        if not candidates:
+            return None
+        verdict = self._best(heard, candidates)
+        return verdict if verdict.accuracy >= MIN_ACCURACY else None
+
+
+_matcher: Optional[PhraseMatcher] = None
+_matcher_lock = threading.Lock()
+
+
+def get_matcher() -> PhraseMatcher:
+    """Process-wide matcher over the content library, rebuilt when content reloads"""
+    global _matcher
+    if _matcher is None:
+        with _matcher_lock:
+            if _matcher is None:
+                from content_library import get_library
+                library = get_library()
+                _matcher = PhraseMatcher.from_store(library.store)
+                library.on_reload(_rebuild)
+    return _matcher
+
+
+def _rebuild(snapshot, _sources):
+    global _matcher
+    _matcher = PhraseMatcher.from_store(snapshot.store)
+
+
+if __name__ == "__main__":
+    import os
+    import time
+    from content_library import get_library
+
+    matcher = PhraseMatcher.from_store(get_library(watch=False).store)
+    print(f"[✓] {len(matcher.phrases)} phrases indexed")
+    for attempt in sys.argv[1:]:
+        started = time.perf_counter()
+        verdict = matcher.match(attempt, prompt=os.getenv("PROMPT", ""))
+        elapsed = (time.perf_counter() - started) * 1e6
+        print(f"{attempt!r} ({elapsed:.0f}µs): {verdict.hint() if verdict else 'no known phrase'}")
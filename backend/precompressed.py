@@ -0,0 +1,86 @@
+"""
+RápidoLingo precompressed responses
+Static JSON bodies encoded once (identity, gzip, brotli) with strong ETags, so
+repeat requests cost a header check and a memory copy instead of serialization.
+"""
+
+import gzip
+import hashlib
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:  # Optional - clients fall back to gzip
+    brotli = None
+
+# Revalidate every time; a matching ETag makes that a bodiless 304
+CACHE_CONTROL = "no-cache"
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    """Parse Accept-Encoding into {coding: q}"""
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = q
+    return accepted
+
+
+class PrecompressedBody:
+    """One JSON body with every encoding and its strong ETag prepared up front"""
+
+    def __init__(self, raw: bytes, media_type: str = "application/json"):
+        self.media_type = media_type
+        tag = hashlib.sha256(raw).hexdigest()[:20]
+        # Each encoding is a different representation, so each gets its own ETag
+        self.variants: Dict[str, Tuple[bytes, str]] = {
+            "identity": (raw, f'"{tag}"'),
+            "gzip": (gzip.compress(raw, compresslevel=9, mtime=0), f'"{tag}-gzip"'),
+        }
+        if brotli is not None:
+            self.variants["br"] = (brotli.compress(raw, quality=11), f'"{tag}-br"')
+        self._etags = {etag for _, etag in self.variants.values()}
+
+    def choose(self, accept_encoding: Optional[str]) -> str:
+        """Smallest encoding the client accepts"""
+        accepted = _accepted_encodings(accept_encoding or "")
+        wildcard = accepted.get("*", 0.0)
+        candidates: List[str] = [
+            coding for coding in ("br", "gzip")
+            if coding in self.variants and accepted.get(coding, wildcard) > 0
+        ]
+        return min(candidates, key=lambda c: len(self.variants[c][0]), default="identity")
+
+    def not_modified(self, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        for candidate in if_none_match.split(","):
+            candidate = candidate.strip()
+            if candidate == "*":
+                return True
+            if candidate.startswith("W/"):
+                candidate = candidate[2:]  # If-None-Match uses weak comparison
+            if candidate in self._etags:
+                return True
+        return False
+
+    def respond(self, request: Request) -> Response:
+        """304 if the client's copy is current, else the best precompressed body"""
+        coding = self.choose(request.headers.get("accept-encoding"))
+        body, etag = self.variants[coding]
+        headers = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": CACHE_CONTROL}
+        if self.not_modified(request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=headers)
+        if coding != "identity":
+            headers["Content-Encoding"] = coding
+        return Response(content=body, media_type=self.media_type, headers=headers)
@@ -0,0 +1,268 @@
+"""
+RápidoLingo learner progress
+Rollups per learner - minutes practiced, accuracy per lesson, weak vocabulary
+and the daily streak - kept up to date when a voice session ends, so reading
+a learner's progress is a few primary-key lookups however long their history.
+
+The agent collects a SessionStats from the local phrase and grammar verdicts
+during the session and folds it into ../build/progress.db (SQLite, WAL) in one
+transaction when the session ends; the API only reads the rollups for
+/api/progress/{user_id}.
+
+Usage, in an entrypoint:
+    stats = session_stats(session)  # agents add verdicts to it
+    ...
+    await asyncio.to_thread(get_progress().record_session, user_id, lesson_id, started_at, time.time(), stats)
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+import weakref
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Optional
+
+PROGRESS_DB = Path(os.getenv("PROGRESS_DB", "../build/progress.db"))
+
+# Weak words kept per learner, and how many the API returns
+WEAK_WORDS_KEPT = int(os.getenv("PROGRESS_WEAK_WORDS_KEPT", 50))
+WEAK_WORDS_SHOWN = 10
+
+# Grammar issues that point at a specific noun
+NOUN_ISSUES = ("gender", "number", "article")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS learners (
+    user_id TEXT PRIMARY KEY,
+    sessions INTEGER NOT NULL,
+    seconds REAL NOT NULL,
+    streak INTEGER NOT NULL,
+    best_streak INTEGER NOT NULL,
+    last_day TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lessons (
+    user_id TEXT NOT NULL,
+    lesson_id TEXT NOT NULL,
+    sessions INTEGER NOT NULL,
+    seconds REAL NOT NULL,
+    attempts INTEGER NOT NULL,
+    perfect INTEGER NOT NULL,
+    accuracy_total REAL NOT NULL,
+    grammar_issues INTEGER NOT NULL,
+    PRIMARY KEY (user_id, lesson_id)
+);
+CREATE TABLE IF NOT EXISTS weak_words (
+    user_id TEXT NOT NULL,
+    word TEXT NOT NULL,
+    misses INTEGER NOT NULL,
+    hits INTEGER NOT NULL,
+    weakness INTEGER NOT NULL,
+    PRIMARY KEY (user_id, word)
+);
+CREATE INDEX IF NOT EXISTS weak_words_rank ON weak_words (user_id, weakness DESC);
+"""
+
+_WORD_RE = re.compile(r"[^\W\d_]+")
+
+
+@dataclass
+class SessionStats:
+    """What one session adds to a learner's rollups"""
+    attempts: int = 0  # Replies graded against a known phrase
+    perfect: int = 0
+    accuracy_total: float = 0.0
+    grammar_issues: int = 0
+    missed: Counter = field(default_factory=Counter)  # Words got wrong
+    practiced: Counter = field(default_factory=Counter)  # Words got right
+
+    def add_verdict(self, verdict):
+        """A phrase_matcher.Verdict"""
+        self.attempts += 1
+        self.perfect += verdict.perfect
+        self.accuracy_total += float(verdict.accuracy)
+        wrong = {word for error in verdict.errors for word in _WORD_RE.findall(error.expected.lower())}
+        self.missed.update(wrong)
+        self.practiced.update(w for w in _WORD_RE.findall(verdict.phrase.spanish.lower()) if w not in wrong)
+
+    def add_grammar(self, report):
+        """A grammar_check.GrammarReport"""
+        self.grammar_issues += len(report.issues)
+        self.missed.update(
+            issue.suggestion.split()[-1] for issue in report.issues if issue.kind in NOUN_ISSUES and issue.suggestion
+        )
+
+
+# AgentSession -> its stats, so agents can add verdicts
+_stats: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def session_stats(session) -> SessionStats:
+    """The stats an AgentSession is collecting"""
+    stats = _stats.get(session)
+    if stats is None:
+        stats = _stats[session] = SessionStats()
+    return stats
+
+
+def learner_id(participant) -> Optional[str]:
+    """user_id from a participant's token metadata (set by /api/session/start)"""
+    try:
+        return json.loads(participant.metadata or "{}").get("user_id") or None
+    except (ValueError, AttributeError):
+        return None
+
+
+def current_learner() -> Optional[str]:
+    """user_id of the student in the current job's room, if they have one"""
+    from livekit.agents import get_job_context
+    try:
+        room = get_job_context().room
+    except RuntimeError:  # Not running in a job
+        return None
+    for participant in room.remote_participants.values():
+        user_id = learner_id(participant)
+        if user_id:
+            return user_id
+    return None
+
+
+def _streak(streak: int, last_day: str, today: date) -> int:
+    """The streak after practicing today"""
+    if last_day == today.isoformat():
+        return streak
+    if last_day == (today - timedelta(days=1)).isoformat():
+        return streak + 1
+    return 1
+
+
+class ProgressStore:
+    """SQLite rollups; one connection shared by the threads calling in"""
+
+    def __init__(self, path: Path = PROGRESS_DB):
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(SCHEMA)
+        return self._db
+
+    def record_session(self, user_id: str, lesson_id: str, started_at: float, ended_at: float,
+                       stats: SessionStats, today: Optional[date] = None):
+        """Fold one ended session into the learner's rollups (blocking - run it off the event loop)"""
+        today = today or date.fromtimestamp(ended_at)
+        seconds = max(0.0, ended_at - started_at)
+        with self._lock:
+            db = self._connect()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute(
+                    "SELECT streak, best_streak, last_day FROM learners WHERE user_id = ?", (user_id,)
+                ).fetchone()
+                streak = _streak(row[0], row[2], today) if row else 1
+                db.execute(
+                    """INSERT INTO learners VALUES (?, 1, ?, ?, ?, ?, ?)
+                    ON CONFLICT (user_id) DO UPDATE SET
+                        sessions = sessions + 1, seconds = seconds + excluded.seconds, streak = excluded.streak,
+                        best_streak = MAX(best_streak, excluded.streak), last_day = excluded.last_day,
+                        updated_at = excluded.updated_at""",
+                    (user_id, seconds, streak, streak, today.isoformat(), time.time()),
+                )
+                db.execute(
+                    """INSERT INTO lessons VALUES (?, ?, 1, ?, ?, ?, ?, ?)
+                    ON CONFLICT (user_id, lesson_id) DO UPDATE SET
+                        sessions = sessions + 1, seconds = seconds + excluded.seconds,
+                        attempts = attempts + excluded.attempts, perfect = perfect + excluded.perfect,
+                        accuracy_total = accuracy_total + excluded.accuracy_total,
+                        grammar_issues = grammar_issues + excluded.grammar_issues""",
+                    (user_id, lesson_id, seconds, stats.attempts, stats.perfect,
+                     stats.accuracy_total, stats.grammar_issues),
+                )
+                self._update_words(db, user_id, stats)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _update_words(db: sqlite3.Connection, user_id: str, stats: SessionStats):
+        misses, hits = stats.missed, stats.practiced
+        # Only words already weak earn hits back - practicing known words adds no rows
+        rows = [(user_id, w, misses[w], hits[w], misses[w] - hits[w]) for w in misses]
+        db.executemany(
+            """INSERT INTO weak_words VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (user_id, word) DO UPDATE SET
+                misses = misses + excluded.misses, hits = hits + excluded.hits,
+                weakness = weakness + excluded.weakness""",
+            rows,
+        )
+        db.executemany(
+            "UPDATE weak_words SET hits = hits + ?, weakness = weakness - ? WHERE user_id = ? AND word = ?",
+            [(n, n, user_id, w) for w, n in hits.items() if w not in misses],
+        )
+        # Keep the list bounded: drop mastered words and everything past the weakest N
+        db.execute(
+            """DELETE FROM weak_words WHERE user_id = ? AND (weakness <= 0 OR word NOT IN (
+                SELECT word FROM weak_words WHERE user_id = ? ORDER BY weakness DESC LIMIT ?))""",
+            (user_id, user_id, WEAK_WORDS_KEPT),
+        )
+
+    def get(self, user_id: str) -> Dict:
+        """A learner's rollups, as served by /api/progress/{user_id}"""
+        with self._lock:
+            db = self._connect()
+            learner = db.execute(
+                "SELECT sessions, seconds, streak, best_streak, last_day FROM learners WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            lessons = db.execute(
+                "SELECT lesson_id, sessions, seconds, attempts, perfect, accuracy_total, grammar_issues "
+                "FROM lessons WHERE user_id = ?", (user_id,)
+            ).fetchall()
+            words = db.execute(
+                "SELECT word, misses, hits FROM weak_words WHERE user_id = ? ORDER BY weakness DESC LIMIT ?",
+                (user_id, WEAK_WORDS_SHOWN),
+            ).fetchall()
+
+        sessions, seconds, streak, best_streak, last_day = learner or (0, 0.0, 0, 0, "")
+        # A streak is still alive until a full day is skipped
+        if last_day < (date.today() - timedelta(days=1)).isoformat():
+            streak = 0
+        return {
+            "user_id": user_id,
+            "sessions": sessions,
+            "minutes_practiced": round(seconds / 60, 1),
+            "streak": {"current": streak, "best": best_streak, "last_practiced": last_day or None},
+            "lessons": {
+                lesson_id: {
+                    "sessions": n,
+                    "minutes_practiced": round(secs / 60, 1),
+                    "attempts": attempts,
+                    "perfect": perfect,
+                    "accuracy": round(total / attempts, 3) if attempts else None,
+                    "grammar_issues": issues,
+                }
+                for lesson_id, n, secs, attempts, perfect, total, issues in lessons
+            },
+            "weak_vocabulary": [{"word": w, "misses": m, "hits": h} for w, m, h in words],
+        }
+
+
+_store: Optional[ProgressStore] = None
+
+
+def get_progress() -> ProgressStore:
+    global _store
+    if _store is None:
+        _store = ProgressStore()
+    return _store
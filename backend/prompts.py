@@ -0,0 +1,157 @@
+"""
+RápidoLingo prompt registry
+Renders each agent class's instructions once per process - and again only when
+the content library reloads - instead of in every constructor. Agents get the
+same interned string every time, so a handoff does no disk reads or string
+building, and every prompt's size is known up front.
+
+An agent class provides its instructions through a classmethod:
+
+    class RestaurantAgent(Agent):
+        @classmethod
+        def build_instructions(cls) -> str:
+            return f"...{embed(format_snippets(snippets))}..."
+
+        def __init__(self):
+            super().__init__(instructions=get_prompts().text(type(self)), ...)
+
+Multi-line values go through embed() so their lines carry the template's
+indent and render() can dedent the whole prompt.
+
+Print every agent's prompt size:
+    python prompts.py
+"""
+
+import sys
+import logging
+import textwrap
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List
+
+from history import estimate_tokens
+
+logger = logging.getLogger("rapidolingo")
+
+
+@dataclass(frozen=True)
+class Prompt:
+    agent: str  # "module.Class" - agents.py and working_agent.py share class names
+    text: str
+    tokens: int
+    version: int  # Bumped on every re-render
+
+
+# Indent of the f-string templates in build_instructions()
+TEMPLATE_INDENT = " " * 8
+
+
+def embed(text: str, indent: str = TEMPLATE_INDENT) -> str:
+    """Multi-line text for a build_instructions() template - lines after the first get the template's indent"""
+    return text.replace("\n", "\n" + indent)
+
+
+def agent_key(agent_class: type) -> str:
+    return f"{agent_class.__module__}.{agent_class.__qualname__}"
+
+
+def render(agent_class: type, version: int = 1) -> Prompt:
+    """Build, normalize and intern one agent class's instructions"""
+    text = textwrap.dedent(agent_class.build_instructions()).strip()
+    return Prompt(agent_key(agent_class), sys.intern(text), estimate_tokens(text), version)
+
+
+class PromptRegistry:
+    """Rendered instructions keyed by agent class; lookups never block on a render"""
+
+    def __init__(self):
+        self._prompts: Dict[type, Prompt] = {}
+        self._lock = threading.Lock()
+
+    def get(self, agent_class: type) -> Prompt:
+        prompt = self._prompts.get(agent_class)
+        if prompt is None:
+            with self._lock:
+                prompt = self._prompts.get(agent_class)
+                if prompt is None:
+                    prompt = render(agent_class)
+                    self._prompts = {**self._prompts, agent_class: prompt}
+                    logger.info(f"Prompt for {prompt.agent}: ~{prompt.tokens} tokens")
+        return prompt
+
+    def text(self, agent_class: type) -> str:
+        return self.get(agent_class).text
+
+    def render_all(self, agent_classes: Iterable[type]):
+        """Render up front, e.g. at process prewarm"""
+        for agent_class in agent_classes:
+            self.get(agent_class)
+
+    def rerender(self, *_):
+        """Re-render everything already rendered - hooked to content reloads"""
+        with self._lock:
+            prompts = {}
+            for agent_class, old in self._prompts.items():
+                try:
+                    prompts[agent_class] = render(agent_class, old.version + 1)
+                except Exception as e:  # Keep serving the previous prompt
+                    logger.warning(f"[!] Could not re-render prompt for {old.agent}: {e}")
+                    prompts[agent_class] = old
+            self._prompts = prompts  # Atomic swap
+        logger.info(f"Prompts re-rendered: {self.sizes()}")
+
+    def watch(self, library):
+        """Re-render when the content library reloads (see content_library.py)"""
+        library.on_reload(self.rerender)
+
+    def sizes(self) -> Dict[str, int]:
+        """Estimated tokens per agent class"""
+        return {prompt.agent: prompt.tokens for prompt in self._prompts.values()}
+
+    def prompts(self) -> List[Prompt]:
+        return list(self._prompts.values())
+
+
+_registry = PromptRegistry()
+
+
+def get_prompts() -> PromptRegistry:
+    return _registry
+
+
+def main() -> int:
+    """Print every prompt's size; exit status 1 if any prompt fails a check"""
+    import agents
+    import working_agent
+
+    logging.getLogger("rapidolingo").setLevel(logging.WARNING)
+    # Scenario a dialogue or phrase category belongs to - a prompt may only carry its agent's own
+    owners = {f"[scenarios: {s.title}]": s.title
+              for s in agents.CONTENT.store.snippets("spanish_scenarios") if s.kind == "scenarios"}
+    owners.update({f"category: {category};": title for category, title in agents.SCENARIO_CATEGORIES.items()})
+    failures = 0
+    print("=" * 60)
+    for module, classes in (
+        ("agents.py", [agents.TeacherAgent, agents.RestaurantAgent, agents.AirportAgent,
+                       agents.HotelAgent, agents.DirectionsAgent, agents.SocialAgent]),
+        ("working_agent.py", list(working_agent.AGENT_CLASSES.values())),
+    ):
+        print(module)
+        for agent_class in classes:
+            prompt = _registry.get(agent_class)
+            print(f"  {agent_class.__name__:<20}{prompt.tokens:>7} tokens{len(prompt.text):>8} chars")
+            indented = [line for line in prompt.text.splitlines() if line.startswith(TEMPLATE_INDENT)]
+            if indented:
+                failures += 1
+                print(f"  [!] {prompt.agent} prompt was not dedented: {indented[0]!r}")
+            foreign = [marker for marker, owner in owners.items()
+                       if marker in prompt.text and owner != getattr(agent_class, "scenario", "")]
+            if foreign:
+                failures += 1
+                print(f"  [!] {prompt.agent} prompt carries another scenario's content: {foreign}")
+    print("=" * 60)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""
+RápidoLingo shared agent resources
+Models loaded once per worker process and shared read-only by every job and agent,
+plus a pool of keep-alive LLM/STT/TTS clients reused across sessions and handoffs
+"""
+
+import os
+import asyncio
+import logging
+import threading
+import weakref
+import aiohttp
+import httpx
+import openai as openai_sdk
+from livekit.agents import JobProcess
+from livekit.plugins import openai, silero, cartesia, deepgram
+
+logger = logging.getLogger("rapidolingo")
+
+CEREBRAS_BASE_URL = "https://api.cerebras.ai/v1"
+DEFAULT_LLM_MODEL = "llama-3.3-70b"
+
+_vad = None
+_vad_lock = threading.Lock()
+
+
+def get_vad():
+    """Return the process-wide Silero VAD model, loading it on first use"""
+    global _vad
+    if _vad is None:
+        with _vad_lock:
+            if _vad is None:
+                _vad = silero.VAD.load()
+                logger.info("Silero VAD loaded for this process")
+    return _vad
+
+
+def prewarm(proc: JobProcess):
+    """Prewarm hook for WorkerOptions - runs before the process accepts any job"""
+    proc.userdata["vad"] = get_vad()
+
+
+class ProviderPool:
+    """
+    Plugin clients shared by every agent running on one event loop.
+
+    Clients are keyed by model/voice and own their HTTP connections instead of
+    borrowing the per-job session, so warm keep-alive and websocket connections
+    survive handoffs and carry over to the next job on the same process.
+    """
+
+    def __init__(self):
+        self._http_session: aiohttp.ClientSession | None = None
+        self._openai_clients: dict[str, openai_sdk.AsyncClient] = {}
+        self._clients: dict[tuple, object] = {}
+
+    def http_session(self) -> aiohttp.ClientSession:
+        """Keep-alive aiohttp session used by the Cartesia and Deepgram plugins"""
+        if self._http_session is None or self._http_session.closed:
+            connector = aiohttp.TCPConnector(limit_per_host=50, keepalive_timeout=120)
+            self._http_session = aiohttp.ClientSession(connector=connector)
+        return self._http_session
+
+    def openai_client(self, base_url: str = CEREBRAS_BASE_URL) -> openai_sdk.AsyncClient:
+        """Keep-alive OpenAI-compatible client for one base URL"""
+        client = self._openai_clients.get(base_url)
+        if client is None:
+            client = openai_sdk.AsyncClient(
+                api_key=os.getenv("CEREBRAS_API_KEY"),
+                base_url=base_url,
+                max_retries=0,
+                http_client=httpx.AsyncClient(
+                    timeout=httpx.Timeout(connect=15.0, read=5.0, write=5.0, pool=5.0),
+                    follow_redirects=True,
+                    limits=httpx.Limits(
+                        max_connections=50,
+                        max_keepalive_connections=50,
+                        keepalive_expiry=120,
+                    ),
+                ),
+            )
+            self._openai_clients[base_url] = client
+        return client
+
+    def _get(self, key: tuple, factory):
+        client = self._clients.get(key)
+        if client is None:
+            client = factory()
+            self._clients[key] = client
+            logger.info(f"Provider client created: {key}")
+        return client
+
+    def llm(self, model: str = DEFAULT_LLM_MODEL, base_url: str = CEREBRAS_BASE_URL):
+        """Cerebras LLM for a model"""
+        return self._get(
+            ("llm", model, base_url),
+            lambda: openai.LLM.with_cerebras(
+                model=model, base_url=base_url, client=self.openai_client(base_url)
+            ),
+        )
+
+    def deepgram_stt(self, model: str = "nova-3-general", language: str = "multi"):
+        """Deepgram streaming STT for a model/language pair"""
+        return self._get(
+            ("deepgram_stt", model, language),
+            lambda: deepgram.STT(
+                model=model, language=language, http_session=self.http_session()
+            ),
+        )
+
+    def cartesia_stt(self):
+        """Cartesia STT with default settings"""
+        return self._get(
+            ("cartesia_stt",),
+            lambda: cartesia.STT(http_session=self.http_session()),
+        )
+
+    def cartesia_tts(self, voice: str):
+        """Cartesia TTS for a voice - the websocket is opened as soon as it's created"""
+        def create():
+            tts = cartesia.TTS(voice=voice, http_session=self.http_session())
+            tts.prewarm()
+            return tts
+
+        return self._get(("cartesia_tts", voice), create)
+
+    async def aclose(self):
+        """Close every pooled client and connection"""
+        for client in self._clients.values():
+            aclose = getattr(client, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        self._clients.clear()
+        for client in self._openai_clients.values():
+            await client.close()
+        self._openai_clients.clear()
+        if self._http_session is not None:
+            await self._http_session.close()
+            self._http_session = None
+
+
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ProviderPool]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_pool() -> ProviderPool:
+    """Return the provider pool for the running event loop (one per job process)"""
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = ProviderPool()
+        _pools[loop] = pool
+    return pool
@@ -0,0 +1,333 @@
+"""
+RápidoLingo review scheduler
+Spaced repetition (SM-2) over the content's practice items: the beginner
+phrases, each scenario's vocabulary list, the exam questions and the verb
+conjugation table.
+
+Each learner's state is a handful of parallel arrays over the items they have
+seen (ease, interval, repetitions, due time) plus a heap of (due, slot), so
+the next due item comes off in O(log n) however many items a learner has.
+Unseen items are introduced in content order after the due ones. Grades are
+written through to ../build/review.db (SQLite, WAL) one row per learner/item;
+each process keeps recently used learners in memory and reloads them when
+their cached state is older than REVIEW_CACHE_TTL, since agents and the API
+both grade.
+
+Grades come from the local phrase check (see phrase_matcher.py) during
+lessons and from POST /api/review/{user_id}; GET /api/review/{user_id} and
+the teacher agents read the due items.
+
+Try it:
+    python review.py some_learner
+"""
+
+import os
+import heapq
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger("rapidolingo")
+
+REVIEW_DB = Path(os.getenv("REVIEW_DB", "../build/review.db"))
+
+# Learners kept in memory per process, and how long their cached state is trusted
+MAX_CACHED_LEARNERS = int(os.getenv("REVIEW_MAX_CACHED_LEARNERS", 20000))
+CACHE_TTL = float(os.getenv("REVIEW_CACHE_TTL", 30))
+
+# Items a teacher session works into the conversation
+SESSION_ITEMS = int(os.getenv("REVIEW_SESSION_ITEMS", 5))
+
+DAY = 24 * 60 * 60
+
+# SM-2 parameters; a failed item comes back later in the same session
+INITIAL_EASE = 2.5
+MIN_EASE = 1.3
+RELEARN_SECONDS = 10 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS review (
+    user_id TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    ease REAL NOT NULL,
+    interval REAL NOT NULL,
+    reps INTEGER NOT NULL,
+    due REAL NOT NULL,
+    PRIMARY KEY (user_id, item_id)
+);
+"""
+
+
+@dataclass(frozen=True)
+class ReviewItem:
+    id: str  # Same ids as phrase_matcher phrases, so verdicts grade items directly
+    kind: str  # "phrase", "vocabulary", "exam" or "verb"
+    spanish: str
+    english: str = ""
+
+    def to_dict(self) -> Dict:
+        return {"id": self.id, "kind": self.kind, "spanish": self.spanish, "english": self.english}
+
+
+def iter_items(store) -> Iterator[ReviewItem]:
+    """Practice items from the content, in teaching order"""
+    sources = store.sources
+    if "spanish_beginner" in sources:
+        for i, phrase in enumerate(store.document("spanish_beginner").get("beginner_phrases", [])):
+            yield ReviewItem(f"spanish_beginner/beginner_phrases/{i}", "phrase", phrase["spanish"], phrase.get("english", ""))
+    if "spanish_scenarios" in sources:
+        for i, scenario in enumerate(store.document("spanish_scenarios").get("scenarios", [])):
+            for j, word in enumerate(scenario.get("vocabulary", [])):
+                yield ReviewItem(f"spanish_scenarios/scenarios/{i}/vocabulary/{j}", "vocabulary", word, scenario.get("title", ""))
+    if "spanish_exam_prep" in sources:
+        exam = store.document("spanish_exam_prep").get("exam_prep", {})
+        for i, question in enumerate(exam.get("common_oral_exam_questions", [])):
+            yield ReviewItem(f"spanish_exam_prep/exam_prep/common_oral_exam_questions/{i}", "exam",
+                             question["question_spanish"], question.get("question_english", ""))
+        verbs = exam.get("quick_verb_conjugations", {}).get("present_tense_examples", [])
+        for i, verb in enumerate(verbs):
+            forms = ", ".join(f"{person} {verb[person]}" for person in ("yo", "tú", "él/ella") if person in verb)
+            yield ReviewItem(f"spanish_exam_prep/exam_prep/quick_verb_conjugations/present_tense_examples/{i}",
+                             "verb", forms, verb.get("verb", ""))
+
+
+def sm2(ease: float, interval: float, reps: int, quality: int) -> Tuple[float, float, int]:
+    """Next (ease, interval in days, repetitions) for a 0-5 recall grade"""
+    if quality < 3:
+        reps, interval = 0, 0.0  # Relearn
+    else:
+        reps += 1
+        interval = 1.0 if reps == 1 else 6.0 if reps == 2 else round(interval * ease, 1)
+    ease = max(MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    return ease, interval, reps
+
+
+def quality_from_accuracy(accuracy: float) -> int:
+    """SM-2 grade for a phrase check's word accuracy"""
+    return max(0, min(5, round(accuracy * 5)))
+
+
+class LearnerState:
+    """One learner's review state: parallel arrays over seen items, plus a due heap"""
+
+    __slots__ = ("items", "ease", "interval", "reps", "due", "slots", "heap", "cursor", "loaded_at")
+
+    def __init__(self):
+        self.items = array("I")  # Catalog index per slot
+        self.ease = array("f")
+        self.interval = array("f")  # Days
+        self.reps = array("H")
+        self.due = array("d")  # Unix time
+        self.slots: Dict[int, int] = {}  # Catalog index -> slot
+        self.heap: List[Tuple[float, int]] = []  # (due, slot); stale entries are skipped
+        self.cursor = 0  # Next catalog index that may be unseen
+        self.loaded_at = time.monotonic()
+
+    def set(self, index: int, ease: float, interval: float, reps: int, due: float):
+        slot = self.slots.get(index)
+        if slot is None:
+            slot = self.slots[index] = len(self.items)
+            self.items.append(index)
+            self.ease.append(ease)
+            self.interval.append(interval)
+            self.reps.append(reps)
+            self.due.append(due)
+        else:
+            self.ease[slot], self.interval[slot], self.reps[slot], self.due[slot] = ease, interval, reps, due
+        heapq.heappush(self.heap, (due, slot))
+        if len(self.heap) > 2 * len(self.items) + 16:  # Too many stale entries - rebuild
+            self.heap = [(d, s) for s, d in enumerate(self.due)]
+            heapq.heapify(self.heap)
+
+    def pop_due(self, now: float, limit: int) -> List[int]:
+        """Slots due by `now`, soonest first - O(limit log n); they stay scheduled"""
+        taken, seen = [], set()
+        while self.heap and len(taken) < limit and self.heap[0][0] <= now:
+            entry = heapq.heappop(self.heap)
+            due, slot = entry
+            if due == self.due[slot] and slot not in seen:  # Skip stale and duplicate entries
+                taken.append(entry)
+                seen.add(slot)
+        for entry in taken:
+            heapq.heappush(self.heap, entry)
+        return [slot for _, slot in taken]
+
+    def unseen(self, catalog_size: int, limit: int) -> List[int]:
+        """The next catalog indexes never graded, in order"""
+        while self.cursor < catalog_size and self.cursor in self.slots:
+            self.cursor += 1
+        found, index = [], self.cursor
+        while index < catalog_size and len(found) < limit:
+            if index not in self.slots:
+                found.append(index)
+            index += 1
+        return found
+
+
+class ReviewScheduler:
+    """Per-learner SM-2 scheduling over a content catalog, cached in memory, persisted in SQLite"""
+
+    def __init__(self, items: List[ReviewItem], path: Path = REVIEW_DB):
+        self.items = items
+        self._index = {item.id: i for i, item in enumerate(items)}
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+        self._learners: "OrderedDict[str, LearnerState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_store(cls, store, path: Path = REVIEW_DB) -> "ReviewScheduler":
+        return cls(list(iter_items(store)), path)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(SCHEMA)
+        return self._db
+
+    def _learner(self, user_id: str) -> LearnerState:
+        state = self._learners.get(user_id)
+        if state is not None and time.monotonic() - state.loaded_at < CACHE_TTL:
+            self._learners.move_to_end(user_id)
+            return state
+        state = LearnerState()
+        rows = self._connect().execute(
+            "SELECT item_id, ease, interval, reps, due FROM review WHERE user_id = ?", (user_id,)
+        ).fetchall()
+        for item_id, ease, interval, reps, due in rows:
+            index = self._index.get(item_id)
+            if index is not None:  # Items removed from the content are ignored
+                state.set(index, ease, interval, reps, due)
+        self._learners[user_id] = state
+        self._learners.move_to_end(user_id)
+        while len(self._learners) > MAX_CACHED_LEARNERS:
+            self._learners.popitem(last=False)
+        return state
+
+    def close(self):
+        """Close the SQLite connection once in-flight reads and grades are done"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def item(self, item_id: str) -> Optional[ReviewItem]:
+        index = self._index.get(item_id)
+        return self.items[index] if index is not None else None
+
+    def due(self, user_id: str, limit: int = SESSION_ITEMS, now: Optional[float] = None) -> List[Dict]:
+        """Items to review now: due ones soonest first, then new ones in content order"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            state = self._learner(user_id)
+            result = []
+            for slot in state.pop_due(now, limit):
+                item = self.items[state.items[slot]]
+                result.append({**item.to_dict(), "new": False, "reps": state.reps[slot],
+                               "interval_days": round(state.interval[slot], 1), "due": state.due[slot]})
+            for index in state.unseen(len(self.items), limit - len(result)):
+                result.append({**self.items[index].to_dict(), "new": True, "reps": 0, "interval_days": 0, "due": now})
+            return result
+
+    def grade(self, user_id: str, item_id: str, quality: int, now: Optional[float] = None) -> Optional[Dict]:
+        """Record a 0-5 recall grade; the item's new schedule, or None for an unknown item"""
+        index = self._index.get(item_id)
+        if index is None:
+            return None
+        now = now if now is not None else time.time()
+        with self._lock:
+            state = self._learner(user_id)
+            slot = state.slots.get(index)
+            if slot is None:
+                ease, interval, reps = INITIAL_EASE, 0.0, 0
+            else:
+                ease, interval, reps = state.ease[slot], state.interval[slot], state.reps[slot]
+            ease, interval, reps = sm2(ease, interval, reps, quality)
+            due = now + (interval * DAY if interval else RELEARN_SECONDS)
+            self._connect().execute(
+                "INSERT OR REPLACE INTO review VALUES (?, ?, ?, ?, ?, ?)",
+                (user_id, item_id, ease, interval, reps, due),
+            )
+            state.set(index, ease, interval, reps, due)
+        return {**self.items[index].to_dict(), "reps": reps, "interval_days": interval, "ease": round(ease, 2), "due": due}
+
+
+_scheduler: Optional[ReviewScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> ReviewScheduler:
+    """Process-wide scheduler over the content library, rebuilt when content reloads"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                from content_library import get_library
+                library = get_library()
+                _scheduler = ReviewScheduler.from_store(library.store)
+                library.on_reload(_rebuild)
+    return _scheduler
+
+
+def _rebuild(snapshot, _sources):
+    global _scheduler
+    old = _scheduler
+    _scheduler = ReviewScheduler.from_store(snapshot.store)  # Learners reload against the new catalog
+    if old is not None:
+        old.close()
+
+
+def review_note(items: List[Dict]) -> str:
+    """System note that puts a session's review items in front of the LLM"""
+    listed = "; ".join(f"'{item['spanish']}' ({item['english']})" if item["english"] else f"'{item['spanish']}'"
+                       for item in items)
+    return (f"Due for review with this student: {listed}. Work a few of these into the conversation "
+            "naturally and have the student say them in Spanish.")
+
+
+async def pull_review(agent, user_id: str, limit: int = SESSION_ITEMS) -> List[Dict]:
+    """Add a learner's due items to an agent's context for this session"""
+    items = await asyncio.to_thread(get_scheduler().due, user_id, limit)
+    if items:
+        chat_ctx = agent.chat_ctx.copy()
+        chat_ctx.add_message(role="system", content=review_note(items))
+        await agent.update_chat_ctx(chat_ctx)
+    return items
+
+
+def grade_verdict(user_id: str, verdict):
+    """Grade the item a phrase check matched, off the event loop (no-op for non-review phrases)"""
+    scheduler = get_scheduler()
+    if scheduler.item(verdict.phrase.id) is not None:
+        future = asyncio.get_running_loop().run_in_executor(
+            None, scheduler.grade, user_id, verdict.phrase.id, quality_from_accuracy(verdict.accuracy)
+        )
+        future.add_done_callback(_log_grade_error)
+
+
+def _log_grade_error(future: asyncio.Future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning(f"[!] Could not grade review item: {future.exception()}")
+
+
+if __name__ == "__main__":
+    import sys
+    from content_library import get_library
+
+    scheduler = ReviewScheduler.from_store(get_library(watch=False).store)
+    print(f"[✓] {len(scheduler.items)} review items")
+    user = sys.argv[1] if len(sys.argv) > 1 else "demo"
+    started = time.perf_counter()
+    due = scheduler.due(user, limit=SESSION_ITEMS)
+    print(f"Due for {user} ({(time.perf_counter() - started) * 1e6:.0f}µs):")
+    for item in due:
+        print(f"  [{'new' if item['new'] else item['reps']}] {item['spanish']} - {item['english']}")
@@ -0,0 +1,96 @@
+"""
+RápidoLingo session message reporting
+Keeps the API's session registry accurate: counts the messages exchanged in a
+voice session (the student's and the agent's) and reports them to
+POST /api/session/{session_id}/messages, so status polling shows live counts.
+
+Reports are sent from a background task, one request at a time; messages
+that arrive while a request is in flight go out together in the next one, and
+a failed report is retried with the next batch. Nothing waits on the API.
+
+Usage, in an entrypoint:
+    reporter = MessageReporter(session, session_id_from_room(ctx.room.name))
+    ...
+    await reporter.close()  # sends whatever is left
+"""
+
+import os
+import asyncio
+import logging
+from typing import Optional
+
+import aiohttp
+from livekit.agents import AgentSession
+from providers import get_pool
+
+logger = logging.getLogger("rapidolingo")
+
+API_URL = os.getenv("API_URL", "http://localhost:8000")
+
+# Longest a report (and the final flush) may take
+REPORT_TIMEOUT = float(os.getenv("SESSION_REPORT_TIMEOUT", 5))
+
+
+def session_id_from_room(room_name: str) -> Optional[str]:
+    """API session id from a room name ("rapidolingo_restaurant_session_abc123" -> "session_abc123")"""
+    parts = room_name.split("_", 2)
+    return parts[2] if len(parts) == 3 and parts[0] == "rapidolingo" and parts[2].startswith("session_") else None
+
+
+class MessageReporter:
+    """Follows one AgentSession's conversation and reports message counts to the API"""
+
+    def __init__(self, session: AgentSession, session_id: Optional[str], api_url: str = API_URL):
+        self._session = session
+        self.session_id = session_id
+        self._url = f"{api_url.rstrip('/')}/api/session/{session_id}/messages"
+        self._pending = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.reported = 0
+        if session_id:
+            session.on("conversation_item_added", self._on_item)
+
+    def _on_item(self, event):
+        item = event.item
+        if getattr(item, "type", None) == "message" and item.role in ("user", "assistant"):
+            self._pending += 1
+            self._wakeup.set()
+            if self._task is None:
+                self._task = asyncio.create_task(self._run(), name="session_reporter")
+
+    async def _send(self) -> bool:
+        count, self._pending = self._pending, 0
+        try:
+            timeout = aiohttp.ClientTimeout(total=REPORT_TIMEOUT)
+            async with get_pool().http_session().post(self._url, json={"count": count}, timeout=timeout) as response:
+                if response.status == 404:  # Session expired or unknown to the API - stop reporting
+                    return False
+                response.raise_for_status()
+            self.reported += count
+        except asyncio.CancelledError:
+            self._pending += count
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self._pending += count  # Retried with the next batch
+            logger.debug(f"Could not report messages for {self.session_id}: {e}")
+        return True
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if self._pending and not await self._send():
+                self._session.off("conversation_item_added", self._on_item)
+                return
+
+    async def close(self):
+        """Stop listening and send what's left"""
+        if not self.session_id:
+            return
+        self._session.off("conversation_item_added", self._on_item)
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._pending:
+            await self._send()
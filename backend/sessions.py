@@ -0,0 +1,209 @@
+"""
+RápidoLingo session registry
+Tracks live tutoring sessions (room, lesson, participant, start time, message
+count) with O(1) lookups and TTL eviction. In-memory for a single API node;
+set SESSION_STORE_URL=redis://host:6379/0 to share sessions across nodes.
+"""
+
+import os
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, Optional
+
+# Sessions expire after this long without activity (start, message, status change)
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", 2 * 60 * 60))
+
+# Ended sessions stay queryable this long so clients can read the final status
+ENDED_TTL_SECONDS = float(os.getenv("SESSION_ENDED_TTL_SECONDS", 5 * 60))
+
+
+@dataclass
+class SessionRecord:
+    session_id: str
+    room_name: str
+    lesson_id: str
+    agent_type: str
+    participant_id: str
+    started_at: float
+    status: str = "active"
+    ended_at: float = 0.0
+    messages_exchanged: int = 0
+    user_id: str = ""
+
+    def duration_seconds(self, now: Optional[float] = None) -> int:
+        end = self.ended_at or (now if now is not None else time.time())
+        return max(0, int(end - self.started_at))
+
+    def to_status(self) -> Dict:
+        """Public status payload for the API"""
+        return {
+            "session_id": self.session_id,
+            "status": self.status,
+            "lesson_id": self.lesson_id,
+            "room_name": self.room_name,
+            "duration_seconds": self.duration_seconds(),
+            "messages_exchanged": self.messages_exchanged,
+        }
+
+
+class SessionStore:
+    """Interface shared by the session store backends"""
+
+    async def create(self, record: SessionRecord) -> None:
+        raise NotImplementedError
+
+    async def get(self, session_id: str) -> Optional[SessionRecord]:
+        raise NotImplementedError
+
+    async def add_messages(self, session_id: str, count: int = 1) -> Optional[SessionRecord]:
+        raise NotImplementedError
+
+    async def end(self, session_id: str) -> Optional[SessionRecord]:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Dict-backed store for a single API process.
+    Active and ended sessions sit in separate queues, each with a single TTL,
+    so each queue stays in expiry order (touching an entry moves it to the
+    back) and eviction only ever looks at the fronts - O(1) amortized per
+    operation.
+    """
+
+    def __init__(self, ttl: float = SESSION_TTL_SECONDS, ended_ttl: float = ENDED_TTL_SECONDS):
+        self.ttl = ttl
+        self.ended_ttl = ended_ttl
+        self._active: "OrderedDict[str, tuple[float, SessionRecord]]" = OrderedDict()
+        self._ended: "OrderedDict[str, tuple[float, SessionRecord]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._active) + len(self._ended)
+
+    def _evict(self, now: float):
+        for queue in (self._active, self._ended):
+            while queue:
+                session_id, (expires_at, _) = next(iter(queue.items()))
+                if expires_at > now:
+                    break
+                del queue[session_id]
+
+    def _touch(self, record: SessionRecord, now: float):
+        if record.status == "ended":
+            self._active.pop(record.session_id, None)
+            queue, ttl = self._ended, self.ended_ttl
+        else:
+            queue, ttl = self._active, self.ttl
+        queue[record.session_id] = (now + ttl, record)
+        queue.move_to_end(record.session_id)
+
+    async def create(self, record: SessionRecord) -> None:
+        now = time.time()
+        self._evict(now)
+        self._touch(record, now)
+
+    async def get(self, session_id: str) -> Optional[SessionRecord]:
+        now = time.time()
+        self._evict(now)
+        entry = self._active.get(session_id) or self._ended.get(session_id)
+        return entry[1] if entry and entry[0] > now else None
+
+    async def add_messages(self, session_id: str, count: int = 1) -> Optional[SessionRecord]:
+        record = await self.get(session_id)
+        if record is None or record.status != "active":
+            return record
+        record.messages_exchanged += count
+        self._touch(record, time.time())
+        return record
+
+    async def end(self, session_id: str) -> Optional[SessionRecord]:
+        record = await self.get(session_id)
+        if record is None or record.status == "ended":
+            return record
+        now = time.time()
+        record.status = "ended"
+        record.ended_at = now
+        self._touch(record, now)
+        return record
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Redis (or any RESP-compatible server) backend for multi-node deployments.
+    Each session is one hash whose key TTL (PEXPIRE, so fractional seconds
+    hold) does the eviction.
+    """
+
+    KEY_PREFIX = "rapidolingo:session:"
+
+    def __init__(self, url: str, ttl: float = SESSION_TTL_SECONDS, ended_ttl: float = ENDED_TTL_SECONDS, client=None):
+        # Milliseconds, at least 1 - EXPIRE 0 would delete the key at once
+        self.ttl_ms = max(1, round(ttl * 1000))
+        self.ended_ttl_ms = max(1, round(ended_ttl * 1000))
+        if client is None:
+            import redis.asyncio as redis  # Only needed when a Redis URL is configured
+            client = redis.from_url(url, decode_responses=True)
+        self._redis = client  # Or any client with the redis.asyncio API (e.g. fakeredis in tests)
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.KEY_PREFIX}{session_id}"
+
+    @staticmethod
+    def _decode(data: Dict[str, str]) -> Optional[SessionRecord]:
+        if not data:
+            return None
+        values = {}
+        for field in fields(SessionRecord):
+            if field.name in data:
+                values[field.name] = field.type(data[field.name]) if field.type in (int, float) else data[field.name]
+        return SessionRecord(**values)
+
+    async def create(self, record: SessionRecord) -> None:
+        key = self._key(record.session_id)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=asdict(record))
+            pipe.pexpire(key, self.ttl_ms)
+            await pipe.execute()
+
+    async def get(self, session_id: str) -> Optional[SessionRecord]:
+        return self._decode(await self._redis.hgetall(self._key(session_id)))
+
+    async def add_messages(self, session_id: str, count: int = 1) -> Optional[SessionRecord]:
+        key = self._key(session_id)
+        record = await self.get(session_id)
+        if record is None or record.status != "active":
+            return record
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hincrby(key, "messages_exchanged", count)
+            pipe.pexpire(key, self.ttl_ms)
+            total, _ = await pipe.execute()
+        record.messages_exchanged = int(total)
+        return record
+
+    async def end(self, session_id: str) -> Optional[SessionRecord]:
+        key = self._key(session_id)
+        record = await self.get(session_id)
+        if record is None or record.status == "ended":
+            return record
+        record.status = "ended"
+        record.ended_at = time.time()
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping={"status": record.status, "ended_at": record.ended_at})
+            pipe.pexpire(key, self.ended_ttl_ms)
+            await pipe.execute()
+        return record
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+def create_session_store(url: Optional[str] = None) -> SessionStore:
+    """Session store for SESSION_STORE_URL (redis:// or rediss://), else in-memory"""
+    url = url if url is not None else os.getenv("SESSION_STORE_URL", "")
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisSessionStore(url)
+    return InMemorySessionStore()
@@ -0,0 +1,247 @@
+"""
+RápidoLingo offline stub providers
+Local stand-ins for Cerebras, Cartesia and Deepgram with configurable latency,
+so the agent pipeline runs with no network or credentials:
+
+- StubLLMServer: OpenAI-compatible /v1/chat/completions over HTTP, streaming
+  a canned reply after a fixed time to first token at a fixed token rate.
+  The real openai plugin talks to it.
+- StubTTS / StubSTT: in-process plugins with a fixed time to first byte /
+  recognition delay, returning silence / a canned transcript.
+- StubProviderPool: providers.ProviderPool handing out the stubs (install_stub_pool).
+- NullAudioOutput: audio sink that "plays" instantly and timestamps the first frame.
+"""
+
+import json
+import time
+import uuid
+import asyncio
+from dataclasses import dataclass
+from typing import List, Optional
+
+from aiohttp import web
+from livekit import rtc
+from livekit.agents import APIConnectOptions, stt, tts
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS, NOT_GIVEN, NotGivenOr
+from livekit.agents.utils import AudioBuffer
+from livekit.agents.voice.io import AudioOutput, AudioOutputCapabilities
+
+import providers
+
+STUB_REPLY = (
+    "¡Muy bien! You said 'I would like a coffee please.' Your grammar was excellent. "
+    "Now try asking for the check: ¿Me trae la cuenta, por favor?"
+)
+
+STUB_TRANSCRIPT = "Me gustaría un café, por favor"
+
+SAMPLE_RATE = 24000
+
+
+@dataclass
+class StubLatency:
+    llm_ttft: float = 0.15  # seconds to first token
+    llm_tokens_per_second: float = 400.0
+    tts_ttfb: float = 0.08  # seconds to first audio byte
+    stt_delay: float = 0.1  # seconds per recognition
+
+    def llm_first_sentence(self, reply: str = STUB_REPLY) -> float:
+        """Time until the stub LLM has streamed the reply's first sentence"""
+        first = reply.split(". ")[0]
+        return self.llm_ttft + len(first.split()) / self.llm_tokens_per_second
+
+
+def _chunk(completion_id: str, model: str, choices: list, usage: Optional[dict] = None) -> bytes:
+    payload = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": choices,
+    }
+    if usage is not None:
+        payload["usage"] = usage
+    return f"data: {json.dumps(payload)}\n\n".encode("utf-8")
+
+
+class StubLLMServer:
+    """Streams STUB_REPLY word by word, like an OpenAI-compatible endpoint"""
+
+    def __init__(self, latency: StubLatency, reply: str = STUB_REPLY, host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.reply = reply
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._completions)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def aclose(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        self.requests += 1
+        model = body.get("model", "stub")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        words = self.reply.split(" ")
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await asyncio.sleep(self.latency.llm_ttft)
+        interval = 1 / self.latency.llm_tokens_per_second
+        for i, word in enumerate(words):
+            delta = {"content": word if i == len(words) - 1 else word + " "}
+            if i == 0:
+                delta["role"] = "assistant"
+            await response.write(_chunk(completion_id, model, [{"index": 0, "delta": delta, "finish_reason": None}]))
+            await asyncio.sleep(interval)
+        await response.write(_chunk(completion_id, model, [{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+        usage = {"prompt_tokens": 0, "completion_tokens": len(words), "total_tokens": len(words)}
+        await response.write(_chunk(completion_id, model, [], usage))
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+
+class StubChunkedStream(tts.ChunkedStream):
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        stub: StubTTS = self._tts
+        await asyncio.sleep(stub.ttfb)
+        output_emitter.initialize(
+            request_id=uuid.uuid4().hex,
+            sample_rate=SAMPLE_RATE,
+            num_channels=1,
+            mime_type="audio/pcm",
+        )
+        # ~70ms of silence per character, roughly speaking pace
+        samples = int(SAMPLE_RATE * 0.07 * max(1, len(self.input_text)))
+        output_emitter.push(bytes(samples * 2))
+        output_emitter.flush()
+
+
+class StubTTS(tts.TTS):
+    def __init__(self, ttfb: float):
+        super().__init__(
+            capabilities=tts.TTSCapabilities(streaming=False),
+            sample_rate=SAMPLE_RATE,
+            num_channels=1,
+        )
+        self.ttfb = ttfb
+
+    @property
+    def model(self) -> str:
+        return "stub"
+
+    @property
+    def provider(self) -> str:
+        return "stub"
+
+    def synthesize(
+        self, text: str, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS
+    ) -> StubChunkedStream:
+        return StubChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+
+class StubSTT(stt.STT):
+    def __init__(self, delay: float, transcript: str = STUB_TRANSCRIPT):
+        super().__init__(capabilities=stt.STTCapabilities(streaming=False, interim_results=False))
+        self.delay = delay
+        self.transcript = transcript
+
+    @property
+    def model(self) -> str:
+        return "stub"
+
+    @property
+    def provider(self) -> str:
+        return "stub"
+
+    async def _recognize_impl(
+        self,
+        buffer: AudioBuffer,
+        *,
+        language: NotGivenOr[str] = NOT_GIVEN,
+        conn_options: APIConnectOptions,
+    ) -> stt.SpeechEvent:
+        await asyncio.sleep(self.delay)
+        return stt.SpeechEvent(
+            type=stt.SpeechEventType.FINAL_TRANSCRIPT,
+            alternatives=[stt.SpeechData(language="es", text=self.transcript, confidence=1.0)],
+        )
+
+
+class StubProviderPool(providers.ProviderPool):
+    """ProviderPool with stub STT/TTS; the LLM is the real plugin pointed at StubLLMServer"""
+
+    def __init__(self, latency: StubLatency, llm_base_url: str):
+        super().__init__()
+        self.latency = latency
+        self.llm_base_url = llm_base_url
+
+    def llm(self, model: str = providers.DEFAULT_LLM_MODEL, base_url: str = ""):
+        return super().llm(model, self.llm_base_url)
+
+    def deepgram_stt(self, model: str = "nova-3-general", language: str = "multi"):
+        return self._get(("stub_stt",), lambda: StubSTT(self.latency.stt_delay))
+
+    def cartesia_stt(self):
+        return self._get(("stub_stt",), lambda: StubSTT(self.latency.stt_delay))
+
+    def cartesia_tts(self, voice: str):
+        return self._get(("stub_tts", voice), lambda: StubTTS(self.latency.tts_ttfb))
+
+
+def install_stub_pool(latency: StubLatency, llm_base_url: str) -> StubProviderPool:
+    """Make providers.get_pool() return stubs on the running loop"""
+    pool = StubProviderPool(latency, llm_base_url)
+    providers._pools[asyncio.get_running_loop()] = pool
+    return pool
+
+
+class NullAudioOutput(AudioOutput):
+    """Audio sink that finishes playout immediately and records when audio starts"""
+
+    def __init__(self):
+        super().__init__(label="null", capabilities=AudioOutputCapabilities(pause=False))
+        self.first_frame = asyncio.Event()
+        self.first_frame_at = 0.0
+        self._pushed = 0.0
+        self.segments: List[float] = []
+
+    def reset(self):
+        self.first_frame = asyncio.Event()
+        self.first_frame_at = 0.0
+
+    async def capture_frame(self, frame: rtc.AudioFrame) -> None:
+        await super().capture_frame(frame)
+        if not self.first_frame.is_set():
+            self.first_frame_at = time.perf_counter()
+            self.first_frame.set()
+        self._pushed += frame.duration
+
+    def flush(self) -> None:
+        super().flush()
+        self._finish(interrupted=False)
+
+    def clear_buffer(self) -> None:
+        self._finish(interrupted=True)
+
+    def _finish(self, interrupted: bool):
+        position, self._pushed = self._pushed, 0.0
+        self.segments.append(position)
+        asyncio.get_running_loop().call_soon(
+            lambda: self.on_playback_finished(playback_position=position, interrupted=interrupted)
+        )
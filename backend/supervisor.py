@@ -0,0 +1,246 @@
+"""
+RápidoLingo agent worker supervisor
+Runs a pool of working_agent.py worker processes - one per CPU core by default -
+each on its own health/HTTP port. Workers are health-checked, restarted on
+exit with exponential backoff, parked for a cooldown when they crash-loop,
+and their CPU/memory (including job subprocesses) is logged periodically.
+A crashing worker only takes its own capacity away while it restarts.
+Every OPENINGS_REFILL_INTERVAL it also runs opening_pool.py to top up the
+opening pools the job processes draw from.
+
+Usage:
+    python supervisor.py [start|dev] [--workers N] [--base-port 8081]
+"""
+
+import os
+import sys
+import time
+import signal
+import asyncio
+import logging
+import argparse
+from collections import deque
+from typing import List, Optional
+
+import aiohttp
+import psutil
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+logger = logging.getLogger("rapidolingo.supervisor")
+
+WORKER_SCRIPT = "working_agent.py"
+OPENINGS_SCRIPT = "opening_pool.py"
+BASE_PORT = int(os.getenv("AGENT_WORKER_BASE_PORT", 8081))
+
+HEALTH_INTERVAL = 5.0
+HEALTH_TIMEOUT = 2.0
+STARTUP_GRACE = 30.0  # Seconds a new worker gets before health checks count
+UNHEALTHY_AFTER = 3  # Consecutive failed checks before a restart
+
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 60.0
+STABLE_AFTER = 60.0  # A worker up this long resets its backoff
+
+CRASH_LOOP_CRASHES = 5
+CRASH_LOOP_WINDOW = 120.0
+CRASH_LOOP_COOLDOWN = 300.0
+
+STATS_INTERVAL = 30.0
+SHUTDOWN_TIMEOUT = float(os.getenv("AGENT_SHUTDOWN_TIMEOUT", 30))
+
+# Seconds between opening pool refills (0 disables)
+OPENINGS_REFILL_INTERVAL = float(os.getenv("OPENINGS_REFILL_INTERVAL", 300))
+
+
+class Worker:
+    """One supervised working_agent.py process and its restart policy"""
+
+    def __init__(self, index: int, port: int, mode: str):
+        self.index = index
+        self.port = port
+        self.mode = mode
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.failures = 0  # Consecutive short-lived runs, drives the backoff
+        self.crashes: deque = deque()
+        self.healthy = False
+        self.failed_checks = 0
+
+    @property
+    def name(self) -> str:
+        return f"worker {self.index} (:{self.port})"
+
+    async def spawn(self):
+        env = {**os.environ, "AGENT_WORKER_PORT": str(self.port), "AGENT_WORKER_INDEX": str(self.index)}
+        self.process = await asyncio.create_subprocess_exec(sys.executable, WORKER_SCRIPT, self.mode, env=env)
+        self.started_at = time.monotonic()
+        self.healthy = False
+        self.failed_checks = 0
+        logger.info(f"[✓] {self.name} started, pid {self.process.pid}")
+
+    def next_delay(self, returncode: int) -> float:
+        """Backoff before the next start; a long cooldown when crash-looping"""
+        now = time.monotonic()
+        uptime = now - self.started_at
+        self.restarts += 1
+        self.failures = 0 if uptime >= STABLE_AFTER else self.failures + 1
+        self.crashes.append(now)
+        while self.crashes and now - self.crashes[0] > CRASH_LOOP_WINDOW:
+            self.crashes.popleft()
+        if len(self.crashes) >= CRASH_LOOP_CRASHES:
+            logger.error(
+                f"[!] {self.name} crash-looping ({len(self.crashes)} exits in {CRASH_LOOP_WINDOW:.0f}s, "
+                f"last code {returncode}), pausing {CRASH_LOOP_COOLDOWN:.0f}s"
+            )
+            self.crashes.clear()
+            return CRASH_LOOP_COOLDOWN
+        if not self.failures:
+            return 0.0
+        return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (self.failures - 1))
+
+    def stats(self) -> str:
+        """CPU and RSS of the worker plus its job processes"""
+        try:
+            proc = psutil.Process(self.process.pid)
+            procs = [proc] + proc.children(recursive=True)
+            rss = cpu = 0.0
+            for p in procs:
+                try:
+                    rss += p.memory_info().rss
+                    cpu += p.cpu_percent(interval=None)
+                except psutil.Error:
+                    pass
+        except (psutil.Error, AttributeError):
+            return f"{self.name} not running"
+        return (
+            f"{self.name} pid={self.process.pid} {'healthy' if self.healthy else 'unhealthy'} "
+            f"processes={len(procs)} cpu={cpu:.0f}% rss={rss / 2**20:.0f}MB "
+            f"uptime={time.monotonic() - self.started_at:.0f}s restarts={self.restarts}"
+        )
+
+
+class Supervisor:
+    def __init__(self, workers: int, base_port: int, mode: str):
+        self.workers: List[Worker] = [Worker(i, base_port + i, mode) for i in range(workers)]
+        self._stopping = asyncio.Event()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self._stopping.set)
+            except (NotImplementedError, RuntimeError):  # Windows - Ctrl+C raises instead
+                pass
+
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=HEALTH_TIMEOUT)) as http:
+            tasks = [asyncio.create_task(self._supervise(w)) for w in self.workers]
+            tasks += [asyncio.create_task(self._health(w, http)) for w in self.workers]
+            tasks.append(asyncio.create_task(self._report()))
+            if OPENINGS_REFILL_INTERVAL > 0:
+                tasks.append(asyncio.create_task(self._refill_openings()))
+            try:
+                await self._stopping.wait()
+            finally:
+                logger.info("Stopping agent workers...")
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                await asyncio.gather(*(self._stop(w) for w in self.workers))
+
+    async def _supervise(self, worker: Worker):
+        while not self._stopping.is_set():
+            await worker.spawn()
+            returncode = await worker.process.wait()
+            if self._stopping.is_set():
+                return
+            delay = worker.next_delay(returncode)
+            logger.warning(f"[!] {worker.name} exited with code {returncode}, restarting in {delay:.1f}s")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _health(self, worker: Worker, http: aiohttp.ClientSession):
+        """Restart workers whose health endpoint stops answering"""
+        while True:
+            await asyncio.sleep(HEALTH_INTERVAL)
+            process = worker.process
+            if process is None or process.returncode is not None:
+                continue
+            try:
+                async with http.get(f"http://127.0.0.1:{worker.port}/") as response:
+                    ok = response.status == 200
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                ok = False
+            if ok:
+                if not worker.healthy:
+                    logger.info(f"[✓] {worker.name} healthy")
+                worker.healthy, worker.failed_checks = True, 0
+                continue
+            worker.healthy = False
+            if time.monotonic() - worker.started_at < STARTUP_GRACE:
+                continue
+            worker.failed_checks += 1
+            if worker.failed_checks >= UNHEALTHY_AFTER:
+                logger.warning(f"[!] {worker.name} failed {worker.failed_checks} health checks, killing it")
+                worker.failed_checks = 0
+                process.kill()
+
+    async def _report(self):
+        while True:
+            for worker in self.workers:
+                worker.stats()  # Primes psutil's per-process CPU counters
+            await asyncio.sleep(STATS_INTERVAL)
+            for worker in self.workers:
+                logger.info(worker.stats())
+
+    async def _refill_openings(self):
+        """Top up the opening pools (retired openings are replaced) in a separate process"""
+        while True:
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, OPENINGS_SCRIPT, stdout=asyncio.subprocess.DEVNULL
+            )
+            try:
+                returncode = await process.wait()
+            except asyncio.CancelledError:
+                process.kill()
+                raise
+            if returncode:
+                logger.warning(f"[!] Opening pool refill exited with code {returncode}")
+            await asyncio.sleep(OPENINGS_REFILL_INTERVAL)
+
+    async def _stop(self, worker: Worker):
+        """SIGTERM lets the worker drain; kill it if it takes too long"""
+        process = worker.process
+        if process is None or process.returncode is not None:
+            return
+        process.terminate()
+        try:
+            await asyncio.wait_for(process.wait(), SHUTDOWN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"[!] {worker.name} didn't stop in {SHUTDOWN_TIMEOUT:.0f}s, killing it")
+            process.kill()
+            await process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a pool of RápidoLingo agent workers")
+    parser.add_argument("mode", nargs="?", default="start", choices=["start", "dev"])
+    parser.add_argument("--workers", type=int, default=int(os.getenv("AGENT_WORKERS", os.cpu_count() or 1)))
+    parser.add_argument("--base-port", type=int, default=BASE_PORT)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"🔄 RápidoLingo Agent Supervisor - {args.workers} workers from port {args.base_port}")
+    print("=" * 60)
+    print("Press Ctrl+C to stop\n")
+    try:
+        asyncio.run(Supervisor(args.workers, args.base_port, args.mode).run())
+    except KeyboardInterrupt:
+        pass
+    print("\n👋 Agent workers stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+RápidoLingo session store tests
+Checks both session store backends: the in-memory one, and the Redis one
+against fakeredis as a local stand-in server (no Redis needed)
+
+Setup:
+    pip install -r requirements-dev.txt
+    python -m pytest test_sessions.py
+"""
+
+import asyncio
+import time
+
+import fakeredis
+
+from sessions import InMemorySessionStore, RedisSessionStore, SessionRecord
+
+# Short TTL for the sessions that should expire, and how long to poll for it
+ENDED_TTL = 0.05
+EXPIRY_TIMEOUT = 2.0
+
+
+def make_record(session_id: str) -> SessionRecord:
+    return SessionRecord(
+        session_id=session_id,
+        room_name=f"rapidolingo_restaurant_{session_id}",
+        lesson_id="restaurant",
+        agent_type="restaurant",
+        participant_id="student_test",
+        started_at=time.time(),
+    )
+
+
+async def wait_until(condition, timeout: float = EXPIRY_TIMEOUT) -> bool:
+    """Poll an async condition until it holds or the timeout passes"""
+    deadline = time.monotonic() + timeout
+    while not await condition():
+        if time.monotonic() > deadline:
+            return False
+        await asyncio.sleep(0.01)
+    return True
+
+
+async def check_store(store):
+    """Lifecycle of one session, then expiry of an ended one while an active one lives on"""
+    await store.create(make_record("session_a"))
+    await store.create(make_record("session_b"))
+
+    record = await store.add_messages("session_a", 2)
+    assert record.messages_exchanged == 2
+    record = await store.add_messages("session_a")
+    assert record.messages_exchanged == 3
+    assert (await store.get("session_a")).to_status()["messages_exchanged"] == 3
+
+    record = await store.end("session_a")
+    assert record.status == "ended" and record.ended_at > 0
+    assert (await store.add_messages("session_a")).messages_exchanged == 3  # No counting after the end
+    assert await store.get("missing") is None
+
+    # The ended session expires after ENDED_TTL; the active one, touched earlier, doesn't
+    async def expired():
+        return await store.get("session_a") is None
+    assert await wait_until(expired), "ended session outlived ended_ttl"
+    assert (await store.get("session_b")).status == "active"
+    await store.close()
+
+
+def test_in_memory_store():
+    """In-memory backend"""
+    print("\n🧪 Testing InMemorySessionStore...")
+    store = InMemorySessionStore(ttl=60, ended_ttl=ENDED_TTL)
+    asyncio.run(check_store(store))
+    assert len(store) == 1
+    print("✅ InMemorySessionStore PASSED")
+
+
+def test_in_memory_churn():
+    """Sustained churn doesn't grow the store past what's still live"""
+    print("\n🧪 Testing InMemorySessionStore churn...")
+
+    async def churn():
+        store = InMemorySessionStore(ttl=ENDED_TTL, ended_ttl=ENDED_TTL / 2)
+        for i in range(1000):
+            await store.create(make_record(f"session_{i}"))
+            if i % 2:
+                await store.end(f"session_{i}")
+
+        async def empty():
+            await store.get("anything")  # Any operation evicts
+            return len(store) == 0
+        return await wait_until(empty)
+
+    assert asyncio.run(churn()), "expired sessions stayed in the store"
+    print("✅ InMemorySessionStore churn PASSED")
+
+
+def test_redis_store():
+    """Redis backend against fakeredis"""
+    print("\n🧪 Testing RedisSessionStore (fakeredis)...")
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    store = RedisSessionStore("redis://fake", ttl=60, ended_ttl=ENDED_TTL, client=client)
+    asyncio.run(check_store(store))
+    print("✅ RedisSessionStore PASSED")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("RápidoLingo Session Store Tests")
+    print("=" * 60)
+    test_in_memory_store()
+    test_in_memory_churn()
+    test_redis_store()
+    print("\n" + "=" * 60)
+    print("✅ ALL TESTS PASSED!")
+    print("=" * 60)
@@ -0,0 +1,308 @@
+"""
+RápidoLingo session transcripts
+Saves what happens in a voice session - the student's and the agent's text,
+the local phrase/grammar verdicts and per-turn timings - without ever making
+the audio event loop wait on the disk.
+
+Records go into a bounded in-memory queue. A background task takes them off
+in batches and a single writer thread appends each batch to SQLite (WAL mode,
+one transaction per batch) at ../build/transcripts.db. When the queue is full
+(disk too slow, or stuck) new records are dropped and counted instead of
+queued; the counters are logged when a session closes.
+
+Usage, in an entrypoint:
+    transcript = SessionTranscript(session, session_id, lesson_id)
+    ...
+    await transcript.close()  # flushes what's queued (bounded wait)
+
+and from an agent:
+    record_verdict(self.session, "phrase", verdict.hint())
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import sqlite3
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from livekit.agents import AgentSession
+from livekit.agents.metrics import EOUMetrics, LLMMetrics, TTSMetrics
+
+logger = logging.getLogger("rapidolingo")
+
+TRANSCRIPTS_DB = Path(os.getenv("TRANSCRIPTS_DB", "../build/transcripts.db"))
+
+# Records held in memory before new ones are dropped
+QUEUE_SIZE = int(os.getenv("TRANSCRIPT_QUEUE_SIZE", 2000))
+
+# Rows per SQLite transaction, and how long a batch may wait to fill up
+BATCH_SIZE = int(os.getenv("TRANSCRIPT_BATCH_SIZE", 200))
+FLUSH_INTERVAL = float(os.getenv("TRANSCRIPT_FLUSH_INTERVAL", 0.5))
+
+# Longest a closing session waits for its records to be written
+CLOSE_TIMEOUT = float(os.getenv("TRANSCRIPT_CLOSE_TIMEOUT", 5))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS turns (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    lesson TEXT NOT NULL,
+    agent TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    text TEXT NOT NULL,
+    data TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS turns_session ON turns (session_id, id);
+"""
+
+
+@dataclass
+class TranscriptRecord:
+    session_id: str
+    lesson: str
+    agent: str
+    kind: str  # "user", "agent", "verdict" or "timings"
+    text: str = ""
+    data: Optional[Dict] = None
+    created_at: float = field(default_factory=time.time)
+
+    def row(self) -> tuple:
+        data = json.dumps(self.data, ensure_ascii=False) if self.data else None
+        return (self.session_id, self.lesson, self.agent, self.kind, self.text, data, self.created_at)
+
+
+class TranscriptStore:
+    """Append-only SQLite store; appends come from the sink's writer thread only"""
+
+    def __init__(self, path: Path = TRANSCRIPTS_DB):
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")  # WAL keeps this crash-safe
+            self._db.executescript(SCHEMA)
+        return self._db
+
+    def append(self, records: List[TranscriptRecord]):
+        db = self._connect()
+        db.execute("BEGIN")
+        try:
+            db.executemany(
+                "INSERT INTO turns (session_id, lesson, agent, kind, text, data, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [record.row() for record in records],
+            )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def session(self, session_id: str) -> List[Dict]:
+        """A session's records, oldest first (own connection - WAL readers don't block the writer)"""
+        if not self.path.exists():
+            return []
+        with sqlite3.connect(self.path, timeout=10) as db:
+            rows = db.execute(
+                "SELECT lesson, agent, kind, text, data, created_at FROM turns WHERE session_id = ? ORDER BY id",
+                (session_id,),
+            ).fetchall()
+        return [
+            {"lesson": lesson, "agent": agent, "kind": kind, "text": text,
+             "data": json.loads(data) if data else None, "created_at": created_at}
+            for lesson, agent, kind, text, data, created_at in rows
+        ]
+
+
+class TranscriptSink:
+    """
+    Bounded queue in front of a TranscriptStore. put() never blocks or raises;
+    a background task batches records to the store on a single writer thread.
+    """
+
+    def __init__(self, store: TranscriptStore = None, maxsize: int = QUEUE_SIZE):
+        self.store = store or TranscriptStore()
+        self._queue: "asyncio.Queue[TranscriptRecord]" = asyncio.Queue(maxsize)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="transcripts")
+        self._task: Optional[asyncio.Task] = None
+        self.loop = asyncio.get_running_loop()
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    def put(self, record: TranscriptRecord) -> bool:
+        """Queue a record; False (and counted) if the queue is full"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="transcript_writer")
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.dropped & (self.dropped - 1) == 0:  # 1, 2, 4, 8... - don't flood the log
+                logger.warning(f"[!] Transcript queue full, {self.dropped} records dropped so far")
+            return False
+
+    async def _next_batch(self) -> List[TranscriptRecord]:
+        batch = [await self._queue.get()]
+        deadline = self.loop.time() + FLUSH_INTERVAL
+        while len(batch) < BATCH_SIZE:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - self.loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self.loop.run_in_executor(self._executor, self.store.append, batch)
+                self.written += len(batch)
+                self.batches += 1
+            except Exception as e:  # Lose this batch, keep the sink running
+                self.failed += len(batch)
+                logger.warning(f"[!] Could not write {len(batch)} transcript records: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def flush(self, timeout: float = CLOSE_TIMEOUT) -> bool:
+        """Wait until everything queued so far is written; False on timeout"""
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+        }
+
+
+_sink: Optional[TranscriptSink] = None
+
+
+def get_sink() -> TranscriptSink:
+    """This process's sink, bound to the running event loop"""
+    global _sink
+    if _sink is None or _sink.loop is not asyncio.get_running_loop():
+        _sink = TranscriptSink()
+    return _sink
+
+
+# AgentSession -> its transcript, so agents can add verdicts
+_transcripts: "weakref.WeakKeyDictionary[AgentSession, SessionTranscript]" = weakref.WeakKeyDictionary()
+
+
+class SessionTranscript:
+    """Follows one AgentSession and queues its conversation, verdicts and timings"""
+
+    def __init__(self, session: AgentSession, session_id: str, lesson_id: str, sink: TranscriptSink = None):
+        self._session = session
+        self.session_id = session_id
+        self.lesson_id = lesson_id
+        self._sink = sink or get_sink()
+        # speech_id -> timings (ms) collected so far
+        self._timings: Dict[str, Dict[str, float]] = {}
+        session.on("conversation_item_added", self._on_item)
+        session.on("metrics_collected", self._on_metrics)
+        _transcripts[session] = self
+
+    def _agent_name(self) -> str:
+        try:
+            return type(self._session.current_agent).__name__
+        except RuntimeError:  # No agent yet
+            return "unknown"
+
+    def add(self, kind: str, text: str = "", data: Dict = None) -> bool:
+        return self._sink.put(TranscriptRecord(self.session_id, self.lesson_id, self._agent_name(), kind, text, data))
+
+    def _on_item(self, event):
+        item = event.item
+        if getattr(item, "type", None) != "message" or item.role not in ("user", "assistant"):
+            return
+        text = item.text_content or ""
+        if not text:
+            return
+        data = {}
+        if item.interrupted:
+            data["interrupted"] = True
+        if item.role == "user" and item.transcript_confidence is not None:
+            data["confidence"] = round(item.transcript_confidence, 3)
+        self.add("user" if item.role == "user" else "agent", text, data or None)
+
+    def _on_metrics(self, event):
+        m = event.metrics
+        speech_id = getattr(m, "speech_id", None)
+        if not speech_id:
+            return
+        if isinstance(m, EOUMetrics):
+            self._timings.setdefault(speech_id, {}).update(
+                stt_final_ms=round(m.transcription_delay * 1000, 1),
+                end_of_turn_ms=round(m.end_of_utterance_delay * 1000, 1),
+            )
+        elif isinstance(m, LLMMetrics):
+            self._timings.setdefault(speech_id, {}).update(
+                llm_ttft_ms=round(m.ttft * 1000, 1),
+                llm_ms=round(m.duration * 1000, 1),
+                completion_tokens=m.completion_tokens,
+            )
+        elif isinstance(m, TTSMetrics) and m.ttfb >= 0:
+            # TTS is the last stage to report - the turn's timings are complete
+            timings = self._timings.pop(speech_id, {})
+            timings.update(tts_ttfb_ms=round(m.ttfb * 1000, 1), audio_s=round(m.audio_duration, 2))
+            self.add("timings", data={"speech_id": speech_id, **timings})
+
+    async def close(self):
+        """Stop listening and wait (bounded) for this session's records to be written"""
+        self._session.off("conversation_item_added", self._on_item)
+        self._session.off("metrics_collected", self._on_metrics)
+        _transcripts.pop(self._session, None)
+        flushed = await self._sink.flush()
+        stats = self._sink.stats()
+        message = f"Transcript {self.session_id}: " + " ".join(f"{k}={v}" for k, v in stats.items())
+        if flushed and not stats["dropped"] and not stats["failed"]:
+            logger.info(message)
+        else:
+            logger.warning(f"[!] {message}")
+
+
+def record_verdict(session: AgentSession, kind: str, hint: str) -> bool:
+    """Add a local verdict ("phrase", "grammar") to the session's transcript, if it has one"""
+    transcript = _transcripts.get(session)
+    return transcript is not None and transcript.add("verdict", hint, {"check": kind})
+
+
+if __name__ == "__main__":
+    import sys
+
+    store = TranscriptStore()
+    if len(sys.argv) < 2:
+        print("Usage: python transcripts.py <session_id>")
+        sys.exit(1)
+    for record in store.session(sys.argv[1]):
+        print(f"[{record['kind']:>7}] {record['agent']}: {record['text'] or record['data']}")
@@ -0,0 +1,241 @@
+"""
+RápidoLingo TTS audio cache
+Content-addressed cache for fixed agent utterances (greetings, farewells).
+Audio is keyed by (voice, normalized text, TTS params), kept in a memory LRU
+backed by WAV files on disk, and played straight into the session - no TTS
+round trip once an utterance has been rendered.
+
+Pre-render every fixed utterance ahead of time:
+    python tts_cache.py
+"""
+
+import os
+import re
+import wave
+import asyncio
+import hashlib
+import logging
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional
+
+from livekit import rtc
+from livekit.agents import tts as agents_tts
+
+logger = logging.getLogger("rapidolingo")
+
+CACHE_DIR = Path(os.getenv("TTS_CACHE_DIR", "../build/tts_cache"))
+MEMORY_BUDGET_BYTES = int(os.getenv("TTS_CACHE_MEMORY_MB", 32)) * 1024 * 1024
+DISK_BUDGET_BYTES = int(os.getenv("TTS_CACHE_DISK_MB", 512)) * 1024 * 1024
+
+# Cached audio is replayed in frames of this length
+FRAME_MS = 20
+
+
+def normalize_text(text: str) -> str:
+    """Same utterance, same key - regardless of Unicode form or spacing"""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+def tts_params(tts: agents_tts.TTS) -> Dict[str, str]:
+    """Settings that change the rendered audio, as far as the plugin exposes them"""
+    opts = getattr(tts, "_opts", None)
+    return {
+        "provider": tts.provider,
+        "model": tts.model,
+        "sample_rate": str(tts.sample_rate),
+        "num_channels": str(tts.num_channels),
+        "language": str(getattr(opts, "language", "")),
+        "speed": str(getattr(opts, "speed", "")),
+        "emotion": str(getattr(opts, "emotion", "")),
+    }
+
+
+def cache_key(voice: str, text: str, params: Dict[str, str]) -> str:
+    material = "\x1f".join([voice, normalize_text(text), *(f"{k}={params[k]}" for k in sorted(params))])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class CachedAudio:
+    sample_rate: int
+    num_channels: int
+    pcm: bytes  # 16-bit signed little endian, interleaved
+
+    def frames(self, frame_ms: int = FRAME_MS):
+        """Split into rtc.AudioFrames for playback"""
+        samples_per_frame = self.sample_rate * frame_ms // 1000
+        step = samples_per_frame * self.num_channels * 2
+        view = memoryview(self.pcm)
+        for start in range(0, len(view), step):
+            chunk = view[start:start + step]
+            yield rtc.AudioFrame(
+                data=chunk,
+                sample_rate=self.sample_rate,
+                num_channels=self.num_channels,
+                samples_per_channel=len(chunk) // (2 * self.num_channels),
+            )
+
+
+class AudioCache:
+    """Memory LRU in front of a size-capped directory of WAV files"""
+
+    def __init__(
+        self,
+        cache_dir: Path = CACHE_DIR,
+        memory_budget: int = MEMORY_BUDGET_BYTES,
+        disk_budget: int = DISK_BUDGET_BYTES,
+    ):
+        self.cache_dir = cache_dir
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget
+        self._memory: "OrderedDict[str, CachedAudio]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.wav"
+
+    def _remember(self, key: str, audio: CachedAudio):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old.pcm)
+        self._memory[key] = audio
+        self._memory_bytes += len(audio.pcm)
+        while self._memory_bytes > self.memory_budget and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted.pcm)
+
+    def _read_disk(self, key: str) -> Optional[CachedAudio]:
+        path = self._path(key)
+        try:
+            with wave.open(str(path), "rb") as wav:
+                audio = CachedAudio(wav.getframerate(), wav.getnchannels(), wav.readframes(wav.getnframes()))
+            os.utime(path)  # mtime doubles as the disk LRU clock
+            return audio
+        except (FileNotFoundError, wave.Error, EOFError):
+            return None
+
+    def _write_disk(self, key: str, audio: CachedAudio):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with wave.open(str(tmp_path), "wb") as wav:
+            wav.setnchannels(audio.num_channels)
+            wav.setsampwidth(2)
+            wav.setframerate(audio.sample_rate)
+            wav.writeframes(audio.pcm)
+        os.replace(tmp_path, path)
+        if self._disk_bytes is None:
+            self._disk_bytes = sum(p.stat().st_size for p in self.cache_dir.glob("*/*.wav"))
+        else:
+            self._disk_bytes += path.stat().st_size
+        if self._disk_bytes > self.disk_budget:
+            self._trim_disk()
+
+    def _trim_disk(self):
+        files = sorted(self.cache_dir.glob("*/*.wav"), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in files)
+        for path in files:
+            if total <= self.disk_budget * 0.9:
+                break
+            size = path.stat().st_size
+            path.unlink(missing_ok=True)
+            total -= size
+        self._disk_bytes = total
+
+    async def get(self, key: str) -> Optional[CachedAudio]:
+        audio = self._memory.get(key)
+        if audio is not None:
+            self._memory.move_to_end(key)
+            return audio
+        audio = await asyncio.to_thread(self._read_disk, key)
+        if audio is not None:
+            self._remember(key, audio)
+        return audio
+
+    def read(self, key: str) -> Optional[CachedAudio]:
+        """Blocking get() for use outside the event loop (e.g. process prewarm)"""
+        audio = self._memory.get(key)
+        if audio is None:
+            audio = self._read_disk(key)
+            if audio is not None:
+                self._remember(key, audio)
+        return audio
+
+    async def put(self, key: str, audio: CachedAudio):
+        self._remember(key, audio)
+        await asyncio.to_thread(self._write_disk, key, audio)
+
+    async def stream(self, tts: agents_tts.TTS, voice: str, text: str) -> AsyncIterator[rtc.AudioFrame]:
+        """
+        Frames for an utterance: from the cache when rendered before, otherwise
+        from the TTS - played as they arrive and cached once complete
+        """
+        key = cache_key(voice, text, tts_params(tts))
+        audio = await self.get(key)
+        if audio is not None:
+            self.hits += 1
+            for frame in audio.frames():
+                yield frame
+            return
+
+        self.misses += 1
+        pcm = bytearray()
+        sample_rate, num_channels = tts.sample_rate, tts.num_channels
+        async with tts.synthesize(text) as synth:
+            async for event in synth:
+                frame = event.frame
+                sample_rate, num_channels = frame.sample_rate, frame.num_channels
+                pcm += frame.data.tobytes()
+                yield frame
+        if pcm:
+            await self.put(key, CachedAudio(sample_rate, num_channels, bytes(pcm)))
+
+    async def prerender(self, tts: agents_tts.TTS, voice: str, text: str) -> bool:
+        """Render an utterance into the cache; returns False if it was already there"""
+        key = cache_key(voice, text, tts_params(tts))
+        if await self.get(key) is not None:
+            return False
+        async for _ in self.stream(tts, voice, text):
+            pass
+        return True
+
+
+_cache: Optional[AudioCache] = None
+
+
+def get_audio_cache() -> AudioCache:
+    """Process-wide audio cache"""
+    global _cache
+    if _cache is None:
+        _cache = AudioCache()
+    return _cache
+
+
+def say_cached(agent, text: str, voice: str, **kwargs):
+    """session.say() for a fixed utterance, with audio from the cache when possible"""
+    audio = get_audio_cache().stream(agent.tts, voice, text)
+    return agent.session.say(text, audio=audio, **kwargs)
+
+
+async def _prerender_fixed_utterances():
+    from agents import fixed_utterances
+    from providers import get_pool
+
+    cache = get_audio_cache()
+    pool = get_pool()
+    try:
+        for voice, text in fixed_utterances():
+            rendered = await cache.prerender(pool.cartesia_tts(voice), voice, text)
+            print(f"[{'✓' if rendered else '='}] {voice[:8]} {text}")
+    finally:
+        await pool.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(_prerender_fixed_utterances())
@@ -0,0 +1,337 @@
+"""
+RápidoLingo turn latency metrics
+Per-turn timeline of the voice pipeline, measured from the moment the student
+stops speaking (VAD end of speech): STT final transcript, end of turn, LLM first
+token and completion, TTS first audio byte, and playout start.
+
+Values go into log-bucketed histograms per (lesson, agent, stage). Each agent
+process writes its histograms to ../build/metrics/<pid>-<token>.json when a
+session ends; the API merges those files for /api/metrics/latency. Files of
+processes that have exited (LiveKit runs each job in its own process) or that
+haven't flushed for METRICS_MAX_AGE are folded, under a lock, into daily
+rollups in ../build/metrics/rollup/, which are kept for METRICS_RETENTION_DAYS.
+"""
+
+import os
+import json
+import time
+import uuid
+import fcntl
+import bisect
+import socket
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Optional
+
+from livekit.agents import AgentSession
+from livekit.agents.metrics import EOUMetrics, LLMMetrics, TTSMetrics
+
+logger = logging.getLogger("rapidolingo")
+
+METRICS_DIR = Path(os.getenv("METRICS_DIR", "../build/metrics"))
+
+# Process files not rewritten for this long are rolled up (seconds) - covers processes on other hosts
+METRICS_MAX_AGE = float(os.getenv("METRICS_MAX_AGE", 24 * 3600))
+
+# Days of daily rollups kept
+METRICS_RETENTION_DAYS = int(os.getenv("METRICS_RETENTION_DAYS", 30))
+
+# Names this process's file apart from an earlier process that had the same pid
+_PROCESS_TOKEN = uuid.uuid4().hex[:8]
+
+# Bucket upper bounds in ms: 1ms .. ~56s, 20% apart (percentiles within ~10%)
+BUCKETS_MS = [round(1.2 ** i, 3) for i in range(61)]
+
+# Offsets from the student's end of speech, in pipeline order
+TIMELINE = ("stt_final", "end_of_turn", "llm_first_token", "llm_done", "tts_first_byte", "playout_start")
+
+# Stage durations that don't depend on the end of speech (e.g. the opening turn)
+DURATIONS = ("llm_ttft", "tts_ttfb")
+
+STAGES = TIMELINE + DURATIONS
+
+PERCENTILES = (50, 95, 99)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram - cheap to record, mergeable across processes"""
+
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def record(self, ms: float):
+        ms = max(0.0, ms)
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.min = min(self.min, ms)
+        self.max = max(self.max, ms)
+
+    def merge(self, other: "Histogram"):
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p: float) -> float:
+        """Upper bound of the bucket holding the p-th percentile, clamped to the observed range"""
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                bound = BUCKETS_MS[i] if i < len(BUCKETS_MS) else self.max
+                return round(min(max(bound, self.min), self.max), 1)
+        return round(self.max, 1)
+
+    def summary(self) -> Dict[str, float]:
+        result = {"count": self.count, "mean": round(self.total / self.count, 1) if self.count else 0.0}
+        for p in PERCENTILES:
+            result[f"p{p}"] = self.percentile(p)
+        result["max"] = round(self.max, 1)
+        return result
+
+    def to_dict(self) -> Dict:
+        return {"counts": self.counts, "count": self.count, "total": self.total, "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Histogram":
+        hist = cls()
+        if len(data["counts"]) != len(hist.counts):
+            return hist  # Written with different buckets - can't be merged
+        hist.counts = list(data["counts"])
+        hist.count, hist.total = data["count"], data["total"]
+        hist.min, hist.max = data["min"], data["max"]
+        return hist
+
+
+class LatencyRegistry:
+    """Histograms keyed by (lesson, agent, stage)"""
+
+    def __init__(self):
+        self.histograms: Dict[tuple, Histogram] = {}
+
+    def record(self, lesson: str, agent: str, stage: str, seconds: float):
+        key = (lesson, agent, stage)
+        hist = self.histograms.get(key)
+        if hist is None:
+            hist = self.histograms[key] = Histogram()
+        hist.record(seconds * 1000)
+
+    def merge(self, other: "LatencyRegistry"):
+        for key, hist in other.histograms.items():
+            self.histograms.setdefault(key, Histogram()).merge(hist)
+
+    def rollup(self, dimension: int) -> Dict[str, Dict[str, Histogram]]:
+        """{lesson or agent: {stage: histogram}} with the other dimension merged"""
+        result: Dict[str, Dict[str, Histogram]] = {}
+        for key, hist in self.histograms.items():
+            result.setdefault(key[dimension], {}).setdefault(key[2], Histogram()).merge(hist)
+        return result
+
+    def report(self) -> Dict:
+        """Percentiles in ms per lesson and per agent"""
+        def summarize(groups):
+            return {
+                name: {stage: stages[stage].summary() for stage in STAGES if stage in stages}
+                for name, stages in sorted(groups.items())
+            }
+        return {"lessons": summarize(self.rollup(0)), "agents": summarize(self.rollup(1))}
+
+    def to_dict(self) -> Dict:
+        return {"|".join(key): hist.to_dict() for key, hist in self.histograms.items()}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "LatencyRegistry":
+        registry = cls()
+        for key, hist in data.items():
+            registry.histograms[tuple(key.split("|", 2))] = Histogram.from_dict(hist)
+        return registry
+
+    def flush(self, metrics_dir: Path = METRICS_DIR):
+        """Write this process's histograms for the API to pick up"""
+        metrics_dir.mkdir(parents=True, exist_ok=True)
+        path = metrics_dir / f"{os.getpid()}-{_PROCESS_TOKEN}.json"
+        _write_json(path, {
+            "pid": os.getpid(),
+            "host": socket.gethostname(),
+            "updated_at": time.time(),
+            "histograms": self.to_dict(),
+        })
+
+
+def _write_json(path: Path, data: Dict):
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(data))
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: Path) -> Optional[Dict]:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None  # Gone, or being replaced right now
+
+
+def _running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # Someone else's process
+        return True
+    return True
+
+
+def _finished(data: Dict, now: float, max_age: float) -> bool:
+    """Written by a process that has since exited, or not rewritten for max_age"""
+    if now - data.get("updated_at", 0) > max_age:
+        return True
+    pid = data.get("pid")
+    return pid is not None and data.get("host") == socket.gethostname() and not _running(pid)
+
+
+def _roll_up(metrics_dir: Path, finished: Dict[Path, Dict], retention_days: int):
+    """Fold finished processes' files into the daily rollups and drop rollups past retention"""
+    rollup_dir = metrics_dir / "rollup"
+    rollup_dir.mkdir(exist_ok=True)
+    with open(metrics_dir / ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        for path, data in finished.items():
+            if not path.exists():  # Rolled up by another API worker meanwhile
+                continue
+            day_path = rollup_dir / f"{date.fromtimestamp(data.get('updated_at', 0)).isoformat()}.json"
+            day = LatencyRegistry.from_dict((_read_json(day_path) or {}).get("histograms", {}))
+            day.merge(LatencyRegistry.from_dict(data.get("histograms", {})))
+            _write_json(day_path, {"histograms": day.to_dict()})
+            path.unlink(missing_ok=True)
+        oldest = (date.today() - timedelta(days=retention_days)).isoformat()
+        for day_path in rollup_dir.glob("*.json"):
+            if day_path.stem < oldest:
+                day_path.unlink(missing_ok=True)
+
+
+def load_registry(metrics_dir: Path = METRICS_DIR, max_age: float = METRICS_MAX_AGE,
+                  retention_days: int = METRICS_RETENTION_DAYS) -> LatencyRegistry:
+    """Merge the daily rollups and every live agent process's flushed histograms"""
+    now = time.time()
+    live, finished = [], {}
+    for path in metrics_dir.glob("*.json"):
+        data = _read_json(path)
+        if data is None:
+            continue
+        if _finished(data, now, max_age):
+            finished[path] = data
+        else:
+            live.append(data)
+    if metrics_dir.exists():
+        _roll_up(metrics_dir, finished, retention_days)
+
+    registry = LatencyRegistry()
+    for data in live + [_read_json(path) or {} for path in (metrics_dir / "rollup").glob("*.json")]:
+        registry.merge(LatencyRegistry.from_dict(data.get("histograms", {})))
+    return registry
+
+
+# This process's histograms
+latency = LatencyRegistry()
+
+
+class TurnTracker:
+    """
+    Follows one AgentSession's metrics and state events and records each turn's
+    timeline. Usage:
+        tracker = TurnTracker(session, lesson_id)
+        ...
+        await tracker.close()  # logs the session summary and flushes
+    """
+
+    MAX_OPEN_TURNS = 16
+
+    def __init__(self, session: AgentSession, lesson_id: str, registry: LatencyRegistry = latency):
+        self._session = session
+        self.lesson_id = lesson_id
+        self._registry = registry
+        self._session_stats = LatencyRegistry()
+        # speech_id -> end of speech (wall clock), oldest first
+        self._turns: "OrderedDict[str, float]" = OrderedDict()
+        self._awaiting_playout: Optional[float] = None
+        self.turns = 0
+        session.on("metrics_collected", self._on_metrics)
+        session.on("agent_state_changed", self._on_agent_state)
+
+    def _agent_name(self) -> str:
+        try:
+            return type(self._session.current_agent).__name__
+        except RuntimeError:  # No agent yet
+            return "unknown"
+
+    def _record(self, stage: str, seconds: float):
+        agent = self._agent_name()
+        self._registry.record(self.lesson_id, agent, stage, seconds)
+        self._session_stats.record(self.lesson_id, agent, stage, seconds)
+
+    def _on_metrics(self, event):
+        m = event.metrics
+        if isinstance(m, EOUMetrics):
+            end_of_speech = m.last_speaking_time
+            if m.speech_id:
+                self._turns[m.speech_id] = end_of_speech
+                while len(self._turns) > self.MAX_OPEN_TURNS:
+                    self._turns.popitem(last=False)
+            self._awaiting_playout = end_of_speech
+            self.turns += 1
+            self._record("stt_final", m.transcription_delay)
+            self._record("end_of_turn", m.end_of_utterance_delay)
+        elif isinstance(m, LLMMetrics):
+            self._record("llm_ttft", m.ttft)
+            end_of_speech = self._turns.get(m.speech_id or "")
+            if end_of_speech is not None and not m.cancelled:
+                started = m.timestamp - m.duration
+                self._record("llm_first_token", started + m.ttft - end_of_speech)
+                self._record("llm_done", m.timestamp - end_of_speech)
+        elif isinstance(m, TTSMetrics):
+            if m.ttfb < 0:  # Nothing was synthesized
+                return
+            self._record("tts_ttfb", m.ttfb)
+            end_of_speech = self._turns.get(m.speech_id or "")
+            if end_of_speech is not None and not m.cancelled:
+                self._record("tts_first_byte", m.timestamp - m.duration + m.ttfb - end_of_speech)
+
+    def _on_agent_state(self, event):
+        if event.new_state == "speaking" and self._awaiting_playout is not None:
+            self._record("playout_start", event.created_at - self._awaiting_playout)
+            self._awaiting_playout = None
+
+    def summary(self) -> str:
+        """One line: turn count and percentiles of each stage for this session"""
+        stages = self._session_stats.rollup(0).get(self.lesson_id, {})
+        parts = [f"lesson={self.lesson_id}", f"turns={self.turns}"]
+        for stage in STAGES:
+            hist = stages.get(stage)
+            if hist is not None and hist.count:
+                parts.append(f"{stage}={hist.percentile(50):.0f}/{hist.percentile(95):.0f}ms")
+        return " ".join(parts)
+
+    async def close(self):
+        """Stop listening, log the per-session summary (p50/p95) and flush the process histograms"""
+        self._session.off("metrics_collected", self._on_metrics)
+        self._session.off("agent_state_changed", self._on_agent_state)
+        logger.info(f"Session latency {self.summary()}")
+        try:
+            await asyncio.to_thread(self._registry.flush)
+        except OSError as e:
+            logger.warning(f"Could not write latency metrics: {e}")
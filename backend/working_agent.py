@@ -4,10 +4,27 @@ Uses Cerebras cookbook example structure for reliability
 """
 
 import os
+import time
+import random
+import asyncio
 import logging
-from livekit.agents import AutoSubscribe, JobContext, WorkerOptions, cli, llm
-from livekit.agents import Agent, AgentSession
-from livekit.plugins import openai, silero, cartesia, deepgram
+from livekit.agents import AutoSubscribe, JobContext, JobProcess, WorkerOptions, cli, llm
+from livekit.agents import AgentSession, ChatContext, ChatMessage
+from admission import admission_options
+from content_library import get_library
+from grammar_check import get_checker
+from history import CompactingAgent
+from lifecycle import JobLifecycle
+from opening_pool import get_opening_pool, start_lesson
+from phrase_matcher import get_matcher
+from progress import current_learner, get_progress, learner_id, session_stats
+from prompts import get_prompts
+from review import get_scheduler, grade_verdict, pull_review
+from session_reporter import MessageReporter, session_id_from_room
+from turn_metrics import TurnTracker
+from providers import get_pool, get_vad, prewarm
+from transcripts import SessionTranscript, record_verdict
+from tts_cache import say_cached
 
 # Import configuration
 try:
@@ -88,10 +105,70 @@ AGENT_CONFIGS = {
     }
 }
 
-class RestaurantAgent(Agent):
-    def __init__(self):
-        config = AGENT_CONFIGS["restaurant"]
-        instructions = f"""
+# Said straight away when the student gets a known phrase exactly right
+PRAISE = ("¡Perfecto!", "¡Excelente!", "¡Muy bien!")
+
+
+def last_agent_message(chat_ctx: ChatContext) -> str:
+    """What the agent said last - tells the phrase check which phrase was asked for"""
+    for item in reversed(chat_ctx.items):
+        if item.type == "message" and item.role == "assistant":
+            return item.text_content or ""
+    return ""
+
+
+class LessonAgent(CompactingAgent):
+    """
+    Lesson agent base: replies that attempt a known phrase are graded locally
+    (see phrase_matcher.py), anything else goes through the rule-based grammar
+    check (see grammar_check.py), and the findings go into the turn, so the
+    LLM only has to give the feedback, not work it out
+    """
+    lesson_id = ""
+    register = None  # tú/usted as the student has used it so far
+
+    def track_verdict(self, verdict):
+        """Transcript, progress rollups and review schedule for a phrase check"""
+        record_verdict(self.session, "phrase", verdict.hint())
+        session_stats(self.session).add_verdict(verdict)
+        user_id = current_learner()
+        if user_id:
+            grade_verdict(user_id, verdict)
+
+    async def on_user_turn_completed(self, turn_ctx: ChatContext, new_message: ChatMessage):
+        await super().on_user_turn_completed(turn_ctx, new_message)
+        text = new_message.text_content or ""
+        verdict = get_matcher().match(text, prompt=last_agent_message(turn_ctx))
+        if verdict is not None and verdict.perfect:
+            praise = random.choice(PRAISE)
+            say_cached(self, praise, AGENT_CONFIGS[self.lesson_id]["voice"])
+            self.track_verdict(verdict)
+            note = f"{verdict.hint()} You already said '{praise}' - don't praise or grade it again, just continue the lesson in one short sentence."
+            turn_ctx.add_message(role="system", content=note)
+            return
+
+        report = get_checker().check(text, self.register)
+        self.register = report.register
+        hints = []
+        if verdict is not None:
+            hints.append(verdict.hint())
+            self.track_verdict(verdict)
+        if report.issues:
+            hints.append(report.hint())
+            record_verdict(self.session, "grammar", hints[-1])
+            session_stats(self.session).add_grammar(report)
+        if hints:
+            note = " ".join(hints) + " Use this instead of grading the reply yourself, and keep the correction short."
+            turn_ctx.add_message(role="system", content=note)
+
+
+class RestaurantAgent(LessonAgent):
+    lesson_id = "restaurant"
+
+    @classmethod
+    def build_instructions(cls) -> str:
+        config = AGENT_CONFIGS[cls.lesson_id]
+        return f"""
         You are {config['name']}, a friendly Spanish {config['scenario']} helping English speakers learn Spanish through interactive lessons.
 
         LESSON STRUCTURE:
@@ -124,32 +201,38 @@ class RestaurantAgent(Agent):
         All text that you return will be spoken aloud, so don't use bullets, slashes, or non-pronounceable punctuation.
         """
 
-        llm = openai.LLM.with_cerebras(model="llama-3.3-70b")
-        stt = deepgram.STT(
+    def __init__(self):
+        config = AGENT_CONFIGS[self.lesson_id]
+        pool = get_pool()  # Shared keep-alive clients (see providers.ProviderPool)
+        llm = pool.llm("llama-3.3-70b")
+        stt = pool.deepgram_stt(
             model="nova-3-general",
             language="multi",  # Enable multilingual detection for English + Spanish
         )
-        tts = cartesia.TTS(voice=config["voice"])
-        vad = silero.VAD.load()
+        tts = pool.cartesia_tts(config["voice"])
+        vad = get_vad()  # Shared per-process model (see providers.prewarm)
 
         super().__init__(
-            instructions=instructions,
+            instructions=get_prompts().text(type(self)),  # Rendered once per process (see prompts.py)
             stt=stt, llm=llm, tts=tts, vad=vad
         )
 
     async def on_enter(self):
         """Start lesson when they join"""
-        config = AGENT_CONFIGS["restaurant"]
+        config = AGENT_CONFIGS[self.lesson_id]
         logger.info(f"RestaurantAgent on_enter called for {config['name']}")
         print(f"Current Agent: {config['emoji']} {config['name']} ({config['scenario']}) {config['emoji']}")
-        # Trigger the LLM to generate initial greeting
-        self.session.generate_reply(user_input=config["initial_prompt"])
+        # Play a pre-generated opening (falls back to generating one live)
+        start_lesson(self, self.lesson_id, config["initial_prompt"], config["voice"])
 
 
-class AirportAgent(Agent):
-    def __init__(self):
-        config = AGENT_CONFIGS["airport"]
-        instructions = f"""
+class AirportAgent(LessonAgent):
+    lesson_id = "airport"
+
+    @classmethod
+    def build_instructions(cls) -> str:
+        config = AGENT_CONFIGS[cls.lesson_id]
+        return f"""
         You are {config['name']}, a helpful Spanish airport agent helping English speakers learn Spanish through check-in scenarios.
 
         LESSON STRUCTURE:
@@ -169,32 +252,38 @@ class AirportAgent(Agent):
         All text that you return will be spoken aloud, so don't use bullets, slashes, or non-pronounceable punctuation.
         """
 
-        llm = openai.LLM.with_cerebras(model="llama-3.3-70b")
-        stt = deepgram.STT(
+    def __init__(self):
+        config = AGENT_CONFIGS[self.lesson_id]
+        pool = get_pool()  # Shared keep-alive clients (see providers.ProviderPool)
+        llm = pool.llm("llama-3.3-70b")
+        stt = pool.deepgram_stt(
             model="nova-3-general",
             language="multi",  # Enable multilingual detection for English + Spanish
         )
-        tts = cartesia.TTS(voice=config["voice"])
-        vad = silero.VAD.load()
+        tts = pool.cartesia_tts(config["voice"])
+        vad = get_vad()
 
         super().__init__(
-            instructions=instructions,
+            instructions=get_prompts().text(type(self)),
             stt=stt, llm=llm, tts=tts, vad=vad
         )
 
     async def on_enter(self):
         """Start lesson when they join"""
-        config = AGENT_CONFIGS["airport"]
+        config = AGENT_CONFIGS[self.lesson_id]
         logger.info(f"AirportAgent on_enter called for {config['name']}")
         print(f"Current Agent: {config['emoji']} {config['name']} ({config['scenario']}) {config['emoji']}")
-        # Trigger the LLM to generate initial greeting
-        self.session.generate_reply(user_input=config["initial_prompt"])
+        # Play a pre-generated opening (falls back to generating one live)
+        start_lesson(self, self.lesson_id, config["initial_prompt"], config["voice"])
 
 
-class HotelAgent(Agent):
-    def __init__(self):
-        config = AGENT_CONFIGS["hotel"]
-        instructions = f"""
+class HotelAgent(LessonAgent):
+    lesson_id = "hotel"
+
+    @classmethod
+    def build_instructions(cls) -> str:
+        config = AGENT_CONFIGS[cls.lesson_id]
+        return f"""
         You are {config['name']}, a friendly Spanish hotel receptionist helping English speakers learn Spanish through booking scenarios.
 
         LESSON STRUCTURE:
@@ -214,32 +303,38 @@ class HotelAgent(Agent):
         All text that you return will be spoken aloud, so don't use bullets, slashes, or non-pronounceable punctuation.
         """
 
-        llm = openai.LLM.with_cerebras(model="llama-3.3-70b")
-        stt = deepgram.STT(
+    def __init__(self):
+        config = AGENT_CONFIGS[self.lesson_id]
+        pool = get_pool()  # Shared keep-alive clients (see providers.ProviderPool)
+        llm = pool.llm("llama-3.3-70b")
+        stt = pool.deepgram_stt(
             model="nova-3-general",
             language="multi",  # Enable multilingual detection for English + Spanish
         )
-        tts = cartesia.TTS(voice=config["voice"])
-        vad = silero.VAD.load()
+        tts = pool.cartesia_tts(config["voice"])
+        vad = get_vad()
 
         super().__init__(
-            instructions=instructions,
+            instructions=get_prompts().text(type(self)),
             stt=stt, llm=llm, tts=tts, vad=vad
         )
 
     async def on_enter(self):
         """Start lesson when they join"""
-        config = AGENT_CONFIGS["hotel"]
+        config = AGENT_CONFIGS[self.lesson_id]
         logger.info(f"HotelAgent on_enter called for {config['name']}")
         print(f"Current Agent: {config['emoji']} {config['name']} ({config['scenario']}) {config['emoji']}")
-        # Trigger the LLM to generate initial greeting
-        self.session.generate_reply(user_input=config["initial_prompt"])
+        # Play a pre-generated opening (falls back to generating one live)
+        start_lesson(self, self.lesson_id, config["initial_prompt"], config["voice"])
 
 
-class DirectionsAgent(Agent):
-    def __init__(self):
-        config = AGENT_CONFIGS["directions"]
-        instructions = f"""
+class DirectionsAgent(LessonAgent):
+    lesson_id = "directions"
+
+    @classmethod
+    def build_instructions(cls) -> str:
+        config = AGENT_CONFIGS[cls.lesson_id]
+        return f"""
         You are {config['name']}, a helpful Spanish local guide helping English speakers learn Spanish through navigation scenarios.
 
         LESSON STRUCTURE:
@@ -259,32 +354,38 @@ class DirectionsAgent(Agent):
         All text that you return will be spoken aloud, so don't use bullets, slashes, or non-pronounceable punctuation.
         """
 
-        llm = openai.LLM.with_cerebras(model="llama-3.3-70b")
-        stt = deepgram.STT(
+    def __init__(self):
+        config = AGENT_CONFIGS[self.lesson_id]
+        pool = get_pool()  # Shared keep-alive clients (see providers.ProviderPool)
+        llm = pool.llm("llama-3.3-70b")
+        stt = pool.deepgram_stt(
             model="nova-3-general",
             language="multi",  # Enable multilingual detection for English + Spanish
         )
-        tts = cartesia.TTS(voice=config["voice"])
-        vad = silero.VAD.load()
+        tts = pool.cartesia_tts(config["voice"])
+        vad = get_vad()
 
         super().__init__(
-            instructions=instructions,
+            instructions=get_prompts().text(type(self)),
             stt=stt, llm=llm, tts=tts, vad=vad
         )
 
     async def on_enter(self):
         """Start lesson when they join"""
-        config = AGENT_CONFIGS["directions"]
+        config = AGENT_CONFIGS[self.lesson_id]
         logger.info(f"DirectionsAgent on_enter called for {config['name']}")
         print(f"Current Agent: {config['emoji']} {config['name']} ({config['scenario']}) {config['emoji']}")
-        # Trigger the LLM to generate initial greeting
-        self.session.generate_reply(user_input=config["initial_prompt"])
+        # Play a pre-generated opening (falls back to generating one live)
+        start_lesson(self, self.lesson_id, config["initial_prompt"], config["voice"])
 
 
-class SocialAgent(Agent):
-    def __init__(self):
-        config = AGENT_CONFIGS["social"]
-        instructions = f"""
+class SocialAgent(LessonAgent):
+    lesson_id = "social"
+
+    @classmethod
+    def build_instructions(cls) -> str:
+        config = AGENT_CONFIGS[cls.lesson_id]
+        return f"""
         You are {config['name']}, a friendly Spanish friend helping English speakers learn Spanish through social conversations.
 
         LESSON STRUCTURE:
@@ -304,32 +405,38 @@ class SocialAgent(Agent):
         All text that you return will be spoken aloud, so don't use bullets, slashes, or non-pronounceable punctuation.
         """
 
-        llm = openai.LLM.with_cerebras(model="llama-3.3-70b")
-        stt = deepgram.STT(
+    def __init__(self):
+        config = AGENT_CONFIGS[self.lesson_id]
+        pool = get_pool()  # Shared keep-alive clients (see providers.ProviderPool)
+        llm = pool.llm("llama-3.3-70b")
+        stt = pool.deepgram_stt(
             model="nova-3-general",
             language="multi",  # Enable multilingual detection for English + Spanish
         )
-        tts = cartesia.TTS(voice=config["voice"])
-        vad = silero.VAD.load()
+        tts = pool.cartesia_tts(config["voice"])
+        vad = get_vad()
 
         super().__init__(
-            instructions=instructions,
+            instructions=get_prompts().text(type(self)),
             stt=stt, llm=llm, tts=tts, vad=vad
         )
 
     async def on_enter(self):
         """Start lesson when they join"""
-        config = AGENT_CONFIGS["social"]
+        config = AGENT_CONFIGS[self.lesson_id]
         logger.info(f"SocialAgent on_enter called for {config['name']}")
         print(f"Current Agent: {config['emoji']} {config['name']} ({config['scenario']}) {config['emoji']}")
-        # Trigger the LLM to generate initial greeting
-        self.session.generate_reply(user_input=config["initial_prompt"])
+        # Play a pre-generated opening (falls back to generating one live)
+        start_lesson(self, self.lesson_id, config["initial_prompt"], config["voice"])
 
 
-class TeacherAgent(Agent):
-    def __init__(self):
-        config = AGENT_CONFIGS["teacher"]
-        instructions = f"""
+class TeacherAgent(LessonAgent):
+    lesson_id = "teacher"
+
+    @classmethod
+    def build_instructions(cls) -> str:
+        config = AGENT_CONFIGS[cls.lesson_id]
+        return f"""
         You are {config['name']}, a knowledgeable Spanish teacher helping English speakers learn Spanish through structured lessons.
 
         LESSON STRUCTURE:
@@ -349,33 +456,80 @@ class TeacherAgent(Agent):
         All text that you return will be spoken aloud, so don't use bullets, slashes, or non-pronounceable punctuation.
         """
 
-        llm = openai.LLM.with_cerebras(model="llama-3.3-70b")
-        stt = deepgram.STT(
+    def __init__(self):
+        config = AGENT_CONFIGS[self.lesson_id]
+        pool = get_pool()  # Shared keep-alive clients (see providers.ProviderPool)
+        llm = pool.llm("llama-3.3-70b")
+        stt = pool.deepgram_stt(
             model="nova-3-general",
             language="multi",  # Enable multilingual detection for English + Spanish
         )
-        tts = cartesia.TTS(voice=config["voice"])
-        vad = silero.VAD.load()
+        tts = pool.cartesia_tts(config["voice"])
+        vad = get_vad()
 
         super().__init__(
-            instructions=instructions,
+            instructions=get_prompts().text(type(self)),
             stt=stt, llm=llm, tts=tts, vad=vad
         )
 
     async def on_enter(self):
         """Start lesson when they join"""
-        config = AGENT_CONFIGS["teacher"]
+        config = AGENT_CONFIGS[self.lesson_id]
         logger.info(f"TeacherAgent on_enter called for {config['name']}")
         print(f"Current Agent: {config['emoji']} {config['name']} ({config['scenario']}) {config['emoji']}")
-        # Trigger the LLM to generate initial greeting
-        self.session.generate_reply(user_input=config["initial_prompt"])
+        # Play a pre-generated opening (falls back to generating one live)
+        start_lesson(self, self.lesson_id, config["initial_prompt"], config["voice"])
+        user_id = current_learner()
+        if user_id:  # Work the learner's due review items into the lesson (see review.py)
+            await pull_review(self, user_id)
+
+
+# Agent for each lesson id
+AGENT_CLASSES = {
+    "restaurant": RestaurantAgent,
+    "airport": AirportAgent,
+    "hotel": HotelAgent,
+    "directions": DirectionsAgent,
+    "social": SocialAgent,
+    "teacher": TeacherAgent
+}
+
+
+def prewarm_worker(proc: JobProcess):
+    """Per-process prewarm: shared models, agent prompts, the phrase matcher, the grammar checker, the review catalog and the persisted opening pool"""
+    prewarm(proc)
+    get_prompts().render_all(AGENT_CLASSES.values())
+    get_matcher()
+    get_checker()
+    get_scheduler()
+    get_opening_pool().load()
+
+
+def worker_port_options() -> dict:
+    """Health/HTTP port for this worker when run under supervisor.py (one per process)"""
+    port = os.getenv("AGENT_WORKER_PORT")
+    return {"port": int(port)} if port else {}
+
+
+async def record_progress(student: asyncio.Task, lesson_id: str, started_at: float, stats):
+    """Fold the session into the learner's progress rollups (see progress.py)"""
+    if student.done() and not student.cancelled() and student.exception() is None:
+        user_id = learner_id(student.result())
+    else:
+        user_id = None
+        student.cancel()
+    if not user_id:
+        return
+    try:
+        await asyncio.to_thread(get_progress().record_session, user_id, lesson_id, started_at, time.time(), stats)
+    except Exception as e:
+        logger.warning(f"[!] Could not record progress for {user_id}: {e}")
 
 
 async def entrypoint(ctx: JobContext):
     """Main entry point - handles one lesson session"""
-    import asyncio
-    
     await ctx.connect(auto_subscribe=AutoSubscribe.AUDIO_ONLY)
+    await asyncio.to_thread(get_library().refresh)  # Content the API compiled since prewarm
 
     # Parse lesson from room name (e.g., "rapidolingo_restaurant_abc123" -> "restaurant")
     room_name = ctx.room.name
@@ -389,16 +543,7 @@ async def entrypoint(ctx: JobContext):
     logger.info(f"Selected lesson: {lesson_id}")
 
     # Select agent based on lesson
-    agent_classes = {
-        "restaurant": RestaurantAgent,
-        "airport": AirportAgent,
-        "hotel": HotelAgent,
-        "directions": DirectionsAgent,
-        "social": SocialAgent,
-        "teacher": TeacherAgent
-    }
-
-    AgentClass = agent_classes.get(lesson_id, RestaurantAgent)  # Default to restaurant
+    AgentClass = AGENT_CLASSES.get(lesson_id, RestaurantAgent)  # Default to restaurant
     logger.info(f"Using agent class: {AgentClass.__name__}")
     agent = AgentClass()
     logger.info(f"Agent instance created: {agent.__class__.__name__}")
@@ -407,23 +552,26 @@ async def entrypoint(ctx: JobContext):
     
     # Create session
     session = AgentSession()
+    started_at = time.time()
+    student = asyncio.create_task(ctx.wait_for_participant())  # Carries the learner id, if any
+    tracker = TurnTracker(session, lesson_id)  # Per-turn latency (see turn_metrics.py)
+    transcript = SessionTranscript(session, ctx.job.id, lesson_id)  # Saved off the event loop (see transcripts.py)
+    reporter = MessageReporter(session, session_id_from_room(room_name))  # Live message counts for the API
     
     # Start session (this returns immediately, doesn't block)
     await session.start(room=ctx.room, agent=agent)
     
-    # Wait until the room is empty (all participants left)
-    # This keeps the job alive until the session truly ends
-    while True:
-        # Check if there are any participants left
-        participants = [p for p in ctx.room.remote_participants.values()]
-        if len(participants) == 0:
-            logger.info("All participants left, ending session")
-            break
-        # Wait a bit before checking again
-        await asyncio.sleep(0.5)
+    # Keep the job alive until a room/session event says it's over - the last
+    # participant leaving, idle or max-duration timeout (see lifecycle.py)
+    lifecycle = JobLifecycle(ctx, session)
+    reason = await lifecycle.wait()
     
-    logger.info(f"Session ended for {lesson_id}, job complete")
-
+    logger.info(f"Session ended for {lesson_id} ({reason}), job complete")
+    await tracker.close()
+    await transcript.close()
+    await reporter.close()
+    await record_progress(student, lesson_id, started_at, session_stats(session))
+    await lifecycle.shutdown(reason)
 
 if __name__ == "__main__":
     print("=" * 60)
@@ -434,6 +582,9 @@ if __name__ == "__main__":
     cli.run_app(
         WorkerOptions(
             entrypoint_fnc=entrypoint,
+            prewarm_fnc=prewarm_worker,  # Load Silero VAD and opening pool once per process, not per job
+            **worker_port_options(),
+            **admission_options(),  # Report load, refuse jobs when full
         ),
     )
 
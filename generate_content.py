@@ -1,37 +1,59 @@
+"""
+RápidoLingo content generation
+Generates the context/ JSON files with Cerebras - concurrently, with retries,
+JSON validation and normalization, and atomic writes. Each file is skipped when
+its prompt, model and parameters are unchanged since it was last generated
+(hashes kept in context/.generate_manifest).
+
+Usage (with CEREBRAS_API_KEY set):
+    python generate_content.py [--force] [--only spanish_beginner.json] [--concurrency 3]
+"""
+
 import os
+import re
+import sys
 import json
-from openai import OpenAI
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import openai
+from openai import AsyncOpenAI
 
-# Configure Cerebras API
-CEREBRAS_API_KEY = "csk-eryjc8myc6xjh6tex3fyfp8e9pvyjnmknxtpxcpc9cvftwvd"
+# Configure Cerebras API (key from the environment only)
+CEREBRAS_API_KEY = os.getenv("CEREBRAS_API_KEY")
+CEREBRAS_BASE_URL = "https://api.cerebras.ai/v1"
 
-client = OpenAI(
-    api_key=CEREBRAS_API_KEY,
-    base_url="https://api.cerebras.ai/v1"
+CONTEXT_DIR = Path("context")
+# No .json suffix, so the content store doesn't pick it up as a source
+MANIFEST_PATH = CONTEXT_DIR / ".generate_manifest"
+
+MODEL = "llama-3.3-70b"
+SYSTEM_PROMPT = "You are an expert Spanish language teacher. Generate high-quality educational content in valid JSON format."
+PARAMS = {"temperature": 0.7, "max_tokens": 4000}
+
+CONCURRENCY = int(os.getenv("GENERATE_CONCURRENCY", 3))
+MAX_ATTEMPTS = 4
+BACKOFF_BASE = 1.0  # seconds, doubled per attempt, plus jitter
+
+# Transient API failures worth retrying; anything else fails the file
+RETRYABLE_ERRORS = (
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.RateLimitError,
+    openai.InternalServerError,
 )
 
-def generate_content(prompt, filename):
-    """Generate content using Cerebras and save to JSON"""
-    print(f"Generating {filename}...")
-    
-    response = client.chat.completions.create(
-        model="llama-3.3-70b",
-        messages=[
-            {"role": "system", "content": "You are an expert Spanish language teacher. Generate high-quality educational content in valid JSON format."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.7,
-        max_tokens=4000
-    )
-    
-    content = response.choices[0].message.content
-    
-    # Save to file
-    with open(f"context/{filename}", "w", encoding="utf-8") as f:
-        f.write(content)
-    
-    print(f"✅ {filename} created!")
-    return content
+
+class ContentError(ValueError):
+    """The model's response isn't the JSON document we asked for"""
+
 
 # Generate beginner phrases
 beginner_prompt = """
@@ -143,19 +165,178 @@ Format:
 Return ONLY valid JSON, no markdown.
 """
 
-if __name__ == "__main__":
+
+@dataclass(frozen=True)
+class ContentSpec:
+    filename: str
+    prompt: str
+    root_key: str  # Top-level key the document must have
+
+    def fingerprint(self) -> str:
+        """Hash of everything that determines the generated content"""
+        material = json.dumps(
+            {"model": MODEL, "system": SYSTEM_PROMPT, "prompt": self.prompt, "params": PARAMS},
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+SPECS = [
+    ContentSpec("spanish_beginner.json", beginner_prompt, "beginner_phrases"),
+    ContentSpec("spanish_scenarios.json", scenarios_prompt, "scenarios"),
+    ContentSpec("spanish_vocabulary.json", vocab_prompt, "vocabulary"),
+    ContentSpec("spanish_grammar.json", grammar_prompt, "grammar_rules"),
+    ContentSpec("spanish_pronunciation.json", pronunciation_prompt, "pronunciation_guide"),
+]
+
+
+def _normalize(value):
+    """NFC strings without stray whitespace; exact duplicate list entries dropped"""
+    if isinstance(value, str):
+        return unicodedata.normalize("NFC", value).strip()
+    if isinstance(value, dict):
+        return {unicodedata.normalize("NFC", k).strip(): _normalize(v) for k, v in value.items()}
+    if isinstance(value, list):
+        items, seen = [], set()
+        for item in map(_normalize, value):
+            key = json.dumps(item, sort_keys=True, ensure_ascii=False)
+            if key not in seen:
+                seen.add(key)
+                items.append(item)
+        return items
+    return value
+
+
+def parse_content(raw: str, spec: ContentSpec) -> Dict:
+    """Parse, validate and normalize a model response"""
+    text = re.sub(r"^```(?:json)?\s*|\s*```$", "", raw.strip())
+    try:
+        document = json.loads(text)
+    except json.JSONDecodeError:
+        # Some responses wrap the JSON in prose - take the outermost object
+        start, end = text.find("{"), text.rfind("}")
+        if start < 0 or end <= start:
+            raise ContentError(f"{spec.filename}: response is not JSON")
+        try:
+            document = json.loads(text[start:end + 1])
+        except json.JSONDecodeError as e:
+            raise ContentError(f"{spec.filename}: invalid JSON ({e})")
+    if not isinstance(document, dict) or spec.root_key not in document:
+        raise ContentError(f"{spec.filename}: missing top-level '{spec.root_key}'")
+    if not document[spec.root_key]:
+        raise ContentError(f"{spec.filename}: '{spec.root_key}' is empty")
+    return _normalize(document)
+
+
+def write_atomic(path: Path, data: str):
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(data, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def load_manifest() -> Dict[str, Dict]:
+    try:
+        return json.loads(MANIFEST_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+class Generator:
+    def __init__(self, concurrency: int = CONCURRENCY, force: bool = False):
+        self.client = AsyncOpenAI(api_key=CEREBRAS_API_KEY, base_url=CEREBRAS_BASE_URL, max_retries=0)
+        self.slots = asyncio.Semaphore(concurrency)
+        self.force = force
+        self.manifest = load_manifest()
+
+    def is_current(self, spec: ContentSpec) -> bool:
+        if self.force or not (CONTEXT_DIR / spec.filename).exists():
+            return False
+        entry = self.manifest.get(spec.filename)
+        if entry is None:
+            # Generated before the manifest existed - keep it rather than overwrite it
+            self._record(spec)
+            return True
+        return entry.get("fingerprint") == spec.fingerprint()
+
+    def _record(self, spec: ContentSpec):
+        self.manifest[spec.filename] = {"fingerprint": spec.fingerprint(), "generated_at": time.time()}
+        write_atomic(MANIFEST_PATH, json.dumps(self.manifest, indent=2, sort_keys=True) + "\n")
+
+    async def _complete(self, spec: ContentSpec) -> str:
+        response = await self.client.chat.completions.create(
+            model=MODEL,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": spec.prompt},
+            ],
+            **PARAMS,
+        )
+        return response.choices[0].message.content or ""
+
+    async def generate(self, spec: ContentSpec) -> str:
+        """Generate one file; returns 'skipped', 'generated' or 'failed'"""
+        if self.is_current(spec):
+            print(f"[=] {spec.filename} unchanged, skipped")
+            return "skipped"
+
+        async with self.slots:
+            started = time.perf_counter()
+            for attempt in range(1, MAX_ATTEMPTS + 1):
+                try:
+                    document = parse_content(await self._complete(spec), spec)
+                    break
+                except (ContentError, *RETRYABLE_ERRORS) as e:
+                    if attempt == MAX_ATTEMPTS:
+                        print(f"[!] {spec.filename} failed after {attempt} attempts: {e}")
+                        return "failed"
+                    delay = BACKOFF_BASE * 2 ** (attempt - 1) * (1 + random.random())
+                    print(f"[!] {spec.filename} attempt {attempt} failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                except openai.APIError as e:
+                    print(f"[!] {spec.filename} failed: {e}")
+                    return "failed"
+
+        write_atomic(CONTEXT_DIR / spec.filename, json.dumps(document, ensure_ascii=False, indent=2) + "\n")
+        self._record(spec)
+        print(f"✅ {spec.filename} created! ({time.perf_counter() - started:.1f}s)")
+        return "generated"
+
+    async def run(self, specs: List[ContentSpec]) -> Dict[str, str]:
+        try:
+            results = await asyncio.gather(*(self.generate(spec) for spec in specs))
+        finally:
+            await self.client.close()
+        return dict(zip((s.filename for s in specs), results))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate Spanish learning content with Cerebras")
+    parser.add_argument("--force", action="store_true", help="regenerate even if unchanged")
+    parser.add_argument("--only", action="append", metavar="FILENAME", help="generate just these files")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    args = parser.parse_args(argv)
+
+    if not CEREBRAS_API_KEY:
+        print("[!] CEREBRAS_API_KEY is not set - export it before generating content")
+        return 2
+
+    specs = [s for s in SPECS if not args.only or s.filename in args.only]
     print("🚀 Generating Spanish learning content with Cerebras...")
     print("=" * 60)
-    
-    # Generate all content files
-    generate_content(beginner_prompt, "spanish_beginner.json")
-    generate_content(scenarios_prompt, "spanish_scenarios.json")
-    generate_content(vocab_prompt, "spanish_vocabulary.json")
-    generate_content(grammar_prompt, "spanish_grammar.json")
-    generate_content(pronunciation_prompt, "spanish_pronunciation.json")
-    
+
+    started = time.perf_counter()
+    CONTEXT_DIR.mkdir(exist_ok=True)
+    results = asyncio.run(Generator(args.concurrency, args.force).run(specs))
+
+    counts = {status: list(results.values()).count(status) for status in ("generated", "skipped", "failed")}
     print("=" * 60)
-    print("✅ All Spanish learning content generated!")
+    print(f"{'✅' if not counts['failed'] else '⚠️ '} {counts['generated']} generated, "
+          f"{counts['skipped']} unchanged, {counts['failed']} failed in {time.perf_counter() - started:.1f}s")
     print("📁 Files saved to context/ directory")
     print("⚡ Powered by Cerebras LLaMA 3.3 70B")
+    return 1 if counts["failed"] else 0
 
+
+if __name__ == "__main__":
+    sys.exit(main())